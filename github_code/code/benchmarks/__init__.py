@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Offline performance checks, run from the code folder as `python -m benchmarks.<name>`.
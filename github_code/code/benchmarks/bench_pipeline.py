@@ -0,0 +1,318 @@
+# benchmarks/bench_pipeline.py
+"""
+Time each stage of the ticket pipeline on synthetic data and check for regressions.
+
+Usage (from the code folder):
+    python -m benchmarks.bench_pipeline [--features N] [--route-vertices V]
+                                        [--repeat R] [--baseline PATH]
+                                        [--save-baseline] [--output PATH]
+                                        [--memory] [--corridor-vertices N]
+
+Generates (or reuses) synthetic CONDUIT/FIBERCABLE/STRUCTURE shapefiles plus
+a GML and a TXT ticket (see benchmarks.synthetic), then runs both tickets
+through the same stages as main.prepare_ticket:
+
+    parse_ticket -> corridor_buffer
+        -> clip_all_shapefiles -> optimize_map -> build_map -> save_map
+
+Styling, CLIP, BUFFER, CLASSIFY and CACHE settings come from config.json, so
+the run measures the configured hot path; SHAPEFILES is replaced by the
+synthetic layers and the layer cache lives in the work folder. Nothing here
+needs Outlook or Chrome.
+
+Each stage's best-of-R wall time is compared with a JSON baseline written by
+an earlier --save-baseline run with the same parameters. A stage fails when
+it is slower than baseline * (1 + threshold) and by more than min_seconds
+(BENCHMARK section; a key named after a stage overrides the threshold for
+that stage). Exit status is 1 on any regression. Baselines are per machine.
+
+With --memory, one more run per ticket records each stage's tracemalloc peak
+(kept out of the timed runs, which it would slow down). When the baseline has
+peaks too, a stage also fails if its peak grew by more than
+BENCHMARK.memory_threshold (default: the time threshold) and min_mb.
+
+The first run of each ticket also saves the map built from the unoptimized
+layers (`<kind>_unoptimized.html`, untimed) and records both page sizes,
+HTML plus sidecar chunks, under "map_kb": the measured effect of the
+MAP_OUTPUT optimization that the ticket summary can only estimate.
+
+With --corridor-vertices N, a noisy N-vertex route line is also buffered
+(BUFFER.WorkArea) in one GEOS call ("corridor/one_call") and, on a machine
+with more than one core, in chunks across BUFFER.Workers threads
+("corridor/chunked"), which is what corridor_buffer picks for such a line.
+The speedup printed is what the chunked path buys on this machine.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from benchmarks.synthetic import synthetic_route, write_gml_ticket, write_layers, write_txt_ticket
+from parsers import parse_ticket
+from processing.buffering import buffer_settings, corridor_buffer
+from processing.classify import load_rules
+from processing.clipping import clip_all_shapefiles
+from processing.map_output import optimize_map_layers
+from processing.mapping import build_map, save_map
+from utils.config import load_config, load_default_config
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_BASELINE = PROJECT_ROOT / "benchmarks" / "baselines" / "pipeline.json"
+
+DEFAULT_THRESHOLD = 0.25   # fail when 25% slower than baseline...
+DEFAULT_MIN_SECONDS = 0.01  # ...and at least 10 ms slower (timer noise)
+DEFAULT_MIN_MB = 1.0        # peak memory growth below this is noise
+
+
+def prepare_data(work_dir: Path, features: int, route_vertices: int, seed: int, regenerate: bool) -> dict:
+    """
+    Generate the synthetic layers and tickets unless work_dir already has them.
+    """
+    data_dir = work_dir / f"f{features}_v{route_vertices}_s{seed}"
+    shapefiles = {name: data_dir / f"{name}.shp" for name in ("CONDUIT", "FIBERCABLE", "STRUCTURE")}
+    gml, txt = data_dir / "ticket.gml", data_dir / "ticket.txt"
+    if regenerate or not all(p.exists() for p in [*shapefiles.values(), gml, txt]):
+        print(f"Generating synthetic data in {data_dir} ...")
+        shapefiles = write_layers(data_dir, features, seed)
+        write_gml_ticket(gml, route_vertices, seed)
+        write_txt_ticket(txt)
+    return {"dir": data_dir, "shapefiles": shapefiles, "gml": gml, "txt": txt}
+
+
+def run_pipeline(
+    cfg,
+    data: dict,
+    kind: str,
+    timings: Dict[str, float],
+    peaks: Optional[Dict[str, float]] = None,
+    sizes: Optional[Dict[str, Dict[str, float]]] = None
+) -> Dict[str, int]:
+    """
+    Run one ticket through every stage, keeping each stage's best time so far.
+
+    With `peaks` (and tracemalloc running), each stage's peak traced memory
+    in MB is recorded there instead of its time. With `sizes`, the map is
+    also built from the unoptimized layers and sizes[kind] gets both pages'
+    'optimized' and 'unoptimized' size in KB.
+
+    Returns:
+        Clipped feature count per layer, recorded so baselines show the workload.
+    """
+    def timed(stage: str, fn: Callable):
+        key = f"{kind}/{stage}"
+        if peaks is not None:
+            tracemalloc.reset_peak()
+            result = fn()
+            peaks[key] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+            return result
+        t0 = time.perf_counter()
+        result = fn()
+        timings[key] = min(timings.get(key, float("inf")), time.perf_counter() - t0)
+        return result
+
+    distance_m, simplify_m, buffer_workers = buffer_settings(cfg)
+    clip_cfg = cfg["CLIP"] if "CLIP" in cfg else None
+    cache_dir = data["dir"] / "cache" if "CACHE" in cfg and cfg.getboolean("CACHE", "ENABLED", fallback=False) else None
+    rules = load_rules(cfg)
+
+    ticket = timed("parse_ticket", lambda: parse_ticket(data[kind]))
+    work_gdf = ticket.work_area
+
+    buf_gdf = timed("corridor_buffer", lambda: corridor_buffer(work_gdf, distance_m, simplify_m, buffer_workers))
+    clipped = timed("clip_all_shapefiles", lambda: clip_all_shapefiles(
+        data["shapefiles"], buf_gdf, cache_dir,
+        rules=rules,
+        exact_lines=clip_cfg.getboolean("EXACT_LINES", True) if clip_cfg else True,
+        workers=clip_cfg.getint("WORKERS", 0) if clip_cfg else None,
+    ))
+    map_work, map_buf, map_layers, _ = timed(
+        "optimize_map", lambda: optimize_map_layers(cfg, work_gdf, buf_gdf, clipped)
+    )
+    map_obj = timed("build_map", lambda: build_map(
+        cfg, map_work, map_buf, map_layers, sidecar_dir=data["dir"] / f"{kind}_layers"
+    ))
+    timed("save_map", lambda: save_map(map_obj, data["dir"] / f"{kind}.html", cfg))
+
+    if sizes is not None:
+        raw_obj = build_map(cfg, work_gdf, buf_gdf, clipped, sidecar_dir=data["dir"] / f"{kind}_unoptimized_layers")
+        save_map(raw_obj, data["dir"] / f"{kind}_unoptimized.html", cfg)
+        sizes[kind] = {
+            "optimized": page_kb(data["dir"], kind),
+            "unoptimized": page_kb(data["dir"], f"{kind}_unoptimized"),
+        }
+    return {name: len(gdf) for name, gdf in clipped.items()}
+
+
+def run_corridor(cfg, vertices: int, seed: int, repeat: int, timings: Dict[str, float]) -> None:
+    """
+    Time buffering one long route line in one call and, with more than one
+    worker, in chunks; the best of `repeat` runs of each goes into timings.
+    """
+    distance_m, _, workers = buffer_settings(cfg)
+    workers = workers or os.cpu_count() or 1
+    route = synthetic_route(vertices, seed)
+    cases = {"corridor/one_call": 1}
+    if workers > 1:
+        cases["corridor/chunked"] = workers
+    else:
+        print("⚠️ One buffer worker on this machine; corridor_buffer never chunks here, timing one call only.")
+    for _ in range(repeat):
+        for stage, n in cases.items():
+            t0 = time.perf_counter()
+            corridor_buffer(route, distance_m, 0.0, n)
+            timings[stage] = min(timings.get(stage, float("inf")), time.perf_counter() - t0)
+    if "corridor/chunked" in timings:
+        print(f"corridor/chunked on {workers} threads: "
+              f"{timings['corridor/one_call'] / timings['corridor/chunked']:.2f}x one call")
+
+
+def page_kb(folder: Path, stem: str) -> float:
+    """
+    Size in KB of a saved map page: `<stem>.html` plus its sidecar chunks.
+    """
+    sidecars = folder / f"{stem}_layers"
+    size = (folder / f"{stem}.html").stat().st_size
+    if sidecars.is_dir():
+        size += sum(p.stat().st_size for p in sidecars.glob("*.js"))
+    return round(size / 1024, 1)
+
+
+def compare(current: Dict[str, float], baseline: Dict[str, float], bench_cfg) -> bool:
+    """
+    Print a per-stage comparison table; return True if nothing regressed.
+    """
+    default = float(bench_cfg.get("THRESHOLD", DEFAULT_THRESHOLD))
+    min_seconds = float(bench_cfg.get("MIN_SECONDS", DEFAULT_MIN_SECONDS))
+    ok = True
+    print(f"{'stage':34s} {'baseline':>10s} {'current':>10s} {'change':>8s}")
+    for stage, seconds in current.items():
+        base = baseline.get(stage)
+        if base is None:
+            print(f"{stage:34s} {'-':>10s} {seconds * 1e3:8.1f}ms {'new':>8s}")
+            continue
+        threshold = float(bench_cfg.get(stage.split("/", 1)[1], default))
+        change = (seconds - base) / base if base > 0 else 0.0
+        regressed = seconds > base * (1 + threshold) and seconds - base > min_seconds
+        ok &= not regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{stage:34s} {base * 1e3:8.1f}ms {seconds * 1e3:8.1f}ms {change:+7.0%}{flag}")
+    return ok
+
+
+def compare_memory(current: Dict[str, float], baseline: Dict[str, float], bench_cfg) -> bool:
+    """
+    Print a per-stage peak-memory comparison; return True if nothing grew past threshold.
+    """
+    threshold = float(bench_cfg.get("MEMORY_THRESHOLD", bench_cfg.get("THRESHOLD", DEFAULT_THRESHOLD)))
+    min_mb = float(bench_cfg.get("MIN_MB", DEFAULT_MIN_MB))
+    ok = True
+    print(f"{'stage (peak memory)':34s} {'baseline':>10s} {'current':>10s} {'change':>8s}")
+    for stage, mb in current.items():
+        base = baseline.get(stage)
+        if base is None:
+            print(f"{stage:34s} {'-':>10s} {mb:8.1f}MB {'new':>8s}")
+            continue
+        change = (mb - base) / base if base > 0 else 0.0
+        regressed = mb > base * (1 + threshold) and mb - base > min_mb
+        ok &= not regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{stage:34s} {base:8.1f}MB {mb:8.1f}MB {change:+7.0%}{flag}")
+    return ok
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Per-stage pipeline benchmark with regression check.")
+    parser.add_argument("--features", type=int, default=50_000, help="Features per synthetic layer.")
+    parser.add_argument("--route-vertices", type=int, default=500, help="Vertices along the GML work-area route.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per ticket; the best time per stage is kept.")
+    parser.add_argument("--config", type=Path, help="config.json to take settings from (default: the usual search).")
+    parser.add_argument("--work-dir", type=Path, default=Path(tempfile.gettempdir()) / "ur_bench")
+    parser.add_argument("--regenerate", action="store_true", help="Rebuild the synthetic data.")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run as the new baseline.")
+    parser.add_argument("--output", type=Path, help="Also write this run's results to a JSON file.")
+    parser.add_argument("--memory", action="store_true",
+                        help="Also record each stage's peak memory (tracemalloc) in an extra run.")
+    parser.add_argument("--corridor-vertices", type=int, default=0,
+                        help="Also time buffering a route line of this many vertices (0 skips it).")
+    args = parser.parse_args(argv)
+
+    cfg = load_config(args.config) if args.config else load_default_config()
+    bench_cfg = cfg["BENCHMARK"] if "BENCHMARK" in cfg else {}
+    params = {"features": args.features, "route_vertices": args.route_vertices, "seed": args.seed}
+    if args.corridor_vertices:
+        params["corridor_vertices"] = args.corridor_vertices
+    data = prepare_data(args.work_dir, args.features, args.route_vertices, args.seed, args.regenerate)
+
+    timings: Dict[str, float] = {}
+    clipped: Dict[str, Dict[str, int]] = {}
+    sizes: Dict[str, Dict[str, float]] = {}
+    for i in range(args.repeat):
+        for kind in ("gml", "txt"):
+            clipped[kind] = run_pipeline(cfg, data, kind, timings, sizes=None if i else sizes)
+    if args.corridor_vertices:
+        run_corridor(cfg, args.corridor_vertices, args.seed, args.repeat, timings)
+
+    peaks: Dict[str, float] = {}
+    if args.memory:
+        tracemalloc.start()
+        try:
+            for kind in ("gml", "txt"):
+                run_pipeline(cfg, data, kind, timings, peaks)
+        finally:
+            tracemalloc.stop()
+
+    result = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": platform.node(),
+        "python": platform.python_version(),
+        "params": params,
+        "repeat": args.repeat,
+        "clipped": clipped,
+        "map_kb": sizes,
+        "stages": {k: round(v, 6) for k, v in timings.items()},
+    }
+    if peaks:
+        result["peak_mb"] = peaks
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+    ok = True
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("params") != params:
+            print(f"⚠️ Baseline {args.baseline} was recorded with {baseline.get('params')}; not comparing.")
+            return 2
+        ok = compare(result["stages"], baseline["stages"], bench_cfg)
+        if peaks and "peak_mb" in baseline:
+            ok &= compare_memory(peaks, baseline["peak_mb"], bench_cfg)
+    else:
+        print(f"Clipped features: {clipped}")
+        for kind, kb in sizes.items():
+            print(f"{kind}/map page {kb['optimized']:.1f} KB ({kb['unoptimized']:.1f} KB unoptimized)")
+        for stage, seconds in result["stages"].items():
+            print(f"{stage:34s} {seconds * 1e3:8.1f}ms")
+        for stage, mb in peaks.items():
+            print(f"{stage:34s} {mb:8.1f}MB peak")
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(result, indent=2), encoding="utf-8")
+        print(f"Baseline saved to {args.baseline}")
+
+    if not ok:
+        print("❌ Performance or memory regression past threshold.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+# benchmarks/synthetic.py
+"""
+Synthetic utility layers and tickets for offline benchmarking.
+
+Everything is generated from a seed around downtown Detroit, so runs with the
+same parameters are comparable across machines and over time:
+
+  - CONDUIT / FIBERCABLE: multi-vertex lines with locate_tog and placementt,
+    written as shapefiles in Michigan State Plane South (ft) like the real
+    layers, so reads include a reprojection.
+  - STRUCTURE: points with locate_tog, subtypecod and owner.
+  - GML ticket: a work-area polygon following a winding route.
+  - Corridor route: one long, noisy pipeline-route line for the buffer case.
+  - TXT ticket: a Diggers/IUPPS style file with caller details and two
+    corner coordinates.
+"""
+from pathlib import Path
+from typing import Dict, Tuple
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import LineString, Point
+
+ORIGIN = (-83.05, 42.33)
+SPAN_DEG = 0.2
+SOURCE_CRS = "EPSG:2253"  # NAD83 / Michigan South (ft)
+
+# write_layers() clusters features around ORIGIN (normal, this many degrees
+# sigma) so tickets there clip a realistic ~100 features per layer.
+CLUSTER_SIGMA_DEG = 0.02
+
+PLACEMENTS = ["Aerial", "Underground", "Bridge", "Unknown"]
+OWNERS = ["Everstream", "AT&T", "Comcast"]
+
+
+def synthetic_layers(n: int, seed: int = 0) -> Tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]:
+    """
+    Minimal (lines, points) pair in EPSG:4326, each with an 'id' column.
+    """
+    rng = np.random.default_rng(seed)
+    x = ORIGIN[0] + rng.uniform(-SPAN_DEG, SPAN_DEG, n)
+    y = ORIGIN[1] + rng.uniform(-SPAN_DEG, SPAN_DEG, n)
+    dx, dy = rng.normal(0, 0.0005, n), rng.normal(0, 0.0005, n)
+    lines = [LineString([(a, b), (a + c, b + d)]) for a, b, c, d in zip(x, y, dx, dy)]
+    points = [Point(a, b) for a, b in zip(x, y)]
+    return (
+        gpd.GeoDataFrame({"id": np.arange(n)}, geometry=lines, crs="EPSG:4326"),
+        gpd.GeoDataFrame({"id": np.arange(n)}, geometry=points, crs="EPSG:4326"),
+    )
+
+
+def _xy(rng: np.random.Generator, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    return (
+        rng.normal(ORIGIN[0], CLUSTER_SIGMA_DEG, n),
+        rng.normal(ORIGIN[1], CLUSTER_SIGMA_DEG, n),
+    )
+
+
+def _lines(rng: np.random.Generator, n: int, vertices: int = 5) -> list:
+    x, y = _xy(rng, n)
+    steps = rng.normal(0, 0.0003, (n, vertices - 1, 2)).cumsum(axis=1)
+    return [
+        LineString(np.vstack([[x[i], y[i]], steps[i] + (x[i], y[i])]))
+        for i in range(n)
+    ]
+
+
+def write_layers(out_dir: Path, n_features: int, seed: int = 0) -> Dict[str, Path]:
+    """
+    Write synthetic CONDUIT, FIBERCABLE and STRUCTURE shapefiles.
+
+    Args:
+        out_dir: Destination folder (created if needed).
+        n_features: Feature count of each layer.
+        seed: Random seed.
+
+    Returns:
+        Mapping of layer name to shapefile path, shaped like SHAPEFILES.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    locate = rng.choice(["Locate", "No Locate"], n_features, p=[0.8, 0.2])
+
+    layers = {
+        "CONDUIT": gpd.GeoDataFrame(
+            {"locate_tog": locate, "placementt": rng.choice(PLACEMENTS, n_features)},
+            geometry=_lines(rng, n_features), crs="EPSG:4326",
+        ),
+        "FIBERCABLE": gpd.GeoDataFrame(
+            {
+                "placementt": rng.choice(PLACEMENTS, n_features),
+                "fibercount": rng.choice([12, 24, 48, 144, 288], n_features),
+            },
+            geometry=_lines(rng, n_features), crs="EPSG:4326",
+        ),
+        "STRUCTURE": gpd.GeoDataFrame(
+            {
+                "locate_tog": locate,
+                "subtypecod": rng.integers(0, 5, n_features),
+                "owner": rng.choice(OWNERS, n_features),
+            },
+            geometry=gpd.points_from_xy(*_xy(rng, n_features)),
+            crs="EPSG:4326",
+        ),
+    }
+
+    paths = {}
+    for name, gdf in layers.items():
+        path = out_dir / f"{name}.shp"
+        gdf.to_crs(SOURCE_CRS).to_file(path)
+        paths[name] = path
+    return paths
+
+
+def write_gml_ticket(path: Path, route_vertices: int = 500, seed: int = 0) -> Path:
+    """
+    Write a GML ticket whose work area is a ~10 m wide polygon along a winding
+    route through ORIGIN with roughly route_vertices vertices per side.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0.0, 1.0, route_vertices)
+    x = ORIGIN[0] - 0.01 + 0.02 * t
+    y = ORIGIN[1] + 0.002 * np.sin(t * 12.0) + rng.normal(0, 2e-6, route_vertices)
+    route = LineString(np.column_stack([x, y]))
+    work_area = route.buffer(0.00006, quad_segs=2)
+    gdf = gpd.GeoDataFrame({"name": ["WorkArea"]}, geometry=[work_area], crs="EPSG:4326")
+    path = Path(path)
+    gdf.to_file(path, driver="GML")
+    return path
+
+
+def synthetic_route(vertices: int, seed: int = 0) -> gpd.GeoDataFrame:
+    """
+    One winding, noisy route line of `vertices` vertices through ORIGIN in
+    EPSG:4326, like a long pipeline-route work area.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0.0, 1.0, vertices)
+    x = ORIGIN[0] - 0.1 + 0.2 * t + rng.normal(0, 2e-5, vertices)
+    y = ORIGIN[1] + 0.01 * np.sin(t * 40.0) + rng.normal(0, 2e-5, vertices)
+    return gpd.GeoDataFrame({"name": ["Route"]}, geometry=[LineString(np.column_stack([x, y]))], crs="EPSG:4326")
+
+
+def write_txt_ticket(path: Path, size_deg: float = 0.002) -> Path:
+    """
+    Write a Diggers/IUPPS style TXT ticket centred on ORIGIN.
+    """
+    lon, lat = ORIGIN
+    half = size_deg / 2.0
+    path = Path(path)
+    path.write_text(
+        "Ticket: 20260000001\n"
+        "Name: Benchmark Caller\n"
+        "Email: caller@example.com\n"
+        "Company: Benchmark Excavating\n"
+        f"Coordinate1: {lon - half:.6f},{lat - half:.6f}\n"
+        f"Coordinate2: {lon + half:.6f},{lat + half:.6f}\n",
+        encoding="utf-8",
+    )
+    return path
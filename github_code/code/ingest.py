@@ -0,0 +1,180 @@
+"""
+Ingest service: watches the download folder and processes every ticket as
+soon as it has finished downloading, recording each one in a SQLite job
+ledger (utils/job_ledger.py).
+
+Start it once (from the code folder):
+    python ingest.py
+
+Other commands:
+    python ingest.py --status         job counts and the most recent jobs
+    python ingest.py --retry-failed   give failed tickets another set of attempts
+
+Tickets run one at a time against layers kept in memory (like worker.py).
+A ticket that raises gets an `<stem>_error.txt` in its folder and is retried
+up to INGEST.max_attempts times. Tickets that were mid-run when the service
+stopped are picked up again on the next start.
+"""
+import argparse
+import sys
+import time
+import traceback
+from pathlib import Path
+from typing import Any, Dict
+
+from utils.config import load_default_config, ConfigError
+from utils.paths import init_paths, get_shapefile_paths, get_cache_dir
+from utils.file_manager import stage_ticket
+from utils.folder_watch import DEFAULT_POLL_S, DEFAULT_SETTLE_S, DEFAULT_XML_GRACE_S, FolderWatcher
+from utils.job_ledger import DEFAULT_MAX_ATTEMPTS, JobLedger
+from utils.notifications import safe_toast
+from utils.memory import memory_settings
+from utils.tracing import new_tracer, span
+
+from processing.layer_store import LayerStore
+from main import PROJECT_ROOT, process_ticket
+
+LEDGER_NAME = "ingest_jobs.sqlite3"
+
+
+def ingest_settings(cfg, results_dir: Path) -> Dict[str, Any]:
+    """
+    Read the INGEST config section.
+
+    Returns:
+        Dict with the ledger 'db' path (INGEST.db, default
+        <ResultsDir>/ingest_jobs.sqlite3), 'settle_s', 'poll_s',
+        'xml_grace_s' (how long a .gml waits for its XML), 'max_attempts'
+        and 'use_events' (file-system events vs polling).
+    """
+    sec = cfg["INGEST"] if "INGEST" in cfg else None
+    if sec is None:
+        return {
+            "db": results_dir / LEDGER_NAME,
+            "settle_s": DEFAULT_SETTLE_S,
+            "poll_s": DEFAULT_POLL_S,
+            "xml_grace_s": DEFAULT_XML_GRACE_S,
+            "max_attempts": DEFAULT_MAX_ATTEMPTS,
+            "use_events": True,
+        }
+    db = str(sec.get("DB", "") or "").strip()
+    return {
+        "db": (PROJECT_ROOT / db).resolve() if db else results_dir / LEDGER_NAME,
+        "settle_s": sec.getfloat("SETTLE_SECONDS", DEFAULT_SETTLE_S),
+        "poll_s": sec.getfloat("POLL_SECONDS", DEFAULT_POLL_S),
+        "xml_grace_s": sec.getfloat("XML_GRACE_SECONDS", DEFAULT_XML_GRACE_S),
+        "max_attempts": sec.getint("MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS),
+        "use_events": sec.getboolean("WATCH_EVENTS", True),
+    }
+
+
+def run_job(cfg, ledger: JobLedger, job: Dict[str, Any], results_dir: Path, store: LayerStore) -> None:
+    """
+    Stage and process one claimed job, recording the outcome in the ledger.
+    """
+    ticket = Path(job["ticket"])
+    ticket_dir = None
+    tracer = new_tracer(cfg)
+    try:
+        with tracer.activate(), span("stage"):
+            ticket_file, xml_file, ticket_dir = stage_ticket(ticket, results_dir)
+        ledger.staged(job["id"], ticket_file, ticket_dir)
+        result = process_ticket(cfg, ticket_file, xml_file, ticket_dir, store.shapefiles, store=store, tracer=tracer)
+    except Exception as e:
+        if ticket_dir is not None:
+            (ticket_dir / f"{ticket.stem}_error.txt").write_text(traceback.format_exc())
+        state = ledger.failed(job["id"], f"{type(e).__name__}: {e}")
+        retry = "will retry" if state == "queued" else "giving up"
+        print(f"✗ {ticket.name} (attempt {job['attempts']}, {retry}): {e}")
+        return
+    ledger.done(job["id"])
+    print(f"✓ {ticket.name} -> {result['msg']}")
+    safe_toast("UR Preview", f"{ticket.stem} processed", duration=3)
+
+
+def serve(cfg) -> None:
+    paths = init_paths(cfg)
+    results_dir = paths["RESULTS_DIR"]
+    results_dir.mkdir(parents=True, exist_ok=True)
+    settings = ingest_settings(cfg, results_dir)
+
+    ledger = JobLedger(settings["db"], settings["max_attempts"])
+    resumed = ledger.recover()
+    if resumed:
+        print(f"Resuming {resumed} ticket(s) interrupted by the last run")
+
+    store = LayerStore(
+        get_shapefile_paths(cfg, PROJECT_ROOT), get_cache_dir(cfg, PROJECT_ROOT),
+        budget_mb=memory_settings(cfg)["budget_mb"],
+    )
+    print("Loading utility layers…")
+    store.load_all()
+
+    watcher = FolderWatcher(
+        paths["DOWNLOAD_FOLDER"], settings["settle_s"], settings["poll_s"], settings["use_events"],
+        xml_grace_s=settings["xml_grace_s"],
+    )
+    watcher.start()
+    print(f"Watching {watcher.folder} ({watcher.mode}); ledger {settings['db']} (Ctrl+C to stop)")
+    try:
+        while True:
+            for path in watcher.poll():
+                if ledger.enqueue(path, *watcher.stamp(path)):
+                    print(f"Queued {path.name}")
+            job = ledger.claim()
+            while job is not None:
+                run_job(cfg, ledger, job, results_dir, store)
+                # newly settled files queue behind whatever is already waiting
+                for path in watcher.poll(timeout=0):
+                    if ledger.enqueue(path, *watcher.stamp(path)):
+                        print(f"Queued {path.name}")
+                job = ledger.claim()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+        ledger.close()
+
+
+def print_status(ledger: JobLedger, limit: int = 20) -> None:
+    counts = ledger.counts()
+    print(", ".join(f"{state}: {n}" for state, n in counts.items()))
+    for job in ledger.jobs(limit=limit):
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(job["queued_at"]))
+        took = f" {job['seconds']:.1f} s" if job["seconds"] is not None else ""
+        error = f"  {job['error']}" if job["state"] != "done" and job["error"] else ""
+        print(f"{when}  {job['state']:<7} x{job['attempts']}{took}  {Path(job['source']).name}{error}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="UR Preview download-folder ingest service.")
+    parser.add_argument("--status", action="store_true", help="show the job ledger and exit")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="queue failed tickets again (picked up by the running service)")
+    args = parser.parse_args(argv)
+
+    try:
+        cfg = load_default_config()
+    except ConfigError as e:
+        print(f"Configuration error: {e}")
+        return 1
+
+    if args.status or args.retry_failed:
+        results_dir = init_paths(cfg)["RESULTS_DIR"]
+        settings = ingest_settings(cfg, results_dir)
+        ledger = JobLedger(settings["db"], settings["max_attempts"])
+        try:
+            if args.retry_failed:
+                print(f"Requeued {ledger.retry_failed()} failed ticket(s)")
+            if args.status:
+                print_status(ledger)
+        finally:
+            ledger.close()
+        return 0
+
+    serve(cfg)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,67 +1,444 @@
+import shutil
 import sys
 from datetime import datetime
 from pathlib import Path
-
-import math
-import geopandas as gpd
-from shapely.geometry import box
+import argparse
+import traceback
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
 
 # ─── Utils ───────────────────────────────────────────────────────────────
 from utils.config import load_default_config, ConfigError
-from utils.paths import init_paths
-from utils.file_manager import stage_files
+from utils.paths import init_paths, get_shapefile_paths, get_cache_dir
+from utils.file_manager import stage_files, stage_all_files
 from utils.notifications import safe_toast
+from utils.worker_client import get_worker_address, submit_ticket
 from utils.constants import DEFAULT_CONFIG_NAME  # Back up for style
-
-# ─── Parsers ────────────────────────────────────────────────────────────
-from parsers.gml_parser import read_and_reproject, buffer_gdf
-from parsers.txt_parser import parse_ticket_txt, parse_customer_details
+from utils.memory import memory_settings, memory_summary
+from utils.tracing import Tracer, new_tracer, span, write_trace
 
 # ─── Processing steps ────────────────────────────────────────────────────
-from processing.clipping import clip_all_shapefiles
-from processing.mapping import build_map, save_map
-from processing.screenshot import screenshot_map
-from processing.emailer import (
-    compose_draft_gml,
-    compose_draft_txt,
-    save_and_open_draft
-)
+# Stages (and geopandas, folium, selenium, win32com behind them) are
+# imported on first use, so a run with no ticket exits without loading them.
+from processing.stages import STAGES, get_stage
+
+if TYPE_CHECKING:
+    from parsers import Ticket
+    from processing.layer_store import LayerStore
 
 # ─── Constants and Helpers ─────────────────────────────────────────────────
-MIN_SIZE_M = 30  # Minimum dimension in meters for txt workflow
+PROJECT_ROOT = Path(__file__).resolve().parent  # main.py lives in project root
 
-def enforce_min_size_deg(geom):
+
+def prepare_ticket(
+    cfg,
+    ticket: "Ticket",
+    ticket_dir: Path,
+    shapefiles: Dict[str, Path],
+    cache_dir: Optional[Path] = None,
+    store: Optional["LayerStore"] = None,
+) -> Dict[str, Any]:
     """
-    Ensures that the geometry bounding box has at least MIN_SIZE_M meters
-    in both dimensions by expanding it if necessary.
+    Run steps 5-10 (buffer, clip, summary, map) for one parsed ticket.
+
+    Everything here is CPU-bound and needs neither Chrome nor Outlook, so batch
+    mode runs it in worker processes. The return value is small and picklable.
+
+    Args:
+        cfg: Loaded configuration.
+        ticket: Parsed ticket (parsers.parse_ticket); its buffer is filled in.
+        ticket_dir: Per-ticket results folder.
+        shapefiles: Mapping of layer name to shapefile path.
+        cache_dir: Layer cache directory, or None.
+        store: Resident LayerStore (worker/ingest mode); layers are read from disk if None.
+
+    Returns:
+        Dict with 'summary' and 'html' paths, 'png' (drawn by the static
+        renderer or taken from the result cache, else None), 'any_feats',
+        the buffered 'ticket' and 'result_key' (its result-cache entry, or None).
     """
-    minx, miny, maxx, maxy = geom.bounds
-    center_lat = (miny + maxy) / 2.0
+    distance_m, simplify_m, buffer_workers = get_stage("buffer_settings")(cfg)
+    work_gdf = ticket.work_area
+    summary_path = ticket_dir / f"{ticket.stem}.txt"
+
+    # 4c) Same work area, layer data and styling as an earlier ticket: reuse
+    #     its outputs (see processing.result_cache)
+    results = get_stage("result_cache")(cfg)
+    keys = None
+    if results is not None:
+        with span("result_cache"):
+            keys = get_stage("result_keys")(cfg, work_gdf, shapefiles, (distance_m, simplify_m))
+            hit = results.restore(keys, ticket_dir, ticket.stem)
+        if hit is not None:
+            with summary_path.open("w") as f:
+                f.write(f"Timestamp: {datetime.now()}\n")
+                f.write(f"Ticket: {ticket.stem}\n")
+                for layer, count in hit["features"].items():
+                    f.write(f"{layer}: {count} feature(s) (cached)\n")
+                f.write(f"{hit['map_line']}\n")
+                f.write(f"Result cache: reused the map of {hit['stem']}\n")
+            return {
+                "summary": summary_path,
+                "html": hit["html"],
+                "png": hit["png"],
+                "any_feats": hit["any_feats"],
+                "ticket": ticket,
+                "result_key": hit["key"],
+            }
+
+    # 5) Buffer the work area
+    if ticket.buffer is None:
+        with span("buffer"):
+            ticket.buffer = get_stage("buffer")(work_gdf, distance_m, simplify_m, buffer_workers)
+    buf_gdf = ticket.buffer
 
-    # degrees per meter approximations
-    deg_per_m_lat = 1.0 / 111_320
-    deg_per_m_lon = 1.0 / (111_320 * math.cos(math.radians(center_lat)))
+    # 6) Clip all shapefiles
+    clip_cfg = cfg["CLIP"] if "CLIP" in cfg else None
+    layer_stats: Dict[str, Dict[str, Any]] = {}
+    clipped = None
+    if results is not None:
+        # same area and layer data, other styling: only the map is redrawn
+        with span("result_cache_layers"):
+            clipped = results.load_layers(keys, shapefiles)
+    if clipped is None:
+        with span("clip_layers"):
+            clipped = get_stage("clip")(
+                shapefiles, buf_gdf, cache_dir,
+                store=store,
+                rules=get_stage("load_rules")(cfg),
+                exact_lines=clip_cfg.getboolean("EXACT_LINES", True) if clip_cfg else True,
+                workers=clip_cfg.getint("WORKERS", 0) if clip_cfg else None,
+                stats=layer_stats,
+                budget_mb=memory_settings(cfg)["budget_mb"],
+            )
 
-    width_deg = maxx - minx
-    height_deg = maxy - miny
+    # 7) Determine if any features were found
+    any_feats = any(len(df) > 0 for df in clipped.values())
 
-    req_w = MIN_SIZE_M * deg_per_m_lon
-    req_h = MIN_SIZE_M * deg_per_m_lat
+    # 8) If no features, force the buffer outline to be visible
+    #    (passed to build_map rather than written into cfg, which a
+    #    resident worker shares between tickets)
+    show_buffer = None if any_feats else True
 
-    expand_x = max(0, (req_w - width_deg) / 2.0)
-    expand_y = max(0, (req_h - height_deg) / 2.0)
+    # 9) Write summary report
+    with summary_path.open("w") as f:
+        f.write(f"Timestamp: {datetime.now()}\n")
+        f.write(f"Ticket: {ticket.stem}\n")
+        for layer, df in clipped.items():
+            took = f"in {layer_stats[layer]['seconds']:.3f} s" if layer in layer_stats else "(cached)"
+            f.write(f"{layer}: {len(df)} feature(s) {took}\n")
+
+    # 10) Build & save Folium map (geometry quantized/simplified for output)
+    with span("optimize_map"):
+        map_work, map_buf, map_layers, payload = get_stage("optimize_map")(cfg, work_gdf, buf_gdf, clipped)
+    html_path = ticket_dir / f"{ticket.stem}.html"
+    sidecar_dir = ticket_dir / f"{ticket.stem}_layers"
+    with span("build_map"):
+        map_obj = get_stage("build_map")(cfg, map_work, map_buf, map_layers, show_buffer=show_buffer,
+                                         sidecar_dir=sidecar_dir)
+    with span("save_map"):
+        get_stage("save_map")(map_obj, html_path, cfg)
+
+    html_kb = html_path.stat().st_size / 1024
+    sidecar_kb = sum(p.stat().st_size for p in sidecar_dir.glob("*.js")) / 1024 if sidecar_dir.is_dir() else 0.0
+    saved_kb = (payload["before"] - payload["after"]) / 1024
+    total_kb = html_kb + sidecar_kb
+    sidecars = f" + {sidecar_kb:.1f} KB sidecar layers" if sidecar_kb else ""
+    # the unoptimized page is never written; its size is estimated from the coordinate text saved
+    map_line = (f"Map HTML: {html_kb:.1f} KB{sidecars} (~{total_kb + saved_kb:.1f} KB estimated before "
+                f"output optimization, zoom {payload['zoom']})")
+    with summary_path.open("a") as f:
+        f.write(map_line + "\n")
+
+    # 10b) Static PNG backend: draw it here (CPU-bound, runs in the batch
+    #      pool) so finish_ticket can skip the browser screenshot.
+    png_path = None
+    if get_stage("render_settings")(cfg)["backend"] == "static":
+        try:
+            with span("render_static_map"):
+                png_path = get_stage("render_static")(
+                    cfg, map_work, map_buf, map_layers,
+                    ticket_dir / f"{ticket.stem}.png", show_buffer=show_buffer
+                )
+        except ImportError as e:
+            print(f"⚠️ Static renderer unavailable ({e}); using the browser screenshot")
+
+    # 10c) Remember the outputs for the next ticket with this work area
+    result_key = None
+    if results is not None:
+        with span("result_cache_store"):
+            meta = {
+                "features": {name: len(df) for name, df in clipped.items()},
+                "any_feats": any_feats,
+                "map_line": map_line,
+            }
+            results.store(keys, ticket.stem, meta, clipped, html_path, sidecar_dir, png_path)
+        result_key = results.entry_name(keys)
+
+    return {
+        "summary": summary_path,
+        "html": html_path,
+        "png": png_path,
+        "any_feats": any_feats,
+        "ticket": ticket,
+        "result_key": result_key,
+    }
 
-    return box(
-        minx - expand_x,
-        miny - expand_y,
-        maxx + expand_x,
-        maxy + expand_y,
-    )
 
+def record_peak_memory(tracer: Tracer, summary_path: Path) -> None:
+    """
+    Append each traced stage's peak memory (MEMORY.profile) to the summary report.
+    """
+    if tracer.memory is None:
+        return
+    line = memory_summary(tracer.spans, tracer.memory.kind)
+    if line:
+        with summary_path.open("a") as f:
+            f.write(line + "\n")
+
+
+def finish_ticket(
+    cfg,
+    ticket: "Ticket",
+    ticket_dir: Path,
+    prepared: Dict[str, Any],
+    open_draft: bool = True,
+) -> Dict[str, Path]:
+    """
+    Run steps 11-13 (screenshot, Outlook draft) for a prepared ticket.
+
+    Args:
+        cfg: Loaded configuration.
+        ticket: Parsed ticket.
+        ticket_dir: Per-ticket results folder.
+        prepared: Return value of prepare_ticket().
+        open_draft: Open the results folder and draft in Outlook once saved.
+
+    Returns:
+        Dict with the 'summary', 'html', 'png' and 'msg' output paths.
+    """
+    html_path = prepared["html"]
+    any_feats = prepared["any_feats"]
+
+    # 11) Screenshot to PNG (unless the static renderer already drew it)
+    png_path = prepared.get("png")
+    if png_path is None:
+        png_path = ticket_dir / f"{ticket.stem}.png"
+        get_stage("tile_server")(cfg)  # the map's imagery comes from the local tile cache
+        with span("screenshot_map"):
+            get_stage("screenshot")(html_path, png_path, cfg=cfg)
+        if prepared.get("result_key"):
+            get_stage("result_cache")(cfg).add_png(prepared["result_key"], png_path)
+
+    # 12-13) Compose and open Outlook draft
+    compose = get_stage("compose_gml" if ticket.kind == "gml" else "compose_txt")
+    with span("compose_draft", kind=ticket.kind):
+        mail = compose(cfg, ticket, png_path, any_feats)
+
+    with span("save_draft"):
+        msg_path = get_stage("save_draft")(mail, ticket_dir, open_after=open_draft)
+
+    return {
+        "summary": prepared["summary"],
+        "html": html_path,
+        "png": png_path,
+        "msg": msg_path,
+    }
+
+
+def process_ticket(
+    cfg,
+    ticket_file: Path,
+    xml_file: Optional[Path],
+    ticket_dir: Path,
+    shapefiles: Dict[str, Path],
+    cache_dir: Optional[Path] = None,
+    store: Optional["LayerStore"] = None,
+    tracer: Optional[Tracer] = None,
+) -> Dict[str, Path]:
+    """
+    Run steps 4-13 of the pipeline for one staged ticket.
+
+    Every step is timed into `tracer` (a new one if None), which is then
+    written to the metrics log (see utils.tracing), even if the ticket fails.
+    With MEMORY.profile set, each step's peak memory also goes into the
+    summary report.
+
+    Args:
+        cfg: Loaded configuration.
+        ticket_file: Staged .gml or .txt ticket.
+        xml_file: Staged OneCall XML for a .gml ticket, or None.
+        ticket_dir: Per-ticket results folder.
+        shapefiles: Mapping of layer name to shapefile path.
+        cache_dir: Layer cache directory, or None.
+        store: Resident LayerStore (worker mode); layers are read from disk if None.
+        tracer: Tracer already holding this ticket's earlier spans (e.g. staging).
+
+    Returns:
+        Dict with the 'summary', 'html', 'png' and 'msg' output paths.
+    """
+    tracer = tracer or new_tracer(cfg)
+    try:
+        with tracer.activate(), span("ticket"):
+            # 4b) Parse the ticket (and its OneCall XML) once for every later step
+            with span("parse"):
+                ticket = get_stage("parse")(ticket_file, xml_file)
+            prepared = prepare_ticket(cfg, ticket, ticket_dir, shapefiles, cache_dir, store)
+            result = finish_ticket(cfg, ticket, ticket_dir, prepared)
+        record_peak_memory(tracer, result["summary"])
+        return result
+    finally:
+        write_trace(cfg, tracer, ticket_dir, ticket_file.stem)
+
+
+# ─── Batch mode ────────────────────────────────────────────────────────────
+def _prepare_in_pool(
+    cfg,
+    ticket_file: Path,
+    xml_file: Optional[Path],
+    ticket_dir: Path,
+    shapefiles: Dict[str, Path],
+    cache_dir: Optional[Path],
+) -> Dict[str, Any]:
+    # Layers are read per ticket, windowed to its buffer (from the layer cache
+    # when enabled), so no process holds the statewide layers.
+    # The parsed Ticket and this process's spans come back in the result; a
+    # failure comes back as 'error' and 'traceback' with the spans so far.
+    tracer = new_tracer(cfg)
+    try:
+        with tracer.activate(), span("prepare"):
+            with span("parse"):
+                ticket = get_stage("parse")(ticket_file, xml_file)
+            prepared = prepare_ticket(cfg, ticket, ticket_dir, shapefiles, cache_dir)
+    except Exception as e:
+        return {"error": str(e), "traceback": traceback.format_exc(), "spans": tracer.spans}
+    prepared["spans"] = tracer.spans
+    return prepared
+
+
+def _cleanup_batch(cfg, cache_dir: Optional[Path], pids: Set[int]) -> None:
+    """
+    Release what a batch run leaves behind: the shared Chrome session and
+    temporary files that pool processes `pids` were writing when they died
+    (a half-written layer cache file or result cache entry).
+    """
+    if "processing.screenshot" in sys.modules:  # only if a screenshot was taken
+        sys.modules["processing.screenshot"].close_session()
+
+    from processing.result_cache import result_cache_settings
+
+    folders = [d for d in (cache_dir, result_cache_settings(cfg)["dir"]) if d is not None and d.is_dir()]
+    for folder in folders:
+        for pid in pids:
+            for tmp in [*folder.glob(f"*.{pid}.tmp"), *folder.glob(f"*.{pid}.*.tmp")]:
+                try:
+                    if tmp.is_dir():
+                        shutil.rmtree(tmp)
+                    else:
+                        tmp.unlink()
+                except OSError as e:
+                    print(f"⚠️ Could not remove {tmp}: {e}")
 
-def main():
-    # 0) Toast start
-    safe_toast("UR Preview", "Processing started…", duration=3)
+
+def run_batch(cfg, staged: List[Tuple[Path, Optional[Path], Path]], workers: int) -> int:
+    """
+    Process every staged ticket in one run.
+
+    The layer cache is brought up to date first; steps 5-10 then run in a
+    pool of `workers` processes, each reading only its ticket's window of
+    every layer. Screenshots and Outlook drafts run in the parent in ticket
+    order (Chrome and COM are not shared across processes). A failing ticket
+    gets an `<stem>_error.txt` in its folder and does not stop the rest.
+
+    When done (or interrupted), the Chrome session is closed and temporary
+    files of crashed pool processes are removed; then each ticket's result
+    is printed in ticket order.
+
+    Args:
+        cfg: Loaded configuration.
+        staged: (ticket_file, xml_file, ticket_dir) tuples from stage_all_files().
+        workers: Number of worker processes.
+
+    Returns:
+        Number of tickets that failed.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from processing.layer_cache import warm_cache
+
+    shapefiles = get_shapefile_paths(cfg, PROJECT_ROOT)
+    cache_dir = get_cache_dir(cfg, PROJECT_ROOT)
+    warm_cache(shapefiles, cache_dir, memory_settings(cfg)["budget_mb"])
+
+    lines: List[str] = []
+    failures = 0
+    pids: Set[int] = set()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_prepare_in_pool, cfg, ticket_file, xml_file, ticket_dir, shapefiles, cache_dir)
+                for ticket_file, xml_file, ticket_dir in staged
+            ]
+            pids.update(p.pid for p in multiprocessing.active_children())
+
+            # Collect in submission order so drafts come out in ticket order
+            for (ticket_file, _, ticket_dir), future in zip(staged, futures):
+                tracer = new_tracer(cfg)
+                try:
+                    prepared = future.result()
+                    tracer.extend(prepared["spans"])
+                    if "error" in prepared:
+                        failures += 1
+                        (ticket_dir / f"{ticket_file.stem}_error.txt").write_text(prepared["traceback"])
+                        lines.append(f"✗ {ticket_file.name}: {prepared['error']}")
+                        continue
+                    with tracer.activate(), span("finish"):
+                        result = finish_ticket(cfg, prepared["ticket"], ticket_dir, prepared, open_draft=False)
+                    record_peak_memory(tracer, result["summary"])
+                except Exception as e:
+                    failures += 1
+                    (ticket_dir / f"{ticket_file.stem}_error.txt").write_text(traceback.format_exc())
+                    lines.append(f"✗ {ticket_file.name}: {e}")
+                    continue
+                finally:
+                    write_trace(cfg, tracer, ticket_dir, ticket_file.stem)
+                lines.append(f"✓ {ticket_file.name} -> {result['msg']}")
+    finally:
+        _cleanup_batch(cfg, cache_dir, pids)
+
+    for line in lines:
+        print(line)
+    print(f"Batch complete: {len(staged) - failures} succeeded, {failures} failed.")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="UR Preview ticket processor.")
+    parser.add_argument("--batch", action="store_true",
+                        help="process every pending ticket in the download folder")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes for --batch (default: BATCH.workers)")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report import time per module for a ticket run, without processing "
+                             "anything (no tickets are staged, no drafts opened)")
+    parser.add_argument("--import-only", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.profile_startup:
+        from utils.startup_profile import profile_startup
+        sys.exit(profile_startup(Path(__file__).resolve(), ["--import-only"]))
+
+    if args.import_only:
+        # --profile-startup's child: load config and every pipeline stage, then stop
+        try:
+            load_default_config()
+        except ConfigError as e:
+            print(f"Configuration error: {e}")
+        for name in STAGES:
+            try:
+                get_stage(name)
+            except ImportError as e:
+                print(f"⚠️ Stage {name} unavailable: {e}")
+        sys.exit(0)
 
     # 1) Load & validate config
     try:
@@ -79,83 +456,55 @@ def main():
     # Ensure Results directory exists
     RESULTS_DIR.mkdir(parents=True, exist_ok=True)
 
+    # 3b) Batch mode: stage everything pending and process it in one run
+    if args.batch:
+        staged = stage_all_files(DOWNLOAD_FOLDER, RESULTS_DIR)
+        if not staged:
+            print("No new GML or TXT tickets to process.")
+            sys.exit(0)
+        safe_toast("UR Preview", "Processing started…", duration=3)
+        workers = args.workers or (cfg["BATCH"].getint("WORKERS", 2) if "BATCH" in cfg else 2)
+        print(f"Processing {len(staged)} ticket(s) with {workers} worker(s)…")
+        failures = run_batch(cfg, staged, max(1, workers))
+        safe_toast("UR Preview", f"Batch complete: {len(staged) - failures}/{len(staged)} ok", duration=5)
+        sys.exit(1 if failures else 0)
+
     # 3) Stage incoming tickets
-    ticket_file, xml_file, ticket_dir = stage_files(DOWNLOAD_FOLDER, RESULTS_DIR)
+    tracer = new_tracer(cfg)
+    with tracer.activate(), span("stage"):
+        ticket_file, xml_file, ticket_dir = stage_files(DOWNLOAD_FOLDER, RESULTS_DIR)
     if not ticket_file:
         print("No new GML or TXT tickets to process.")
         sys.exit(0)
 
-    # 4) Assume main.py lives in project root
-    PROJECT_ROOT = Path(__file__).resolve().parent
-
-    shapefiles = {
-        name: (PROJECT_ROOT / rel).resolve()
-        for name, rel in cfg['SHAPEFILES'].items()
-    }
-
-    # 5) Parse work area from GML vs. TXT
-    if ticket_file.suffix.lower() == ".gml":
-        work_gdf = read_and_reproject(ticket_file)
-        buf_gdf  = buffer_gdf(work_gdf)
-        # parse customer info if XML present
-        if xml_file:
-            cust_name, cust_email, lon, lat = parse_customer_details(xml_file)
-        else:
-            cust_name, cust_email, lon, lat = (None, None, None, None)
-    else:
-        info, coord1, coord2 = parse_ticket_txt(ticket_file)
-        lon, lat = coord1
-        minx, maxx = sorted([coord1[0], coord2[0]])
-        miny, maxy = sorted([coord1[1], coord2[1]])
-        poly = box(minx, miny, maxx, maxy)
-        work_gdf = gpd.GeoDataFrame(geometry=[poly], crs="EPSG:4326")
-
-        # Enforce minimum size for TXT workflow
-        work_gdf = work_gdf.copy()
-        work_gdf.geometry = work_gdf.geometry.apply(enforce_min_size_deg)
-
-        buf_gdf  = buffer_gdf(work_gdf)
-
-    # 6) Clip all shapefiles
-    clipped = clip_all_shapefiles(shapefiles, buf_gdf)
-
-    # 7) Determine if any features were found
-    any_feats = any(len(df) > 0 for df in clipped.values())
-
-    # 8) If no features, force the buffer outline to be visible
-    if not any_feats:
-        if not cfg.has_section("VISIBILITY"):
-            cfg.add_section("VISIBILITY")
-        cfg.set("VISIBILITY", "BUFFER_AREA", "True")
-
-    # 9) Write summary report
-    summary_path = ticket_dir / f"{ticket_file.stem}.txt"
-    with summary_path.open("w") as f:
-        f.write(f"Timestamp: {datetime.now()}\n")
-        f.write(f"Ticket: {ticket_file.stem}\n")
-        for layer, df in clipped.items():
-            f.write(f"{layer}: {len(df)} feature(s)\n")
-
-    # 10) Build & save Folium map
-    map_obj   = build_map(cfg, work_gdf, buf_gdf, clipped)
-    html_path = ticket_dir / f"{ticket_file.stem}.html"
-    save_map(map_obj, html_path)
-
-    # 11) Screenshot to PNG
-    png_path = ticket_dir / f"{ticket_file.stem}.png"
-    screenshot_map(html_path, png_path)
-
-    # 12) Check for any features found
-    any_feats = any(len(df) > 0 for df in clipped.values())
-
-    # 13) Compose and open Outlook draft
-    if ticket_file.suffix.lower() == ".gml":
-        mail = compose_draft_gml(cfg, ticket_file, xml_file, png_path, any_feats)
-    else:
-        mail = compose_draft_txt(cfg, ticket_file, info, (coord1, coord2), png_path, any_feats)
+    # 0) Toast start (once there is a ticket; the toast library is slow to load)
+    safe_toast("UR Preview", "Processing started…", duration=3)
 
-    msg_path = save_and_open_draft(mail, ticket_dir)
-    print(f"Draft saved to: {msg_path}")
+    # 4) Hand off to the resident worker if one is running (see worker.py)
+    worker = get_worker_address(cfg)
+    if worker:
+        try:
+            with tracer.activate(), span("worker_handoff"):
+                result = submit_ticket(ticket_file, *worker)
+        except RuntimeError as e:
+            write_trace(cfg, tracer, ticket_dir, ticket_file.stem)
+            print(e)
+            sys.exit(1)
+        if result is not None:
+            # the worker traces the pipeline; this run's spans are staging and the handoff
+            write_trace(cfg, tracer, ticket_dir, ticket_file.stem)
+            print(f"Draft saved to: {result['msg']}")
+            safe_toast("UR Preview", "Processing complete!", duration=5)
+            return
+
+    shapefiles = get_shapefile_paths(cfg, PROJECT_ROOT)
+
+    # Pre-projected layer cache (rebuilt automatically when a shapefile changes)
+    cache_dir = get_cache_dir(cfg, PROJECT_ROOT)
+
+    # 5-13) Run the pipeline
+    result = process_ticket(cfg, ticket_file, xml_file, ticket_dir, shapefiles, cache_dir, tracer=tracer)
+    print(f"Draft saved to: {result['msg']}")
 
     # 14) Toast completion
     safe_toast("UR Preview", "Processing complete!", duration=5)
@@ -1,8 +1,31 @@
 # parsers/__init__.py
-from .gml_parser import read_and_reproject, buffer_gdf
-from .txt_parser import parse_ticket_txt, parse_customer_details
+"""
+Ticket parsers. Only parsers.ticket is imported up front; the GML and TXT
+readers (and geopandas with them) load on first use of one of their names
+or when parse_ticket meets their suffix.
+"""
+import importlib
+
+from .ticket import Ticket, parse_ticket, register_parser
+
+# public name -> submodule that defines it
+_LAZY = {
+    "read_and_reproject": "gml_parser",
+    "read_gml_ticket": "gml_parser",
+    "parse_ticket_txt": "txt_parser",
+    "read_txt_ticket": "txt_parser",
+    "parse_customer_details": "txt_parser",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(importlib.import_module(f".{_LAZY[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
-    "read_and_reproject", "buffer_gdf",
-    "parse_ticket_txt", "parse_customer_details"
-]
\ No newline at end of file
+    "Ticket", "parse_ticket", "register_parser",
+    "read_and_reproject", "read_gml_ticket",
+    "parse_ticket_txt", "read_txt_ticket", "parse_customer_details"
+]
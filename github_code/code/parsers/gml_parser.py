@@ -1,45 +1,244 @@
 # parsers/gml_parser.py
-import geopandas as gpd
-from shapely.ops import unary_union
+import re
+import xml.etree.ElementTree as ET
+from functools import lru_cache
 from pathlib import Path
+from typing import List, Optional, Tuple
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from pyproj import CRS
+from pyproj.exceptions import CRSError
+
+from parsers.ticket import Ticket, register_parser
+from parsers.txt_parser import parse_customer_details
+
+GML_NAMESPACES = ("http://www.opengis.net/gml", "http://www.opengis.net/gml/3.2")
+
+# GML geometry elements the fast reader builds itself; any other GML geometry
+# (curves with arcs, surfaces with patches, solids, ...) goes to OGR.
+_SIMPLE = ("Point", "LineString", "LinearRing", "Polygon")
+_MULTI = {
+    "MultiPoint": "Point",
+    "MultiLineString": "LineString",
+    "MultiCurve": "LineString",
+    "MultiPolygon": "Polygon",
+    "MultiSurface": "Polygon",
+}
+_OTHER_GEOMETRY = (
+    "Curve", "Surface", "PolygonPatch", "CompositeCurve", "CompositeSurface", "OrientableCurve",
+    "OrientableSurface", "MultiGeometry", "Solid", "MultiSolid", "Arc", "Circle", "Ring",
+)
+_EPSG_RE = re.compile(r"EPSG(?:/0/|::|:[^:]*:)(\d+)$", re.IGNORECASE)
+_SHORT_SRS_RE = re.compile(r"(?:EPSG:|http://www\.opengis\.net/gml/srs/epsg\.xml#)(\d+)", re.IGNORECASE)
+
+
+class _Unsupported(Exception):
+    """The file uses GML the fast reader doesn't handle; OGR reads it instead."""
+
+
+def _local(tag: str) -> Tuple[str, str]:
+    if tag.startswith("{"):
+        ns, _, name = tag[1:].partition("}")
+        return ns, name
+    return "", tag
+
+
+@lru_cache(maxsize=16)
+def _srs_axes(srs_name: str) -> Tuple[int, bool]:
+    """
+    EPSG code of a GML srsName and whether its coordinates come northing
+    first. URN/URL forms (urn:ogc:def:crs:EPSG::4326) follow the EPSG axis
+    order, lat/lon for 4326; "EPSG:4326" and GML 2's ...epsg.xml#4326 are
+    x/y, as OGR reads them. A code pyproj doesn't know is _Unsupported.
+    """
+    name = srs_name.strip()
+    short = _SHORT_SRS_RE.fullmatch(name)
+    m = short or _EPSG_RE.search(name)
+    if not m:
+        raise _Unsupported(f"srsName {srs_name!r}")
+    code = int(m.group(1))
+    try:
+        crs = CRS.from_epsg(code)
+    except CRSError as exc:  # a RuntimeError, not a ValueError
+        raise _Unsupported(f"srsName {srs_name!r}: {exc}") from exc
+    return code, not short and crs.axis_info[0].direction.lower() in ("north", "south")
+
+
+def _coords(elem: ET.Element, swap: bool) -> np.ndarray:
+    """
+    Coordinate array of a Point/LineString/LinearRing element
+    (gml:posList, gml:pos or GML 2 gml:coordinates).
+    """
+    dim = int(elem.get("srsDimension", 2))
+    rows: List[np.ndarray] = []
+    for child in elem:
+        ns, tag = _local(child.tag)
+        text = (child.text or "").strip()
+        if tag == "posList":
+            d = int(child.get("srsDimension", dim))
+            rows.append(np.array(text.split(), dtype=float).reshape(-1, d))
+        elif tag == "pos":
+            rows.append(np.array(text.split(), dtype=float).reshape(1, -1))
+        elif tag == "coordinates":
+            cs, ts = child.get("cs", ","), child.get("ts", " ")
+            tuples = [t.split(cs) for t in text.split(ts if ts.strip() else None)]
+            rows.append(np.array(tuples, dtype=float))
+        elif ns in GML_NAMESPACES and tag in ("coord", "pointProperty", "pointRep"):
+            raise _Unsupported(f"gml:{tag}")
+    if not rows:
+        raise _Unsupported(f"no coordinates in gml:{_local(elem.tag)[1]}")
+    xy = np.vstack(rows) if len(rows) > 1 else rows[0]
+    if swap:
+        xy = xy.copy()
+        xy[:, [0, 1]] = xy[:, [1, 0]]
+    return xy
+
+
+def _members(elem: ET.Element, kind: str) -> List[ET.Element]:
+    found = []
+    for member in elem.iter():
+        ns, tag = _local(member.tag)
+        if member is elem or ns not in GML_NAMESPACES:
+            continue
+        if tag in _OTHER_GEOMETRY or tag in _MULTI:
+            raise _Unsupported(f"gml:{tag} inside gml:{_local(elem.tag)[1]}")
+        if tag == kind:
+            found.append(member)
+    return found
+
+
+def _polygon(elem: ET.Element, swap: bool) -> shapely.Polygon:
+    shell, holes = None, []
+    for boundary in elem:
+        _, tag = _local(boundary.tag)
+        rings = [r for r in boundary if _local(r.tag)[1] == "LinearRing"]
+        if len(rings) != 1:
+            raise _Unsupported(f"gml:{tag} without one gml:LinearRing")
+        ring = _coords(rings[0], swap)
+        if tag in ("exterior", "outerBoundaryIs"):
+            shell = ring
+        elif tag in ("interior", "innerBoundaryIs"):
+            holes.append(ring)
+    if shell is None:
+        raise _Unsupported("gml:Polygon without an exterior")
+    return shapely.Polygon(shell, holes)
+
+
+def _geometry(elem: ET.Element, swap: bool):
+    _, tag = _local(elem.tag)
+    if tag == "Point":
+        return shapely.Point(_coords(elem, swap)[0])
+    if tag in ("LineString", "LinearRing"):
+        return shapely.LineString(_coords(elem, swap))
+    if tag == "Polygon":
+        return _polygon(elem, swap)
+    kind = _MULTI[tag]
+    parts = [_geometry(m, swap) for m in _members(elem, kind)]
+    if kind == "Point":
+        return shapely.MultiPoint(parts)
+    if kind == "LineString":
+        return shapely.MultiLineString(parts)
+    return shapely.MultiPolygon(parts)
+
+
+def read_gml_fast(gml_path: Path) -> Optional[gpd.GeoDataFrame]:
+    """
+    Read the geometries of a simple-features GML ticket (GML 2 or 3, one CRS)
+    in one streaming pass, without GDAL.
+
+    Each top-level geometry of a feature becomes one row; attributes are not
+    read (the pipeline only uses the work-area geometry).
+
+    Args:
+        gml_path: Path to the .gml file.
+
+    Returns:
+        GeoDataFrame in the file's CRS, or None if the file uses GML this
+        reader doesn't handle (read_and_reproject then uses OGR).
+    """
+    geoms, srs_names = [], set()
+    default_srs = None  # srsName of the collection's envelope
+    depth = 0           # nesting inside a geometry or gml:boundedBy
+    try:
+        for event, elem in ET.iterparse(str(gml_path), events=("start", "end")):
+            ns, tag = _local(elem.tag)
+            if ns not in GML_NAMESPACES:
+                continue
+            nested = tag in _SIMPLE or tag in _MULTI or tag in _OTHER_GEOMETRY or tag == "boundedBy"
+            if event == "start":
+                if tag == "Envelope" and default_srs is None and elem.get("srsName"):
+                    default_srs = elem.get("srsName")
+                depth += nested
+                continue
+            depth -= nested
+            if depth or tag not in _SIMPLE and tag not in _MULTI:
+                if depth == 0 and tag in _OTHER_GEOMETRY:
+                    raise _Unsupported(f"gml:{tag}")
+                continue
+            srs = elem.get("srsName") or default_srs
+            if srs is None:
+                raise _Unsupported("geometry without srsName")
+            geoms.append(_geometry(elem, _srs_axes(srs)[1]))
+            srs_names.add(srs)
+            elem.clear()
+        codes = {_srs_axes(s)[0] for s in srs_names}
+    except (_Unsupported, ET.ParseError, ValueError):
+        return None
+
+    if not geoms or len(codes) != 1:
+        return None
+    return gpd.GeoDataFrame(geometry=geoms, crs=f"EPSG:{codes.pop()}")
+
 
 def read_and_reproject(gml_path: Path) -> gpd.GeoDataFrame:
     """
     Read a GML file into a GeoDataFrame and reproject to EPSG:4326 if needed.
 
+    Simple-features GML (the OneCall tickets) is parsed directly by
+    read_gml_fast(); anything else goes through GDAL/OGR.
+
     Args:
         gml_path: Path to the .gml file.
 
     Returns:
         GeoDataFrame in EPSG:4326.
     """
-    gdf = gpd.read_file(gml_path)
+    gdf = read_gml_fast(gml_path)
+    if gdf is None:
+        gdf = gpd.read_file(gml_path)
     if gdf.crs and gdf.crs.to_epsg() != 4326:
         gdf = gdf.to_crs(epsg=4326)
     return gdf
 
 
-def buffer_gdf(gdf: gpd.GeoDataFrame, pct: float = 0.04) -> gpd.GeoDataFrame:
+def _coordinate(lon: Optional[str], lat: Optional[str]) -> Optional[Tuple[float, float]]:
+    try:
+        return float(lon), float(lat)
+    except (TypeError, ValueError):
+        return None
+
+
+@register_parser(".gml")
+def read_gml_ticket(gml_path: Path, xml_path: Optional[Path] = None) -> Ticket:
     """
-    Create a buffer around the union of all geometries in gdf.
+    Parse a GML ticket and its OneCall XML (customer and reference coordinate).
 
     Args:
-        gdf: GeoDataFrame to buffer.
-        pct: Fraction of the max span (in degrees or projection units) to use as buffer distance.
+        gml_path: Path to the .gml file.
+        xml_path: OneCall XML; defaults to the .xml next to the ticket.
 
     Returns:
-        A new GeoDataFrame containing the buffered polygon.
-    """
-    # 1) Union all geometries
-    union_geom = unary_union(gdf.geometry)
-    # 2) Compute span
-    minx, miny, maxx, maxy = gdf.total_bounds
-    dx, dy = maxx - minx, maxy - miny
-    # 3) Determine buffer distance
-    if gdf.crs.is_geographic:
-        dist = max(dx, dy) * pct
-    else:
-        dist = max(dx, dy) * pct
-    # 4) Buffer and wrap in GeoDataFrame
-    buffered = union_geom.buffer(dist)
-    return gpd.GeoDataFrame(geometry=[buffered], crs=gdf.crs)
+        The Ticket, with work_area in EPSG:4326.
+    """
+    gml_path = Path(gml_path)
+    work_area = read_and_reproject(gml_path)
+    xml_path = Path(xml_path) if xml_path is not None else gml_path.with_suffix(".xml")
+    if not xml_path.exists():
+        return Ticket(path=gml_path, kind="gml", work_area=work_area)
+    name, email, lon, lat = parse_customer_details(xml_path)
+    return Ticket(
+        path=gml_path, kind="gml", work_area=work_area, xml_path=xml_path,
+        customer_name=name, customer_email=email, reference=_coordinate(lon, lat),
+    )
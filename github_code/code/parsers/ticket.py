@@ -0,0 +1,102 @@
+# parsers/ticket.py
+"""
+The parsed ticket record every pipeline stage works from, and the registry
+of parsers that build it.
+
+A ticket file is read exactly once, by the parser registered for its suffix
+(parsers.gml_parser for .gml, parsers.txt_parser for .txt). The resulting
+Ticket carries everything later stages need (work area, buffer once
+computed, customer and reference coordinate), so nothing re-reads the
+ticket or its OneCall XML. It is slotted and small, so batch mode can ship
+it to pool processes cheaply.
+
+The built-in parsers are imported the first time a ticket of their suffix is
+parsed, so importing this module does not pull in geopandas.
+"""
+import importlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    import geopandas as gpd
+
+
+@dataclass(slots=True)
+class Ticket:
+    """
+    One parsed ticket.
+
+    Attributes:
+        path: The staged ticket file.
+        kind: Parser that read it ('gml' or 'txt').
+        work_area: Work-area geometry in EPSG:4326.
+        buffer: Buffered work area (filled in by prepare_ticket).
+        xml_path: Companion OneCall XML of a GML ticket, if any.
+        customer_name: Caller's name, if the ticket has one.
+        customer_email: Caller's email, if the ticket has one.
+        reference: Reference coordinate (lon, lat) quoted in the draft.
+        fields: Every 'key: value' line of a TXT ticket.
+    """
+    path: Path
+    kind: str
+    work_area: "gpd.GeoDataFrame"
+    buffer: Optional["gpd.GeoDataFrame"] = None
+    xml_path: Optional[Path] = None
+    customer_name: Optional[str] = None
+    customer_email: Optional[str] = None
+    reference: Optional[Tuple[float, float]] = None
+    fields: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def stem(self) -> str:
+        return self.path.stem
+
+
+TicketParser = Callable[[Path, Optional[Path]], Ticket]
+
+# lower-case suffix -> parser; filled in by register_parser
+PARSERS: Dict[str, TicketParser] = {}
+
+# suffix -> module whose import registers its parser
+BUILTIN_PARSERS: Dict[str, str] = {
+    ".gml": "parsers.gml_parser",
+    ".txt": "parsers.txt_parser",
+}
+
+
+def register_parser(suffix: str) -> Callable[[TicketParser], TicketParser]:
+    """
+    Decorator registering a ticket parser for files ending in suffix.
+
+    A parser takes (ticket_path, xml_path) and returns a Ticket.
+    """
+    def decorator(fn: TicketParser) -> TicketParser:
+        PARSERS[suffix.lower()] = fn
+        return fn
+    return decorator
+
+
+def parse_ticket(ticket_path: Path, xml_path: Optional[Path] = None) -> Ticket:
+    """
+    Parse a ticket file with the parser registered for its suffix.
+
+    Args:
+        ticket_path: Staged .gml or .txt ticket.
+        xml_path: Companion OneCall XML (GML tickets); looked up next to
+                  the ticket if None.
+
+    Returns:
+        The parsed Ticket (buffer not yet computed).
+
+    Raises:
+        ValueError: If no parser handles the file's suffix.
+    """
+    ticket_path = Path(ticket_path)
+    suffix = ticket_path.suffix.lower()
+    if suffix not in PARSERS and suffix in BUILTIN_PARSERS:
+        importlib.import_module(BUILTIN_PARSERS[suffix])
+    parser = PARSERS.get(suffix)
+    if parser is None:
+        raise ValueError(f"No ticket parser for {ticket_path.name}")
+    return parser(ticket_path, xml_path)
@@ -1,8 +1,16 @@
 # parsers/txt_parser.py
+import math
 import xml.etree.ElementTree as ET
 from pathlib import Path
 from typing import Tuple, Dict, Optional
 
+import geopandas as gpd
+from shapely.geometry import box
+
+from parsers.ticket import Ticket, register_parser
+
+MIN_SIZE_M = 30  # Minimum dimension in meters for txt workflow
+
 def parse_ticket_txt(txt_path: Path) -> Tuple[Dict[str, str], Tuple[float, float], Tuple[float, float]]:
     """
     Parse a Diggers/IUPPS ticket TXT for caller info and two coordinate pairs.
@@ -26,23 +34,103 @@ def parse_ticket_txt(txt_path: Path) -> Tuple[Dict[str, str], Tuple[float, float
     return info, (lon1, lat1), (lon2, lat2)
 
 
+def enforce_min_size_deg(geom):
+    """
+    Ensures that the geometry bounding box has at least MIN_SIZE_M meters
+    in both dimensions by expanding it if necessary.
+    """
+    minx, miny, maxx, maxy = geom.bounds
+    center_lat = (miny + maxy) / 2.0
+
+    # degrees per meter approximations
+    deg_per_m_lat = 1.0 / 111_320
+    deg_per_m_lon = 1.0 / (111_320 * math.cos(math.radians(center_lat)))
+
+    width_deg = maxx - minx
+    height_deg = maxy - miny
+
+    req_w = MIN_SIZE_M * deg_per_m_lon
+    req_h = MIN_SIZE_M * deg_per_m_lat
+
+    expand_x = max(0, (req_w - width_deg) / 2.0)
+    expand_y = max(0, (req_h - height_deg) / 2.0)
+
+    return box(
+        minx - expand_x,
+        miny - expand_y,
+        maxx + expand_x,
+        maxy + expand_y,
+    )
+
+
+@register_parser(".txt")
+def read_txt_ticket(txt_path: Path, xml_path: Optional[Path] = None) -> Ticket:
+    """
+    Parse a Diggers/IUPPS TXT ticket; the work area is the box spanned by
+    its two coordinates, grown to at least MIN_SIZE_M on each side.
+
+    Args:
+        txt_path: Path to the .txt ticket.
+        xml_path: Unused (TXT tickets have no companion XML).
+
+    Returns:
+        The Ticket, with work_area in EPSG:4326.
+    """
+    txt_path = Path(txt_path)
+    info, coord1, coord2 = parse_ticket_txt(txt_path)
+    minx, maxx = sorted([coord1[0], coord2[0]])
+    miny, maxy = sorted([coord1[1], coord2[1]])
+    poly = enforce_min_size_deg(box(minx, miny, maxx, maxy))
+    return Ticket(
+        path=txt_path, kind="txt",
+        work_area=gpd.GeoDataFrame(geometry=[poly], crs="EPSG:4326"),
+        customer_name=info.get('Name') or info.get('Caller') or None,
+        customer_email=info.get('Email') or None,
+        reference=coord1,
+        fields=info,
+    )
+
+
+ONECALL_NS = "{http://www.pelicancorp.com/onecall}"
+
+# OneCall section -> child element -> position in parse_customer_details' tuple
+_CUSTOMER_FIELDS = {
+    "CustomerDetails": {"Name": 0, "EmailAddress": 1},
+    "LocationDetails": {"Longitude": 2, "Latitude": 3},
+}
+
+
 def parse_customer_details(xml_file: Path) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
     """
     Parse OneCall XML for customer name, email, longitude, latitude.
 
+    The file is streamed and reading stops once both sections have been
+    seen, so the rest of a large ticket XML is never parsed.
+
     Returns:
         (name, email, lon, lat) or (None, None, None, None) on error.
     """
+    values: list = [None, None, None, None]
+    remaining = set(_CUSTOMER_FIELDS)
     try:
-        tree = ET.parse(xml_file)
-        root = tree.getroot()
-        ns = {'onecall': 'http://www.pelicancorp.com/onecall'}
-        cust = root.find('onecall:CustomerDetails', ns)
-        loc = root.find('onecall:LocationDetails', ns)
-        name = cust.find('onecall:Name', ns).text if cust is not None else None
-        email = cust.find('onecall:EmailAddress', ns).text if cust is not None else None
-        lon = loc.find('onecall:Longitude', ns).text if loc is not None else None
-        lat = loc.find('onecall:Latitude', ns).text if loc is not None else None
-        return name, email, lon, lat
+        depth = 0
+        for event, elem in ET.iterparse(str(xml_file), events=("start", "end")):
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            tag = elem.tag[len(ONECALL_NS):] if elem.tag.startswith(ONECALL_NS) else None
+            # sections are children of the root element (depth 1 once closed)
+            if depth != 1 or tag not in remaining:
+                continue
+            for child in elem:
+                if child.tag.startswith(ONECALL_NS):
+                    i = _CUSTOMER_FIELDS[tag].get(child.tag[len(ONECALL_NS):])
+                    if i is not None and values[i] is None:
+                        values[i] = child.text
+            remaining.discard(tag)
+            if not remaining:
+                break
+        return tuple(values)
     except Exception:
         return None, None, None, None
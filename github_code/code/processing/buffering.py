@@ -0,0 +1,192 @@
+# processing/buffering.py
+"""
+Fixed-distance work-area buffering in a local metric CRS.
+
+The ticket geometry is projected once to the UTM zone of its centre
+(transformers are cached per zone), optionally simplified, and buffered by a
+distance in metres (BUFFER.WorkArea, e.g. "15m") in a single GEOS call rather
+than unioning every feature first. With more than one worker thread, long
+pipeline-route lines are split into contiguous chunks, buffered in parallel
+(shapely releases the GIL) and merged with a cascaded union before projecting
+back. Polygons are always buffered whole: decomposing them into rings costs
+more than buffering them once.
+"""
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from pyproj import CRS, Transformer
+
+DEFAULT_BUFFER_M = 15.0
+
+# Lines with more vertices than this are cut into chunks of at most this
+# size and buffered across worker threads (only when there is more than one);
+# everything else takes one GEOS call. A chunked single thread is no faster
+# (see benchmarks.bench_pipeline --corridor-vertices).
+CHUNK_VERTICES = 20_000
+
+_UNITS_TO_M = {"": 1.0, "m": 1.0, "km": 1000.0, "ft": 0.3048, "feet": 0.3048, "mi": 1609.344}
+_DISTANCE_RE = re.compile(r"^\s*([0-9]*\.?[0-9]+)\s*([a-z]*)\s*$", re.IGNORECASE)
+
+
+def parse_distance(value, default: float = DEFAULT_BUFFER_M) -> float:
+    """
+    Parse a config distance such as "15m", "50 ft" or 15 into metres.
+
+    Args:
+        value: Distance with an optional unit (m, km, ft/feet, mi); bare numbers are metres.
+        default: Returned when value is None or empty.
+
+    Returns:
+        The distance in metres.
+
+    Raises:
+        ValueError: If the value or its unit can't be understood.
+    """
+    if value is None or str(value).strip() == "":
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    m = _DISTANCE_RE.match(str(value))
+    if not m or m.group(2).lower() not in _UNITS_TO_M:
+        raise ValueError(f"Invalid distance: {value!r}")
+    return float(m.group(1)) * _UNITS_TO_M[m.group(2).lower()]
+
+
+def buffer_settings(cfg) -> Tuple[float, float, int]:
+    """
+    Read (distance_m, simplify_m, workers) from the BUFFER config section.
+    """
+    sec = cfg["BUFFER"] if "BUFFER" in cfg else {}
+    distance = parse_distance(sec.get("WorkArea"))
+    simplify = parse_distance(sec.get("Simplify"), default=0.0)
+    workers = int(sec.get("Workers", 0) or 0)
+    return distance, simplify, workers
+
+
+def utm_epsg(lon: float, lat: float) -> int:
+    """
+    EPSG code of the WGS 84 UTM zone containing (lon, lat).
+    """
+    zone = min(int((lon + 180.0) // 6.0) + 1, 60)
+    return (32600 if lat >= 0 else 32700) + zone
+
+
+@lru_cache(maxsize=16)
+def get_transformers(src_crs: str, epsg: int) -> Tuple[Transformer, Transformer]:
+    """
+    Cached (forward, inverse) transformer pair between src_crs and an EPSG code
+    (a UTM zone for buffering). Building a Transformer costs far more than
+    using one, and consecutive tickets almost always share a zone.
+    """
+    src = CRS.from_user_input(src_crs)
+    dst = CRS.from_epsg(epsg)
+    return (
+        Transformer.from_crs(src, dst, always_xy=True),
+        Transformer.from_crs(dst, src, always_xy=True),
+    )
+
+
+def _apply(transformer: Transformer, geoms: np.ndarray) -> np.ndarray:
+    def fn(xy: np.ndarray) -> np.ndarray:
+        x, y = transformer.transform(xy[:, 0], xy[:, 1])
+        return np.column_stack([x, y])
+    return shapely.transform(geoms, fn)
+
+
+def _split_line(coords: np.ndarray, size: int) -> list:
+    """
+    Split a coordinate run into lines of at most `size` vertices sharing end points.
+    """
+    step = max(size - 1, 1)
+    return [shapely.linestrings(coords[i:i + size]) for i in range(0, max(len(coords) - 1, 1), step)]
+
+
+def _long_lines(geoms: np.ndarray) -> Tuple[list, list]:
+    """
+    Split geometries into (coordinates of lines over CHUNK_VERTICES, everything else).
+    """
+    long, rest = [], []
+    for part in shapely.get_parts(geoms):
+        if shapely.get_type_id(part) in (1, 2) and shapely.get_num_coordinates(part) > CHUNK_VERTICES:
+            long.append(shapely.get_coordinates(part))  # LineString, LinearRing
+        else:
+            rest.append(part)
+    return long, rest
+
+
+def chunked_buffer(lines: list, rest: list, distance: float, workers: int) -> shapely.Geometry:
+    """
+    Buffer long lines as contiguous chunks across `workers` threads, together
+    with the remaining geometries in one more call, and merge the results.
+
+    Args:
+        lines: Coordinate arrays of the long lines.
+        rest: Other geometries (polygons, short lines, points), buffered whole.
+        distance: Buffer distance in the geometries' units.
+        workers: Threads to buffer with.
+    """
+    total = sum(len(c) for c in lines)
+    size = max(min(CHUNK_VERTICES, -(-total // workers) + 1), 2)
+    pieces = [piece for coords in lines for piece in _split_line(coords, size)]
+    if rest:
+        pieces.append(shapely.geometrycollections(rest))
+    with ThreadPoolExecutor(max_workers=min(workers, len(pieces)), thread_name_prefix="buffer") as pool:
+        buffered = list(pool.map(lambda g: shapely.buffer(g, distance), pieces))
+    return shapely.union_all(np.asarray(buffered, dtype=object))
+
+
+def corridor_buffer(
+    gdf: gpd.GeoDataFrame,
+    distance_m: float = DEFAULT_BUFFER_M,
+    simplify_m: float = 0.0,
+    workers: Optional[int] = None
+) -> gpd.GeoDataFrame:
+    """
+    Buffer every geometry in gdf by a fixed distance in metres and merge them.
+
+    Args:
+        gdf: Work-area geometries (any CRS; EPSG:4326 for tickets).
+        distance_m: Buffer distance in metres (BUFFER.WorkArea).
+        simplify_m: Douglas-Peucker tolerance in metres applied before
+                    buffering; 0 disables it (BUFFER.Simplify).
+        workers: Threads for buffering long lines in chunks (BUFFER.Workers);
+                 defaults to the CPU count. With 1, everything is buffered
+                 in one call.
+
+    Returns:
+        A single-row GeoDataFrame holding the buffer polygon, in gdf's CRS.
+    """
+    crs = CRS.from_user_input(gdf.crs or "EPSG:4326")
+    keep = ~(gdf.geometry.isna() | gdf.geometry.is_empty).to_numpy()
+    geoms = np.asarray(gdf.geometry.values[keep], dtype=object)
+    if len(geoms) == 0:
+        return gpd.GeoDataFrame(geometry=[shapely.Polygon()], crs=crs)
+
+    # 1) Project to the UTM zone of the work area's centre
+    minx, miny, maxx, maxy = shapely.total_bounds(geoms)
+    cx, cy = (minx + maxx) / 2, (miny + maxy) / 2
+    if not crs.is_geographic:
+        cx, cy = get_transformers(crs.to_string(), 4326)[0].transform(cx, cy)
+    to_metric, from_metric = get_transformers(crs.to_string(), utm_epsg(cx, cy))
+    metric = _apply(to_metric, geoms)
+
+    # 2) Optional simplification
+    if simplify_m > 0:
+        metric = shapely.simplify(metric, simplify_m, preserve_topology=True)
+
+    # 3) Buffer: one GEOS call, or long lines in chunks across threads
+    workers = workers or os.cpu_count() or 1
+    lines, rest = _long_lines(metric) if workers > 1 else ([], None)
+    if lines:
+        merged = chunked_buffer(lines, rest, distance_m, workers)
+    else:
+        merged = shapely.buffer(shapely.geometrycollections(list(metric)), distance_m)
+
+    # 4) Back to the input CRS
+    return gpd.GeoDataFrame(geometry=[_apply(from_metric, np.array([merged]))[0]], crs=crs)
@@ -0,0 +1,132 @@
+# processing/classify.py
+"""
+Config-driven attribute classification (structure symbols, cable style classes).
+
+Rules live in the CLASSIFY section of config.json, keyed by layer and then by
+the output column they fill:
+
+    "CLASSIFY": {
+      "STRUCTURE": {
+        "symbol": {
+          "default": "?",
+          "rules": [
+            {"when": {"subtypecod": 3, "owner": "everstream"}, "value": "H"},
+            {"when": {"subtypecod": 3}, "value": "V"}
+          ]
+        }
+      }
+    }
+
+Each rule matches when every field in "when" matches (numbers and lists of
+numbers compare numerically, strings are case-insensitive substrings, lists of
+strings match any of them). The first matching rule wins; rows that match
+nothing get "default". Rules are compiled once and evaluated column-wise with
+NumPy, so the cost no longer grows with a Python call per feature.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.constants import DEFAULT_CLASSIFY
+
+# (field, kind, operand) where kind is 'num' or 'str'
+Condition = Tuple[str, str, Any]
+# (conditions, value)
+Rule = Tuple[List[Condition], Any]
+# output column -> (default, rules)
+LayerRules = Dict[str, Tuple[Any, List[Rule]]]
+
+
+def _compile_condition(field: str, operand: Any) -> Condition:
+    values = operand if isinstance(operand, list) else [operand]
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return field, "num", [float(v) for v in values]
+    return field, "str", [str(v).lower() for v in values]
+
+
+def compile_rules(spec: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, LayerRules]:
+    """
+    Compile a CLASSIFY spec into per-layer rule tables.
+
+    Args:
+        spec: Mapping of layer name -> output column -> {"default", "rules"}.
+              Layers missing from spec fall back to DEFAULT_CLASSIFY.
+
+    Returns:
+        Dict mapping upper-cased layer name to its compiled rules.
+    """
+    merged = {k.upper(): v for k, v in DEFAULT_CLASSIFY.items()}
+    for layer, columns in (spec or {}).items():
+        merged[str(layer).upper()] = columns
+
+    compiled: Dict[str, LayerRules] = {}
+    for layer, columns in merged.items():
+        compiled[layer] = {}
+        for column, table in columns.items():
+            rules = [
+                ([_compile_condition(f, v) for f, v in rule.get("when", {}).items()], rule["value"])
+                for rule in table.get("rules", [])
+            ]
+            compiled[layer][column] = (table.get("default", ""), rules)
+    return compiled
+
+
+def load_rules(cfg) -> Dict[str, LayerRules]:
+    """
+    Compile the CLASSIFY section of a loaded config (defaults if absent).
+    """
+    spec = dict(cfg["CLASSIFY"]) if "CLASSIFY" in cfg else None
+    return compile_rules(spec)
+
+
+def classify(layer: str, gdf: pd.DataFrame, rules: Optional[Dict[str, LayerRules]] = None) -> pd.DataFrame:
+    """
+    Add the classification columns configured for `layer` to gdf (in place).
+
+    Args:
+        layer: Layer key (e.g. 'STRUCTURE').
+        gdf: Clipped layer.
+        rules: Output of compile_rules()/load_rules(); defaults if None.
+
+    Returns:
+        The same DataFrame, for chaining.
+    """
+    if rules is None:
+        rules = compile_rules()
+    layer_rules = rules.get(layer.upper(), {})
+    if not layer_rules:
+        return gdf
+
+    # Normalise each referenced field once, however many rules use it.
+    num_cache: Dict[str, np.ndarray] = {}
+    str_cache: Dict[str, pd.Series] = {}
+
+    def _mask(cond: Condition) -> np.ndarray:
+        field, kind, values = cond
+        if field not in gdf.columns:
+            return np.zeros(len(gdf), dtype=bool)
+        if kind == "num":
+            if field not in num_cache:
+                num_cache[field] = pd.to_numeric(gdf[field], errors="coerce").fillna(0).to_numpy()
+            return np.isin(num_cache[field], values)
+        if field not in str_cache:
+            str_cache[field] = gdf[field].astype(str).str.lower()
+        col = str_cache[field]
+        mask = np.zeros(len(gdf), dtype=bool)
+        for v in values:
+            mask |= col.str.contains(v, regex=False).to_numpy()
+        return mask
+
+    for column, (default, table) in layer_rules.items():
+        if not table:
+            gdf[column] = default
+            continue
+        conds = []
+        for conditions, _ in table:
+            mask = np.ones(len(gdf), dtype=bool)
+            for cond in conditions:
+                mask &= _mask(cond)
+            conds.append(mask)
+        gdf[column] = np.select(conds, [value for _, value in table], default=default)
+    return gdf
@@ -1,87 +1,228 @@
 import geopandas as gpd
+import numpy as np
 import pandas as pd
+import shapely
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
+from processing.classify import classify, compile_rules
+from processing.layer_cache import load_layer
+from utils.tracing import span
 
-def clip_shapefile(name: str, shp_path: Path, buf_gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+if TYPE_CHECKING:
+    from processing.layer_store import LayerStore
+
+
+def clip_shapefile(
+    name: str,
+    shp_path: Path,
+    buf_gdf: gpd.GeoDataFrame,
+    cache_dir: Optional[Path] = None,
+    rules: Optional[dict] = None,
+    exact_lines: bool = True,
+    budget_mb: Optional[float] = None
+) -> gpd.GeoDataFrame:
     """
     Load and clip a single shapefile to the provided buffer area.
 
     Steps:
-      1. Read via GeoPandas (with fallback for Latin-1 encoding).
-      2. Reproject to EPSG:4326 if needed.
-      3. Filter on locate_tog == 'Locate' for CONDUIT and STRUCTURE.
-      4. Clip to buf_gdf.
-      5. For STRUCTURE: coerce subtypecod to int and assign a symbol.
+      1-3. Load the prepared layer (decoded, reprojected to EPSG:4326,
+           locate_tog-filtered, validity-repaired), from cache if enabled,
+           reading only records within the buffer's bounding box.
+      4. Clip to buf_gdf (see two_phase_clip).
+      5. Coerce STRUCTURE subtypecod to int and add classification
+         columns (symbol, style_class) from the CLASSIFY rules.
       6. Convert any datetime columns to ISO-8601 strings.
 
     Args:
         name: The layer key (e.g., 'CONDUIT', 'STRUCTURE', 'FIBERCABLE').
         shp_path: Path to the shapefile.
         buf_gdf: GeoDataFrame containing the buffer polygon.
+        cache_dir: Layer cache directory (see processing.layer_cache), or None.
+        rules: Compiled classification rules (processing.classify); defaults if None.
+        exact_lines: Cut line/polygon features at the buffer edge; if False,
+                     every intersecting feature is kept whole.
+        budget_mb: Process memory budget (MEMORY.budget_mb); see load_layer.
 
     Returns:
         A clipped GeoDataFrame with any additional columns (e.g. 'symbol').
     """
-    # 1) Load with fallback
-    try:
-        gdf = gpd.read_file(shp_path)
-    except UnicodeDecodeError:
-        gdf = gpd.read_file(shp_path, engine="fiona", encoding="latin-1")
+    # 1-3) Load, reproject, filter (only records near the buffer are read)
+    with span("load", layer=name):
+        gdf = load_layer(name, shp_path, cache_dir, bbox=tuple(buf_gdf.total_bounds), budget_mb=budget_mb)
+
+    # 4-6) Clip and post-process
+    return clip_layer(name, gdf, buf_gdf, rules, exact_lines)
+
+
+def two_phase_clip(gdf: gpd.GeoDataFrame, buf_gdf: gpd.GeoDataFrame, exact_lines: bool = True) -> gpd.GeoDataFrame:
+    """
+    Clip a layer to the buffer polygon, touching only features near it.
 
-    # 2) Reproject if needed
-    if gdf.crs and gdf.crs.to_epsg() != 4326:
-        gdf = gdf.to_crs(epsg=4326)
+    Phase 1 queries the layer's STRtree with the buffer polygon: a bounding-box
+    search followed by a vectorized exact `intersects` test, which is already
+    the final answer for point layers such as STRUCTURE. Phase 2 computes the
+    exact intersection only for line/polygon candidates that cross the buffer
+    edge; features fully inside are kept as they are. With exact_lines=False
+    phase 2 is skipped and intersecting features are kept whole; the feature
+    set is the same either way.
 
-    # 3) Filter locate_tog
-    if name in ("CONDUIT", "STRUCTURE") and "locate_tog" in gdf.columns:
-        gdf = gdf[gdf["locate_tog"] == "Locate"]
+    Args:
+        gdf: Prepared layer in EPSG:4326.
+        buf_gdf: GeoDataFrame containing the buffer polygon.
+        exact_lines: Cut line/polygon features at the buffer edge.
 
-    # 4) Clip to buffer
-    clipped = gpd.clip(gdf, buf_gdf).copy()
+    Returns:
+        The features of gdf that intersect the buffer, in their original order.
+    """
+    if gdf.empty:
+        return gdf.copy()
 
-    # 5) STRUCTURE-specific symbol logic
+    area = buf_gdf.geometry.union_all()
+    shapely.prepare(area)
+
+    # Phase 1: index candidates + exact predicate
+    idx = np.sort(gdf.sindex.query(area, predicate="intersects"))
+    hits = gdf.iloc[idx].copy()
+    if hits.empty or not exact_lines:
+        return hits
+
+    # Phase 2: cut only the non-point features that cross the boundary
+    geoms = hits.geometry.values
+    is_point = np.isin(shapely.get_type_id(geoms), (0, 4))  # Point, MultiPoint
+    crossing = ~is_point & ~shapely.within(geoms, area)
+    if crossing.any():
+        cut = shapely.intersection(geoms[crossing], area)
+        hits.loc[hits.index[crossing], hits.geometry.name] = cut
+        hits = hits[~hits.geometry.is_empty]
+    return hits
+
+
+def clip_layer(
+    name: str,
+    gdf: gpd.GeoDataFrame,
+    buf_gdf: gpd.GeoDataFrame,
+    rules: Optional[dict] = None,
+    exact_lines: bool = True
+) -> gpd.GeoDataFrame:
+    """
+    Clip an already prepared layer to the buffer and add per-layer columns.
+
+    Args:
+        name: The layer key (e.g., 'CONDUIT', 'STRUCTURE', 'FIBERCABLE').
+        gdf: Prepared layer in EPSG:4326 (see processing.layer_cache.prepare_layer).
+        buf_gdf: GeoDataFrame containing the buffer polygon.
+        rules: Compiled classification rules (processing.classify); defaults if None.
+        exact_lines: Cut line/polygon features at the buffer edge (see two_phase_clip).
+
+    Returns:
+        A clipped GeoDataFrame with any additional columns (e.g. 'symbol').
+    """
+    # 4) Clip to buffer (index prefilter, exact cut only where needed)
+    with span("clip", layer=name, candidates=len(gdf)):
+        clipped = two_phase_clip(gdf, buf_gdf, exact_lines)
+    with span("map_columns", layer=name, features=len(clipped)):
+        return add_map_columns(name, clipped, rules)
+
+
+def add_map_columns(name: str, gdf: gpd.GeoDataFrame, rules: Optional[dict] = None) -> gpd.GeoDataFrame:
+    """
+    Add the columns the map needs to a (clipped) layer, in place.
+
+    Args:
+        name: The layer key (e.g., 'CONDUIT', 'STRUCTURE', 'FIBERCABLE').
+        gdf: Layer in EPSG:4326; must not be a view of a shared layer.
+        rules: Compiled classification rules (processing.classify); defaults if None.
+
+    Returns:
+        gdf, for chaining.
+    """
+    # 5) STRUCTURE subtype codes as ints
     if name == "STRUCTURE":
-        clipped["subtypecod"] = (
-            pd.to_numeric(clipped.get("subtypecod", pd.Series()), errors="coerce")
+        gdf["subtypecod"] = (
+            pd.to_numeric(gdf.get("subtypecod", pd.Series()), errors="coerce")
               .fillna(0)
               .astype(int)
         )
-        def pick_symbol(row):
-            code  = row["subtypecod"]
-            owner = str(row.get("owner", "")).lower()
-            if code == 0:
-                return "?"
-            if code == 1:
-                return "M"
-            if code == 2:
-                return "H"
-            if code == 3:
-                return "H" if "everstream" in owner else "V"
-            return "?"
-        clipped["symbol"] = clipped.apply(pick_symbol, axis=1)
+
+    # 5b) Rule-driven classification columns ('symbol', 'style_class', ...)
+    classify(name, gdf, rules)
 
     # 6) Convert datetime columns
-    for col in clipped.columns:
-        if pd.api.types.is_datetime64_any_dtype(clipped[col]):
-            clipped[col] = clipped[col].dt.strftime("%Y-%m-%dT%H:%M:%S")
+    for col in gdf.columns:
+        if pd.api.types.is_datetime64_any_dtype(gdf[col]):
+            gdf[col] = gdf[col].dt.strftime("%Y-%m-%dT%H:%M:%S")
 
-    return clipped
+    return gdf
 
 
-def clip_all_shapefiles(shapefiles: Dict[str, Path], buf_gdf: gpd.GeoDataFrame) -> Dict[str, gpd.GeoDataFrame]:
+def clip_all_shapefiles(
+    shapefiles: Dict[str, Path],
+    buf_gdf: gpd.GeoDataFrame,
+    cache_dir: Optional[Path] = None,
+    store: Optional["LayerStore"] = None,
+    rules: Optional[dict] = None,
+    exact_lines: bool = True,
+    workers: Optional[int] = None,
+    stats: Optional[Dict[str, Dict[str, Any]]] = None,
+    budget_mb: Optional[float] = None
+) -> Dict[str, gpd.GeoDataFrame]:
     """
     Clip multiple shapefiles according to the buffer GeoDataFrame.
 
+    Layers are independent, so each one's read/reproject/clip runs in its own
+    thread (GDAL reads, PROJ and shapely all release the GIL).
+
     Args:
         shapefiles: Mapping of layer name to Path objects.
         buf_gdf: GeoDataFrame with a single polygon representing the buffer.
+        cache_dir: Layer cache directory, or None to read shapefiles directly.
+        store: Resident LayerStore to take layers from instead of disk (worker mode).
+        rules: Compiled classification rules (processing.classify); defaults if None.
+        exact_lines: Cut cable/conduit features at the buffer edge; if False
+                     they are kept whole (CLIP.exact_lines).
+        workers: Thread count (CLIP.workers); defaults to one per layer,
+                 1 processes layers sequentially.
+        stats: Optional dict filled with {'seconds', 'features'} per layer.
+        budget_mb: Process memory budget (MEMORY.budget_mb): layers that would
+                   not fit whole are read for the buffer's window only.
 
     Returns:
-        Dict mapping each layer name to its clipped GeoDataFrame.
+        Dict mapping each layer name to its clipped GeoDataFrame, in the
+        same order as shapefiles.
     """
+    if rules is None:
+        rules = compile_rules()
+
+    def run(name: str, path: Path):
+        t0 = time.perf_counter()
+        with span("layer", layer=name):
+            gdf = None
+            if store is not None:
+                with span("load", layer=name, source="store"):
+                    gdf = store.get(name)
+            if gdf is not None:
+                # the resident layer's STRtree does the prefilter directly
+                result = clip_layer(name, gdf, buf_gdf, rules, exact_lines)
+            else:
+                # no store, or a layer it keeps out of memory (MEMORY.budget_mb)
+                layer_cache = store.cache_dir if store is not None else cache_dir
+                result = clip_shapefile(name, path, buf_gdf, layer_cache, rules, exact_lines, budget_mb)
+        return result, time.perf_counter() - t0
+
+    workers = workers or len(shapefiles) or 1
+    if workers == 1:
+        outcomes = {name: run(name, path) for name, path in shapefiles.items()}
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="clip") as pool:
+            futures = {name: pool.submit(run, name, path) for name, path in shapefiles.items()}
+            outcomes = {name: future.result() for name, future in futures.items()}
+
     clipped_layers: Dict[str, gpd.GeoDataFrame] = {}
-    for name, path in shapefiles.items():
-        clipped_layers[name] = clip_shapefile(name, path, buf_gdf)
+    for name, (result, seconds) in outcomes.items():
+        clipped_layers[name] = result
+        if stats is not None:
+            stats[name] = {"seconds": seconds, "features": len(result)}
     return clipped_layers
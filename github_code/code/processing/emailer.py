@@ -2,26 +2,26 @@
 import os
 from pathlib import Path
 import win32com.client as win32
-from typing import Optional, Tuple, Dict
+from typing import Dict
+
+from parsers.ticket import Ticket
 
 
 def compose_draft_gml(
     cfg: Dict[str, str],
-    ticket_file: Path,
-    xml_file: Optional[Path],
+    ticket: Ticket,
     png_path: Path,
     any_feats: bool
 ) -> 'win32.MailItem':
     """
     Compose an Outlook draft for a GML-based ticket using plain-text COM.
     NOTE: Body text now references a 15 m buffer.
+
+    Name, email and reference coordinate come from the ticket's OneCall XML,
+    read once by parsers.gml_parser.read_gml_ticket.
     """
-    # parse optional XML (pulls name/email if present)
-    if xml_file and xml_file.exists():
-        from parsers.txt_parser import parse_customer_details
-        raw_name, to_addr, lon, lat = parse_customer_details(xml_file)
-    else:
-        raw_name, to_addr, lon, lat = None, None, None, None
+    raw_name, to_addr = ticket.customer_name, ticket.customer_email
+    lon, lat = ticket.reference if ticket.reference is not None else (None, None)
 
     user = cfg['USER']
     mail_to = to_addr or user['Email']
@@ -29,7 +29,7 @@ def compose_draft_gml(
 
     outlook = win32.Dispatch('Outlook.Application')
     mail = outlook.CreateItem(0)
-    mail.Subject = f"TICKET: {ticket_file.stem}"
+    mail.Subject = f"TICKET: {ticket.stem}"
     mail.To = mail_to
 
     # greeting + body
@@ -39,7 +39,7 @@ def compose_draft_gml(
     else:
         body_txt = "There are no Everstream facilities in the given work area.\n\n"
 
-    ticket_line = f"TICKET NO: {ticket_file.stem}\n\n"
+    ticket_line = f"TICKET NO: {ticket.stem}\n\n"
     coord_line = f"Reference Coordinate: [{lon}, {lat}]\n\n" if lon is not None and lat is not None else "\n"
 
     body = greet + body_txt + ticket_line + coord_line
@@ -65,9 +65,7 @@ def compose_draft_gml(
 
 def compose_draft_txt(
     cfg: Dict[str, str],
-    ticket_file: Path,
-    info: Dict[str, str],
-    coords: Tuple[Tuple[float, float], Tuple[float, float]],
+    ticket: Ticket,
     png_path: Path,
     any_feats: bool
 ) -> 'win32.MailItem':
@@ -75,14 +73,15 @@ def compose_draft_txt(
     Compose an Outlook draft for a TXT-based ticket using plain-text COM.
     NOTE: Body text now references a 15 m buffer.
     """
-    lon1, lat1 = coords[0]
-    raw = info.get('Name') or info.get('Caller') or ''
+    lon1, lat1 = ticket.reference
+    raw = ticket.customer_name or ''
     first = raw.split()[0].capitalize() if raw else ''
-    mail_to = info.get('Email') or cfg['USER']['Email']
+    mail_to = ticket.customer_email or cfg['USER']['Email']
+    stem = ticket.stem
 
     outlook = win32.Dispatch('Outlook.Application')
     mail = outlook.CreateItem(0)
-    mail.Subject = ticket_file.stem.replace('_', ' ').strip()
+    mail.Subject = stem.replace('_', ' ').strip()
     mail.To = mail_to
 
     # greeting + body
@@ -92,7 +91,7 @@ def compose_draft_txt(
     else:
         body_txt = "There are no Everstream facilities in the given work area.\n\n"
 
-    ticket_line = f"Ticket #: {ticket_file.stem.replace('_', ' ').strip()}\n"
+    ticket_line = f"Ticket #: {stem.replace('_', ' ').strip()}\n"
     coord_line = f"Reference Coordinate: [{lon1}, {lat1}]\n\n"
 
     body = greet + body_txt + ticket_line + "\n" + coord_line
@@ -116,16 +115,22 @@ def compose_draft_txt(
     return mail
 
 
-def save_and_open_draft(mail: 'win32.MailItem', out_dir: Path) -> Path:
+def save_and_open_draft(mail: 'win32.MailItem', out_dir: Path, open_after: bool = True) -> Path:
     """
     Save the MailItem as a .msg, open the containing folder, then open it in Outlook.
+
+    With open_after=False (batch mode) the draft is only saved.
     """
     filename = f"{mail.Subject.split(':')[-1].strip()}.msg"
     out_path = out_dir / filename
     try:
         mail.SaveAs(str(out_path), 3)
     except Exception:
-        mail.Display()
+        if open_after:
+            mail.Display()
+        return out_path
+
+    if not open_after:
         return out_path
 
     # open folder containing draft
@@ -0,0 +1,254 @@
+# processing/layer_cache.py
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import geopandas as gpd
+from shapely.geometry import box
+
+from processing.tile_store import read_manifest, read_tiles, tiles_dir
+from utils.memory import estimate_layer_bytes, fits_budget
+from utils.tracing import span
+
+Bounds = Tuple[float, float, float, float]
+
+# Bump whenever prepare_layer() changes what ends up in the cache.
+CACHE_VERSION = 2
+
+# Padding (degrees, ~10 m) added to windowed reads so reprojecting the
+# bounding box into the shapefile's CRS never trims features at the edge.
+BBOX_PAD_DEG = 1e-4
+
+# Rows per Parquet row group; the unit skipped by windowed cache reads.
+ROW_GROUP_SIZE = 2048
+
+# Shapefile components whose size/mtime make up the cache key.
+SOURCE_SUFFIXES = (".shp", ".shx", ".dbf", ".prj", ".cpg")
+
+# Layers that are filtered on locate_tog == 'Locate'.
+LOCATE_LAYERS = ("CONDUIT", "STRUCTURE")
+
+
+def source_signature(shp_path: Path) -> Dict[str, object]:
+    """
+    Describe the on-disk state of a shapefile and its sidecar files.
+
+    Args:
+        shp_path: Path to the .shp file.
+
+    Returns:
+        Dict with the resolved path plus size and mtime of each component file.
+    """
+    shp_path = Path(shp_path).resolve()
+    parts = {}
+    for suffix in SOURCE_SUFFIXES:
+        p = shp_path.with_suffix(suffix)
+        if p.exists():
+            st = p.stat()
+            parts[suffix] = [st.st_size, st.st_mtime_ns]
+    return {"path": str(shp_path), "files": parts}
+
+
+def cache_identity(name: str, shp_path: Path) -> Dict[str, object]:
+    """
+    Everything a prepared copy of a layer depends on: cache version, layer, source.
+    """
+    return {"version": CACHE_VERSION, "layer": name, "source": source_signature(shp_path)}
+
+
+def cache_key(name: str, shp_path: Path) -> str:
+    """
+    Return a short hash identifying one prepared version of a layer.
+    """
+    payload = json.dumps(cache_identity(name, shp_path), sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def read_source(shp_path: Path, bbox: Optional[Bounds] = None) -> gpd.GeoDataFrame:
+    """
+    Read a shapefile, retrying with Fiona/Latin-1 on decode errors.
+
+    Args:
+        shp_path: Path to the .shp file.
+        bbox: Optional (minx, miny, maxx, maxy) in EPSG:4326. Only records whose
+              extent intersects it are read; GDAL answers this from the .qix
+              index when one exists (see utils.spatial_index).
+    """
+    kwargs = {}
+    if bbox is not None:
+        # A GeoSeries lets GeoPandas reproject the window into the file's CRS.
+        kwargs["bbox"] = gpd.GeoSeries([box(*_pad(bbox))], crs="EPSG:4326")
+    try:
+        return gpd.read_file(shp_path, **kwargs)
+    except UnicodeDecodeError:
+        return gpd.read_file(shp_path, engine="fiona", encoding="latin-1", **kwargs)
+
+
+def prepare_layer(name: str, gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """
+    Apply the ticket-independent steps to a freshly read layer.
+
+    Steps:
+      1. Reproject to EPSG:4326 if needed.
+      2. Filter on locate_tog == 'Locate' for CONDUIT and STRUCTURE.
+      3. Drop empty geometries and repair invalid ones.
+
+    Args:
+        name: The layer key (e.g., 'CONDUIT', 'STRUCTURE', 'FIBERCABLE').
+        gdf: GeoDataFrame as read from the shapefile.
+
+    Returns:
+        The prepared GeoDataFrame.
+    """
+    # 1) Reproject if needed
+    if gdf.crs and gdf.crs.to_epsg() != 4326:
+        with span("reproject", layer=name, features=len(gdf)):
+            gdf = gdf.to_crs(epsg=4326)
+
+    # 2) Filter locate_tog
+    if name in LOCATE_LAYERS and "locate_tog" in gdf.columns:
+        gdf = gdf[gdf["locate_tog"] == "Locate"]
+
+    # 3) Drop empties and repair invalid geometries
+    gdf = gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty].copy()
+    invalid = ~gdf.geometry.is_valid
+    if invalid.any():
+        gdf.loc[invalid, gdf.geometry.name] = gdf.geometry[invalid].make_valid()
+
+    return gdf.reset_index(drop=True)
+
+
+def load_layer(
+    name: str,
+    shp_path: Path,
+    cache_dir: Optional[Path] = None,
+    bbox: Optional[Bounds] = None,
+    budget_mb: Optional[float] = None
+) -> gpd.GeoDataFrame:
+    """
+    Load a prepared layer, going through the on-disk GeoParquet cache when enabled.
+
+    The cache file is keyed by layer name plus the path, size and mtime of the
+    shapefile components, so any change to the source rebuilds it on next use.
+    Building it means reading the whole layer; if that would not fit in
+    budget_mb (see utils.memory), only the bbox window is read and the cache
+    is left for a later run.
+
+    Args:
+        name: The layer key (e.g., 'CONDUIT', 'STRUCTURE', 'FIBERCABLE').
+        shp_path: Path to the source shapefile.
+        cache_dir: Directory for cached layers, or None to always read the shapefile.
+        bbox: Optional (minx, miny, maxx, maxy) in EPSG:4326. When given, only
+              features whose extent intersects it are read from disk.
+        budget_mb: Process memory budget (MEMORY.budget_mb), or None.
+
+    Returns:
+        GeoDataFrame in EPSG:4326, filtered and validity-repaired.
+    """
+    if cache_dir is None:
+        with span("read", layer=name, source="shapefile"):
+            gdf = read_source(shp_path, bbox)
+        return prepare_layer(name, gdf)
+
+    cache_dir = Path(cache_dir)
+
+    # Partitioned tiles (tools/partition_layers) beat the single-file cache
+    # for windowed reads: only the tiles under the window are opened.
+    if bbox is not None:
+        layer_dir = tiles_dir(cache_dir, name)
+        manifest = read_manifest(layer_dir)
+        if manifest is not None:
+            # compare in JSON form (the manifest stores lists, not tuples)
+            if manifest.get("source") == json.loads(json.dumps(cache_identity(name, shp_path))):
+                with span("read", layer=name, source="tiles"):
+                    return read_tiles(layer_dir, _pad(bbox), manifest)
+            print(f"⚠️ {name} tiles are out of date; re-run tools.partition_layers")
+
+    cached = cache_dir / f"{name}_{cache_key(name, shp_path)}.parquet"
+    if cached.exists():
+        try:
+            window = _pad(bbox) if bbox is not None else None
+            with span("read", layer=name, source="cache"):
+                return gpd.read_parquet(cached, bbox=window)
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable layer cache {cached.name}: {e}")
+
+    if bbox is not None and not fits_budget(estimate_layer_bytes(shp_path), budget_mb):
+        print(f"⚠️ {name} is too large to cache within MEMORY.budget_mb; reading the ticket window only")
+        with span("read", layer=name, source="shapefile", windowed=True):
+            gdf = read_source(shp_path, bbox)
+        return prepare_layer(name, gdf)
+
+    # The cache always holds the full layer; window it in memory afterwards.
+    with span("read", layer=name, source="shapefile"):
+        gdf = read_source(shp_path)
+    gdf = prepare_layer(name, gdf)
+    try:
+        _write_cache(gdf, cached)
+    except ImportError as e:
+        # pyarrow not installed: keep working uncached
+        print(f"⚠️ Layer cache disabled ({e})")
+    except Exception as e:
+        # disk full, permissions, Arrow errors: the layer is already in memory
+        print(f"⚠️ Could not write layer cache {cached.name}: {e}")
+    if bbox is not None:
+        minx, miny, maxx, maxy = _pad(bbox)
+        gdf = gdf.cx[minx:maxx, miny:maxy]
+    return gdf
+
+
+def warm_cache(
+    shapefiles: Dict[str, Path],
+    cache_dir: Optional[Path],
+    budget_mb: Optional[float] = None
+) -> None:
+    """
+    Build the cache file of every layer that has none, one layer at a time.
+
+    Batch mode calls this before starting its pool, so the pool processes
+    read their ticket windows from the cache instead of each rebuilding it.
+    Layers too large to read whole within budget_mb are left uncached.
+    """
+    if cache_dir is None:
+        return
+    for name, shp_path in shapefiles.items():
+        cached = Path(cache_dir) / f"{name}_{cache_key(name, shp_path)}.parquet"
+        if cached.exists() or not fits_budget(estimate_layer_bytes(shp_path), budget_mb):
+            continue
+        load_layer(name, shp_path, cache_dir)
+
+
+def _pad(bbox: Bounds) -> Bounds:
+    minx, miny, maxx, maxy = bbox
+    return (minx - BBOX_PAD_DEG, miny - BBOX_PAD_DEG, maxx + BBOX_PAD_DEG, maxy + BBOX_PAD_DEG)
+
+
+def _write_cache(gdf: gpd.GeoDataFrame, cached: Path) -> None:
+    """
+    Atomically write a prepared layer and drop stale versions of the same layer.
+    A failed write leaves no temporary file behind.
+    """
+    cached.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cached.with_name(f"{cached.name}.{os.getpid()}.tmp")  # per process: concurrent writers don't collide
+    # Hilbert-ordered rows in small row groups plus a covering bbox column let
+    # read_parquet(bbox=...) skip every row group outside the window.
+    if len(gdf):
+        gdf = gdf.iloc[gdf.hilbert_distance().argsort()]
+    try:
+        gdf.to_parquet(tmp, index=False, write_covering_bbox=True, row_group_size=ROW_GROUP_SIZE)
+        os.replace(tmp, cached)
+    finally:
+        try:
+            tmp.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    layer = cached.stem.rsplit("_", 1)[0]
+    for old in cached.parent.glob(f"{layer}_*.parquet"):
+        if old != cached and old.stem.rsplit("_", 1)[0] == layer:
+            try:
+                old.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,82 @@
+# processing/layer_store.py
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+import geopandas as gpd
+
+from processing.layer_cache import load_layer, source_signature
+from utils.memory import estimate_layer_bytes, fits_budget
+
+
+class LayerStore:
+    """
+    Keeps prepared utility layers and their STRtree indexes in memory.
+
+    Used by the resident worker so consecutive tickets skip the read,
+    reproject and index-build steps. Each access re-checks the source
+    shapefile's size/mtime and reloads only the layers that changed.
+
+    With a memory budget (MEMORY.budget_mb), a layer that would push the
+    process past it is not kept resident; get() returns None for it and
+    tickets read that layer's window from disk instead.
+    """
+
+    def __init__(
+        self,
+        shapefiles: Dict[str, Path],
+        cache_dir: Optional[Path] = None,
+        budget_mb: Optional[float] = None
+    ):
+        self.shapefiles = dict(shapefiles)
+        self.cache_dir = cache_dir
+        self.budget_mb = budget_mb
+        self._layers: Dict[str, Optional[gpd.GeoDataFrame]] = {}
+        self._signatures: Dict[str, dict] = {}
+        # one lock per layer so layers can (re)load concurrently
+        self._locks = {name: threading.Lock() for name in self.shapefiles}
+
+    def __getstate__(self):
+        # Locks don't pickle.
+        state = self.__dict__.copy()
+        del state["_locks"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._locks = {name: threading.Lock() for name in self.shapefiles}
+
+    def load_all(self) -> None:
+        """
+        Load (or refresh) every configured layer.
+        """
+        for name in self.shapefiles:
+            self.get(name)
+
+    def get(self, name: str) -> Optional[gpd.GeoDataFrame]:
+        """
+        Return the full prepared layer, reloading it if its source changed,
+        or None if it does not fit the memory budget.
+        """
+        shp_path = self.shapefiles[name]
+        signature = source_signature(shp_path)
+        with self._locks[name]:
+            if self._signatures.get(name) != signature:
+                self._layers.pop(name, None)  # free the old copy before sizing the new one
+                if not fits_budget(estimate_layer_bytes(shp_path), self.budget_mb):
+                    self._layers[name] = None
+                    self._signatures[name] = signature
+                    print(f"{name} exceeds MEMORY.budget_mb; reading it per ticket")
+                    return None
+                gdf = load_layer(name, shp_path, self.cache_dir)
+                gdf.sindex  # build the STRtree now rather than on first query
+                self._layers[name] = gdf
+                self._signatures[name] = signature
+                print(f"Loaded {name}: {len(gdf)} feature(s)")
+            return self._layers[name]
+
+    def status(self) -> Dict[str, int]:
+        """
+        Feature count of each resident layer.
+        """
+        return {name: len(gdf) for name, gdf in list(self._layers.items()) if gdf is not None}
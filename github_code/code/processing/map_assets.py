@@ -0,0 +1,178 @@
+# processing/map_assets.py
+"""
+Serve the map HTML's JavaScript/CSS from a local, version-pinned bundle.
+
+Folium pages pull Leaflet (and by default jQuery, Bootstrap, Font Awesome
+and Leaflet.awesome-markers) from public CDNs, so every headless render
+waits on CDN latency before the map appears. save_map() can instead:
+
+  - "local":  point every CDN <script>/<link> at a copy under
+              MAP_HTML.assets_dir, shared by all ticket HTML files;
+  - "inline": embed the copies in the page (self-contained HTML);
+  - "cdn":    leave Folium's links alone.
+
+The bundle mirrors each asset's URL (host and path, which carry the pinned
+version), e.g. <assets_dir>/cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.js,
+plus whatever images their CSS refers to. Missing files are downloaded on
+first use (or up front with `python -m tools.vendor_map_assets`); an asset
+that can't be had keeps its CDN link.
+"""
+import os
+import re
+import urllib.request
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from urllib.parse import urljoin, urlsplit
+
+import folium
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+ASSET_MODES = ("local", "inline", "cdn")
+FETCH_TIMEOUT_S = 15.0
+
+# Folium's default assets that a map made only of tile layers, GeoJSON
+# (with tooltips) and DivIcon markers needs. folium.Icon, popups and
+# Bootstrap-styled elements need the full default set.
+MINIMAL_JS = ("leaflet",)
+MINIMAL_CSS = ("leaflet_css",)
+
+_SCRIPT_RE = re.compile(r'<script src="(https?://[^"]+)"></script>')
+_CSS_RE = re.compile(r'<link rel="stylesheet" href="(https?://[^"]+)"\s*/?>')
+_CSS_URL_RE = re.compile(r'url\((["\']?)([^)"\']+)\1\)')
+
+# URLs that failed to download in this process; not retried for every ticket
+_unavailable = set()
+
+
+def asset_settings(cfg) -> Dict[str, object]:
+    """
+    Read the MAP_HTML config section: assets mode, assets_dir,
+    minimal_assets, layer_control and sidecar_min_features (0 = never).
+    """
+    sec = cfg["MAP_HTML"] if cfg is not None and "MAP_HTML" in cfg else None
+    if sec is None:
+        return {"mode": "cdn", "dir": None, "minimal": False, "layer_control": True, "sidecar_min_features": 0}
+    mode = str(sec.get("ASSETS", "cdn")).strip().lower()
+    if mode not in ASSET_MODES:
+        raise ValueError(f"MAP_HTML.assets must be one of {', '.join(ASSET_MODES)}; got {mode!r}")
+    return {
+        "mode": mode,
+        "dir": (PROJECT_ROOT / sec.get("ASSETS_DIR", "map_assets")).resolve(),
+        "minimal": sec.getboolean("MINIMAL_ASSETS", True),
+        "layer_control": sec.getboolean("LAYER_CONTROL", False),
+        "sidecar_min_features": sec.getint("SIDECAR_MIN_FEATURES", 0),
+    }
+
+
+def prune_default_assets(m: folium.Map) -> None:
+    """
+    Limit a map's default JS/CSS to what Leaflet core needs (see MINIMAL_JS).
+    """
+    m.default_js = [(name, url) for name, url in m.default_js if name in MINIMAL_JS]
+    m.default_css = [(name, url) for name, url in m.default_css if name in MINIMAL_CSS]
+
+
+def asset_path(assets_dir: Path, url: str) -> Path:
+    """
+    Where the bundle keeps the copy of an asset URL.
+    """
+    parts = urlsplit(url)
+    return Path(assets_dir, parts.netloc, *[p for p in parts.path.split("/") if p not in ("", ".", "..")])
+
+
+def _download(url: str, path: Path) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=FETCH_TIMEOUT_S) as resp:
+            data = resp.read()
+    except OSError as e:  # URLError and timeouts included
+        print(f"⚠️ Could not fetch map asset {url}: {e}")
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return True
+
+
+def vendor_asset(url: str, assets_dir: Path) -> Optional[Path]:
+    """
+    Local copy of an asset, downloaded (with the images its CSS refers to)
+    if the bundle doesn't have it yet.
+
+    Returns:
+        The file, or None if it isn't cached and can't be downloaded.
+    """
+    path = asset_path(assets_dir, url)
+    if path.exists():
+        return path
+    if url in _unavailable:
+        return None
+    if not _download(url, path):
+        _unavailable.add(url)
+        return None
+    if path.suffix == ".css":
+        css = path.read_text(encoding="utf-8", errors="replace")
+        for _, ref in _CSS_URL_RE.findall(css):
+            if ref.startswith(("data:", "#")) or urlsplit(ref).scheme:
+                continue
+            ref_url = urljoin(url, ref.split("?", 1)[0].split("#", 1)[0])
+            ref_path = asset_path(assets_dir, ref_url)
+            if not ref_path.exists():
+                _download(ref_url, ref_path)
+    return path
+
+
+def vendor_assets(urls: Iterable[str], assets_dir: Path) -> Dict[str, Optional[Path]]:
+    """
+    Make sure the bundle holds every URL; returns url -> local file (or None).
+    """
+    return {url: vendor_asset(url, assets_dir) for url in urls}
+
+
+def _link(path: Path, page_dir: Path) -> str:
+    try:
+        return Path(os.path.relpath(path, page_dir)).as_posix()
+    except ValueError:  # different drive on Windows
+        return path.as_uri()
+
+
+def localize_html(html: str, out_html: Path, mode: str, assets_dir: Path) -> str:
+    """
+    Rewrite the CDN <script>/<link> tags of a rendered page for mode
+    ('local' or 'inline'); assets that can't be vendored keep their CDN link.
+    """
+    page_dir = Path(out_html).resolve().parent
+    local = vendor_assets(_SCRIPT_RE.findall(html) + _CSS_RE.findall(html), assets_dir)
+
+    def inline_css(path: Path) -> str:
+        # Relative url()s now resolve against the page: point them at the bundle
+        css = path.read_text(encoding="utf-8")
+
+        def relink(m):
+            ref = m.group(2)
+            if ref.startswith(("data:", "#")) or urlsplit(ref).scheme:
+                return m.group(0)
+            return f'url("{_link((path.parent / ref.split("?", 1)[0]).resolve(), page_dir)}")'
+
+        return _CSS_URL_RE.sub(relink, css)
+
+    def script_tag(m) -> str:
+        path = local.get(m.group(1))
+        if path is None:
+            return m.group(0)
+        if mode == "inline":
+            body = path.read_text(encoding="utf-8").replace("</script", "<\\/script")
+            return f"<script>{body}</script>"
+        return f'<script src="{_link(path, page_dir)}"></script>'
+
+    def css_tag(m) -> str:
+        path = local.get(m.group(1))
+        if path is None:
+            return m.group(0)
+        if mode == "inline":
+            return f"<style>{inline_css(path)}</style>"
+        return f'<link rel="stylesheet" href="{_link(path, page_dir)}"/>'
+
+    html = _SCRIPT_RE.sub(script_tag, html)
+    return _CSS_RE.sub(css_tag, html)
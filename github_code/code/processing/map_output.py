@@ -0,0 +1,145 @@
+# processing/map_output.py
+"""
+Shrink the geometry embedded in the Folium map before it is built.
+
+folium.GeoJson writes every vertex at full float64 precision (~17 digits),
+while the map is only ever looked at around the zoom it is fitted to. For
+each layer this module:
+
+  1. simplifies lines and polygons within a tolerance of a fraction of a
+     pixel at that fitted zoom (MAP_OUTPUT.simplify_px),
+  2. snaps coordinates to MAP_OUTPUT.precision decimals (7 ~ 1 cm), which
+     also drops the duplicate vertices and collapsed parts snapping creates,
+  3. rounds the stored floats so they serialize as short decimals.
+
+The caller gets the optimized copies plus the size of the coordinate text
+before and after, from which main.py estimates the unoptimized page size for
+the HTML size line of the ticket summary (benchmarks.bench_pipeline measures
+it by also saving the unoptimized map).
+"""
+import json
+import math
+from typing import Dict, Tuple
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from processing.map_style import map_bounds
+
+DEFAULT_PRECISION = 7
+DEFAULT_SIMPLIFY_PX = 0.5
+
+# Viewport the map is fitted to (matches the screenshot window size).
+MAP_SIZE_PX = (1200, 800)
+MAX_ZOOM = 18
+TILE_SIZE = 256
+
+
+def output_settings(cfg) -> Tuple[int, float]:
+    """
+    Read (precision, simplify_px) from the MAP_OUTPUT config section.
+    """
+    sec = cfg["MAP_OUTPUT"] if "MAP_OUTPUT" in cfg else None
+    if sec is None:
+        return DEFAULT_PRECISION, DEFAULT_SIMPLIFY_PX
+    return sec.getint("PRECISION", DEFAULT_PRECISION), sec.getfloat("SIMPLIFY_PX", DEFAULT_SIMPLIFY_PX)
+
+
+def fit_zoom(sw: list, ne: list, size_px: Tuple[int, int] = MAP_SIZE_PX) -> int:
+    """
+    Zoom level Leaflet's fitBounds() picks for [lat, lon] corners in a viewport.
+    """
+    def merc_y(lat: float) -> float:
+        lat = max(min(lat, 85.0511287798), -85.0511287798)
+        return math.log(math.tan(math.pi / 4 + math.radians(lat) / 2)) / (2 * math.pi)
+
+    # Bounds size as a fraction of the world at zoom 0
+    dx = max((ne[1] - sw[1]) / 360.0, 1e-12)
+    dy = max(merc_y(ne[0]) - merc_y(sw[0]), 1e-12)
+    zoom = math.floor(min(
+        math.log2(size_px[0] / (TILE_SIZE * dx)),
+        math.log2(size_px[1] / (TILE_SIZE * dy)),
+    ))
+    return max(0, min(zoom, MAX_ZOOM))
+
+
+def degrees_per_pixel(zoom: int, lat: float) -> float:
+    """
+    Size of one screen pixel in degrees at a zoom and latitude. Web Mercator
+    pixels span fewer degrees of latitude than longitude, so the latitude
+    figure is used to keep the tolerance under a pixel both ways.
+    """
+    return 360.0 * math.cos(math.radians(lat)) / (TILE_SIZE * 2 ** zoom)
+
+
+def optimize_gdf(gdf: gpd.GeoDataFrame, precision: int, tolerance: float) -> gpd.GeoDataFrame:
+    """
+    Simplify, snap and round a layer's geometry for output.
+
+    Args:
+        gdf: Layer in EPSG:4326.
+        precision: Decimal places to keep; negative disables snapping.
+        tolerance: Simplification tolerance in degrees; 0 disables it.
+
+    Returns:
+        A copy with optimized geometry; features that collapse are dropped.
+    """
+    if gdf.empty:
+        return gdf
+    geoms = gdf.geometry.values
+    if tolerance > 0:
+        is_point = np.isin(shapely.get_type_id(geoms), (0, 4))
+        geoms = np.where(is_point, geoms, shapely.simplify(geoms, tolerance, preserve_topology=True))
+    if precision >= 0:
+        # set_precision removes repeated vertices and collapsed rings; the
+        # rounding afterwards only tidies the floats' decimal representation.
+        geoms = shapely.set_precision(geoms, 10.0 ** -precision)
+        geoms = shapely.transform(geoms, lambda xy: np.round(xy, precision))
+    out = gdf.copy()
+    out[gdf.geometry.name] = geoms
+    return out[~out.geometry.is_empty]
+
+
+def coordinate_bytes(gdf: gpd.GeoDataFrame) -> int:
+    """
+    Length of a layer's coordinates as JSON text, the only part of its
+    embedded GeoJSON that optimize_gdf() changes.
+    """
+    if gdf.empty:
+        return 0
+    return len(json.dumps(shapely.get_coordinates(gdf.geometry.values).tolist()))
+
+
+def optimize_map_layers(
+    cfg,
+    work_gdf: gpd.GeoDataFrame,
+    buf_gdf: gpd.GeoDataFrame,
+    clipped: Dict[str, gpd.GeoDataFrame]
+) -> Tuple[gpd.GeoDataFrame, gpd.GeoDataFrame, Dict[str, gpd.GeoDataFrame], Dict[str, int]]:
+    """
+    Optimize every layer that goes into build_map() for its fitted zoom.
+
+    Args:
+        cfg: Loaded configuration (MAP_OUTPUT section).
+        work_gdf: Work area.
+        buf_gdf: Buffer polygon.
+        clipped: Clipped layers by name.
+
+    Returns:
+        (work_gdf, buf_gdf, clipped) optimized copies, plus a report dict with
+        'zoom' and the 'before' / 'after' coordinate text sizes in bytes.
+    """
+    precision, simplify_px = output_settings(cfg)
+    sw, ne = map_bounds(work_gdf)
+    zoom = fit_zoom(sw, ne)
+    tolerance = simplify_px * degrees_per_pixel(zoom, (sw[0] + ne[0]) / 2.0)
+
+    layers = {"__work__": work_gdf, "__buffer__": buf_gdf, **clipped}
+    before = sum(coordinate_bytes(g) for g in layers.values())
+    optimized = {name: optimize_gdf(g, precision, tolerance) for name, g in layers.items()}
+    after = sum(coordinate_bytes(g) for g in optimized.values())
+
+    work_out = optimized.pop("__work__")
+    buf_out = optimized.pop("__buffer__")
+    return work_out, buf_out, optimized, {"zoom": zoom, "before": before, "after": after}
@@ -0,0 +1,173 @@
+# processing/map_sidecars.py
+"""
+Write big map layers as sidecar files that the page loads for the visible area.
+
+Inline, a long route's clipped CONDUIT/FIBERCABLE layers make a multi-MB page
+the browser has to parse before it draws anything. Above
+MAP_HTML.sidecar_min_features a layer is instead:
+
+  1. ordered along a Hilbert curve and cut into chunks of CHUNK_FEATURES,
+     so each chunk covers a compact area;
+  2. written once per chunk as <html folder>/<stem>_layers/<LAYER>.<hash>.js,
+     a script that hands its GeoJSON to the page (plain <script> tags work
+     for HTML opened from disk, where fetch() of local files is blocked);
+  3. drawn by an empty L.geoJson layer that injects the chunks whose extent
+     intersects the (padded) view, on load and after every move.
+
+File names are content hashes, so re-rendering a ticket reuses unchanged
+chunks; files no longer referenced are removed. window.UR_SIDECARS.pending
+counts chunks still loading (the screenshot waits for it to reach 0).
+"""
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import geopandas as gpd
+from branca.element import MacroElement
+from jinja2 import Template
+
+CHUNK_FEATURES = 1000
+VIEW_PAD = 0.25  # also load chunks within this fraction of the view around it
+
+
+def write_sidecars(
+    gdf: gpd.GeoDataFrame,
+    name: str,
+    out_dir: Path,
+    columns: List[str],
+    chunk_features: int = CHUNK_FEATURES
+) -> List[Dict[str, object]]:
+    """
+    Write a layer as chunked sidecar scripts.
+
+    Args:
+        gdf: Layer in EPSG:4326.
+        name: Layer name; the chunks register under it.
+        out_dir: Sidecar folder (created if needed); must sit next to the HTML.
+        columns: Properties the page needs (styling, tooltips); others are dropped.
+        chunk_features: Features per chunk.
+
+    Returns:
+        One {'bounds': [south, west, north, east], 'src': relative path} per chunk.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    keep = [c for c in columns if c in gdf.columns] + [gdf.geometry.name]
+    ordered = gdf[keep].iloc[gdf.geometry.hilbert_distance().argsort()]
+
+    chunks = []
+    for start in range(0, len(ordered), chunk_features):
+        part = ordered.iloc[start:start + chunk_features]
+        data = part.to_json(drop_id=True, separators=(",", ":"))
+        body = f"UR_SIDECARS.add({json.dumps(name)},{data});\n"
+        digest = hashlib.sha1(body.encode("utf-8")).hexdigest()[:12]
+        path = out_dir / f"{name}.{digest}.js"
+        if not path.exists():
+            path.write_text(body, encoding="utf-8")
+        minx, miny, maxx, maxy = part.total_bounds
+        chunks.append({"bounds": [float(miny), float(minx), float(maxy), float(maxx)], "src": f"{out_dir.name}/{path.name}"})
+    return chunks
+
+
+def prune_sidecars(out_dir: Path, chunks: List[Dict[str, object]]) -> None:
+    """
+    Delete sidecar files in out_dir that no chunk refers to any more.
+    """
+    out_dir = Path(out_dir)
+    if not out_dir.is_dir():
+        return
+    used: Set[str] = {Path(str(c["src"])).name for c in chunks}
+    for path in out_dir.glob("*.js"):
+        if path.name not in used:
+            path.unlink()
+
+
+class SidecarGeoJson(MacroElement):
+    """
+    GeoJSON layer whose features arrive from sidecar chunks in view.
+
+    style is a Leaflet path style; when color_property is set, each feature's
+    color is looked up in colors by that property (default_color otherwise).
+    tooltip_property, if given, is shown as '<tooltip_label>: value'.
+    """
+    _template = Template("""
+        {% macro header(this, kwargs) %}
+        <script>
+        window.UR_SIDECARS = window.UR_SIDECARS || {
+            pending: 0,
+            layers: {},
+            add: function(name, data) {
+                var layer = this.layers[name];
+                if (layer) { layer.addData(data); layer.bringToBack(); }
+                this.pending -= 1;
+            }
+        };
+        </script>
+        {% endmacro %}
+
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var style = {{ this.style|tojson }};
+            var colors = {{ this.colors|tojson }};
+            var colorProperty = {{ this.color_property|tojson }};
+            var tooltipProperty = {{ this.tooltip_property|tojson }};
+            var layer = L.geoJson(null, {
+                style: function(feature) {
+                    if (!colorProperty) { return style; }
+                    var c = colors[feature.properties[colorProperty]];
+                    return Object.assign({}, style, {color: c || {{ this.default_color|tojson }}});
+                }
+            }).addTo(map);
+            if (tooltipProperty) {
+                layer.bindTooltip(function(l) {
+                    return {{ this.tooltip_label|tojson }} + ": " + (l.feature.properties[tooltipProperty] || "");
+                }, {sticky: true});
+            }
+            UR_SIDECARS.layers[{{ this.layer_name|tojson }}] = layer;
+
+            var chunks = {{ this.chunks|tojson }};
+            function loadVisible() {
+                var view = map.getBounds().pad({{ this.view_pad }});
+                chunks.forEach(function(c) {
+                    if (c.requested) { return; }
+                    var b = c.bounds;
+                    if (!view.intersects(L.latLngBounds([b[0], b[1]], [b[2], b[3]]))) { return; }
+                    c.requested = true;
+                    UR_SIDECARS.pending += 1;
+                    var s = document.createElement("script");
+                    s.src = c.src;
+                    s.onerror = function() { UR_SIDECARS.pending -= 1; };
+                    document.head.appendChild(s);
+                });
+            }
+            // first pass after the rest of the map script has fitted the view
+            map.on("moveend", loadVisible);
+            setTimeout(loadVisible, 0);
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(
+        self,
+        layer_name: str,
+        chunks: List[Dict[str, object]],
+        style: Dict[str, object],
+        color_property: Optional[str] = None,
+        colors: Optional[Dict[str, str]] = None,
+        default_color: Optional[str] = None,
+        tooltip_property: Optional[str] = None,
+        tooltip_label: str = ""
+    ):
+        super().__init__()
+        self._name = "SidecarGeoJson"
+        self.layer_name = layer_name
+        self.chunks = chunks
+        self.style = style
+        self.color_property = color_property
+        self.colors = colors or {}
+        self.default_color = default_color
+        self.tooltip_property = tooltip_property
+        self.tooltip_label = tooltip_label
+        self.view_pad = VIEW_PAD
@@ -0,0 +1,117 @@
+# processing/map_style.py
+"""
+Map styling shared by every renderer: the Folium map (processing.mapping),
+the static PNG renderer (processing.static_map) and the pre-rendered
+facility tiles (processing.raster_tiles).
+
+Kept free of folium so the renderers can import it without importing each
+other.
+"""
+import math
+from typing import Any, Dict, List, Tuple
+
+import geopandas as gpd
+
+# Legend swatch height (px) per entry kind; structure symbols are drawn as text.
+LEGEND_ICON_HEIGHT = {"conduit": 2, "fiber": 4, "work_area": 12}
+
+
+def map_style(cfg) -> Dict[str, Any]:
+    """
+    Read the map styling (COLORS, WEIGHTS, OPACITIES, STRUCTURE_SYMBOL, LEGEND,
+    VISIBILITY) once, for the Folium map and the static renderer alike.
+    """
+    color_cfg = cfg["COLORS"]
+    opacity_cfg = cfg["OPACITIES"] if "OPACITIES" in cfg else {}
+    weight_cfg = cfg["WEIGHTS"]
+    struct_sym_cfg = cfg["STRUCTURE_SYMBOL"] if "STRUCTURE_SYMBOL" in cfg else {}
+    work_area_opacity = float(opacity_cfg.get("WORK_AREA", 0.3))
+    return {
+        "colors":            color_cfg,
+        "conduit_color":     color_cfg.get("CONDUIT"),
+        "fiber_colors": {
+            "aerial":      color_cfg.get("AERIAL"),
+            "underground": color_cfg.get("UNDERGROUND"),
+            "bridge":      color_cfg.get("BRIDGE"),
+            "default":     color_cfg.get("UNKNOWN"),
+        },
+        "work_area_color":   color_cfg.get("WORK_AREA"),
+        "conduit_opacity":   float(opacity_cfg.get("CONDUIT",   0.2)),
+        "fiber_opacity":     float(opacity_cfg.get("FIBER",     0.3)),
+        "work_area_opacity": work_area_opacity,
+        "buffer_opacity":    work_area_opacity / 2.0,
+        "conduit_weight":    int(weight_cfg.get("CONDUIT",   3)),
+        "fiber_weight":      int(weight_cfg.get("FIBER",     4)),
+        "work_area_weight":  int(weight_cfg.get("WORK_AREA", 2)),
+        "struct_size":       int(struct_sym_cfg.get("SIZE",    12)),
+        "struct_color":      struct_sym_cfg.get("COLOR",      "black"),
+        "struct_opacity":    float(struct_sym_cfg.get("OPACITY", 1.0)),
+        "legend_labels":     {k: v for k, v in cfg["LEGEND"].items()},
+        "show_buffer":       "VISIBILITY" in cfg and cfg.getboolean("VISIBILITY", "BUFFER_AREA", fallback=False),
+    }
+
+
+def fiber_color(style: Dict[str, Any], style_class) -> str:
+    """
+    Color of a fiber style class (precomputed by processing.classify);
+    unknown classes use COLORS.UNKNOWN.
+    """
+    fiber_colors = style["fiber_colors"]
+    return (
+        fiber_colors.get(style_class)
+        or style["colors"].get(str(style_class).upper())
+        or fiber_colors["default"]
+    )
+
+
+def legend_entries(style: Dict[str, Any], clipped: Dict[str, gpd.GeoDataFrame]) -> List[Tuple[str, str, str]]:
+    """
+    Legend rows for the layers present, as (kind, value, label) where kind is
+    'conduit', 'fiber' or 'work_area' (value is a color) or 'symbol' (value
+    is the structure letter).
+    """
+    legend_labels = style["legend_labels"]
+    entries: List[Tuple[str, str, str]] = []
+
+    # Conduit
+    if not clipped.get("CONDUIT", gpd.GeoDataFrame()).empty:
+        entries.append(("conduit", style["conduit_color"], legend_labels.get("CONDUIT", "Conduit")))
+
+    # Structure symbols
+    struct_df = clipped.get("STRUCTURE", gpd.GeoDataFrame())
+    if not struct_df.empty:
+        present = set(struct_df["symbol"].unique())
+        for sym in ['?', 'M', 'H', 'V']:
+            if sym in present:
+                entries.append(("symbol", sym, legend_labels.get(f"SYMBOL_{sym}", sym)))
+
+    # Fiber types (one entry per style class present; built-in classes first)
+    fiber_df = clipped.get("FIBERCABLE", gpd.GeoDataFrame())
+    if not fiber_df.empty and "style_class" in fiber_df.columns:
+        present = set(fiber_df["style_class"].unique()) - {"unknown"}
+        builtin = [c for c in ("aerial", "underground", "bridge") if c in present]
+        for cls in builtin + sorted(present - set(builtin)):
+            entries.append(("fiber", fiber_color(style, cls), legend_labels.get(str(cls).upper(), str(cls).capitalize())))
+
+    # Work area
+    entries.append(("work_area", style["work_area_color"], legend_labels.get("WORK_AREA", "Work Area")))
+    return entries
+
+
+def map_bounds(work_gdf: gpd.GeoDataFrame, pad_m: float = 15.0) -> Tuple[list, list]:
+    """
+    South-west and north-east [lat, lon] corners the map is fitted to: the
+    work area's extent padded by a fixed distance in meters.
+    """
+    # Convert a fixed 15 meters into degrees at the mean latitude for a good approximation in EPSG:4326.
+    minx, miny, maxx, maxy = work_gdf.total_bounds
+    mean_lat = (miny + maxy) / 2.0
+    m_per_deg_lat = 111_320.0
+    m_per_deg_lon = max(111_320.0 * math.cos(math.radians(mean_lat)), 1e-6)  # avoid div-by-zero near poles
+
+    pad_x = pad_m / m_per_deg_lon
+    pad_y = pad_m / m_per_deg_lat
+
+    sw = [miny - pad_y, minx - pad_x]
+    ne = [maxy + pad_y, maxx + pad_x]
+    return sw, ne
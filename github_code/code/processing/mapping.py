@@ -1,108 +1,185 @@
 # map_builder.py
 import configparser
-import math
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 
 import folium
 import geopandas as gpd
+from branca.element import MacroElement
 from folium import Element
+from folium.utilities import JsCode
+from jinja2 import Template
+
+from processing.map_assets import asset_settings, localize_html, prune_default_assets
+from processing.map_sidecars import SidecarGeoJson, prune_sidecars, write_sidecars
+from processing.map_style import LEGEND_ICON_HEIGHT, fiber_color, legend_entries, map_bounds, map_style
+from processing.raster_tiles import EMPTY_TILE, raster_overlay, raster_settings
+from processing.tile_cache import map_tile_url, tile_settings
+
+# CSS class shared by every structure symbol marker
+STRUCTURE_CLASS = "ur-structure"
+
+
+class UpstreamTileFallback(MacroElement):
+    """
+    Reload tiles that fail on the local tile server from the upstream URL, so
+    a saved map still shows imagery when opened without the server running.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        {{ this._parent.get_name() }}.on("tileerror", function(e) {
+            if (e.tile.dataset.upstream) { return; }
+            e.tile.dataset.upstream = "1";
+            e.tile.src = L.Util.template({{ this.url|tojson }}, e.coords);
+        });
+        {% endmacro %}
+    """)
+
+    def __init__(self, url: str):
+        super().__init__()
+        self._name = "UpstreamTileFallback"
+        self.url = url
 
 
 def build_map(
     cfg: configparser.ConfigParser,  # works with ConfigParser or dict-like (same access pattern)
     work_gdf: gpd.GeoDataFrame,
     buf_gdf: gpd.GeoDataFrame,
-    clipped: Dict[str, gpd.GeoDataFrame]
+    clipped: Dict[str, gpd.GeoDataFrame],
+    show_buffer: Optional[bool] = None,
+    sidecar_dir: Optional[Path] = None
 ) -> folium.Map:
     """
     Build a Folium map showing clipped layers, work area outline, and legend.
 
+    show_buffer overrides VISIBILITY.BUFFER_AREA when not None (used to force
+    the buffer outline on tickets with no features).
+
+    sidecar_dir (a folder next to the HTML) lets CONDUIT/FIBERCABLE layers of
+    MAP_HTML.sidecar_min_features or more be written there and loaded by the
+    page for the visible area instead of embedded (see processing.map_sidecars).
+
+    With RASTER_TILES enabled and current, tickets with min_features or more
+    cable/conduit features show the pre-rendered facility tiles instead of
+    the CONDUIT, FIBERCABLE and STRUCTURE vector layers. The tiles show every
+    facility in view, including those outside the buffer (see
+    processing.raster_tiles).
+
     Changes:
       • Map view padding is now a fixed 15 meters in all directions (not 5% of extent).
       • Email text updated separately in email_drafts.py.
     """
     # --- Extract styling from config ---
-    color_cfg = cfg["COLORS"]
-    layer_colors = {"CONDUIT": color_cfg.get("CONDUIT")}
-    fiber_colors = {
-        "aerial":      color_cfg.get("AERIAL"),
-        "underground": color_cfg.get("UNDERGROUND"),
-        "bridge":      color_cfg.get("BRIDGE"),
-        "default":     color_cfg.get("UNKNOWN"),
-    }
-    work_area_color = color_cfg.get("WORK_AREA")
-
-    opacity_cfg = cfg["OPACITIES"] if "OPACITIES" in cfg else {}
-    conduit_opacity   = float(opacity_cfg.get("CONDUIT",   0.2))
-    fiber_opacity     = float(opacity_cfg.get("FIBER",     0.3))
-    work_area_opacity = float(opacity_cfg.get("WORK_AREA", 0.3))
-    buffer_opacity    = work_area_opacity / 2.0
-
-    weight_cfg = cfg["WEIGHTS"]
-    conduit_weight   = int(weight_cfg.get("CONDUIT",   3))
-    fiber_weight     = int(weight_cfg.get("FIBER",     4))
-    work_area_weight = int(weight_cfg.get("WORK_AREA", 2))
-
-    vis_cfg = cfg["VISIBILITY"] if "VISIBILITY" in cfg else {}
-    show_buffer = cfg.getboolean("VISIBILITY", "BUFFER_AREA", fallback=False)
-
-    struct_sym_cfg = cfg["STRUCTURE_SYMBOL"] if "STRUCTURE_SYMBOL" in cfg else {}
-    struct_size     = int(struct_sym_cfg.get("SIZE",    12))
-    struct_color    = struct_sym_cfg.get("COLOR",      "black")
-    struct_opacity  = float(struct_sym_cfg.get("OPACITY",1.0))
-
-    legend_labels = {k: v for k, v in cfg["LEGEND"].items()}
+    style = map_style(cfg)
+    layer_colors = {"CONDUIT": style["conduit_color"]}
+    work_area_color = style["work_area_color"]
+    conduit_opacity, fiber_opacity = style["conduit_opacity"], style["fiber_opacity"]
+    work_area_opacity, buffer_opacity = style["work_area_opacity"], style["buffer_opacity"]
+    conduit_weight, fiber_weight = style["conduit_weight"], style["fiber_weight"]
+    work_area_weight = style["work_area_weight"]
+    struct_size, struct_color = style["struct_size"], style["struct_color"]
+    struct_opacity = style["struct_opacity"]
 
-    # --- Determine map bounds from work area ---
-    # Convert a fixed 15 meters into degrees at the mean latitude for a good approximation in EPSG:4326.
-    minx, miny, maxx, maxy = work_gdf.total_bounds
-    mean_lat = (miny + maxy) / 2.0
-    m_per_deg_lat = 111_320.0
-    m_per_deg_lon = max(111_320.0 * math.cos(math.radians(mean_lat)), 1e-6)  # avoid div-by-zero near poles
+    if show_buffer is None:
+        show_buffer = style["show_buffer"]
 
-    pad_m = 15.0  # fixed padding in meters
-    pad_x = pad_m / m_per_deg_lon
-    pad_y = pad_m / m_per_deg_lat
+    struct_css = f"""
+    <style>
+    .{STRUCTURE_CLASS} {{
+        font-size: {struct_size}px;
+        font-weight: bold;
+        line-height: {struct_size}px;
+        text-align: center;
+        color: {struct_color};
+        opacity: {struct_opacity};
+    }}
+    </style>
+    """
 
-    sw = [miny - pad_y, minx - pad_x]
-    ne = [maxy + pad_y, maxx + pad_x]
+    # --- Determine map bounds from work area ---
+    sw, ne = map_bounds(work_gdf)
 
     # --- Initialize Folium map ---
-    m = folium.Map(
-        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
-        attr='Esri', control=False
-    )
+    # Imagery comes through the local tile cache when TILES.cache is on
+    tiles = tile_settings(cfg)
+    tile_url = map_tile_url(cfg)
+    m = folium.Map(tiles=None)
+    html_cfg = asset_settings(cfg)
+    if html_cfg["minimal"]:
+        prune_default_assets(m)  # no jQuery/Bootstrap/Font Awesome for a Leaflet-only map
+    tile_layer = folium.TileLayer(tiles=tile_url, attr=tiles["attribution"], control=False).add_to(m)
+    if tile_url != tiles["url"]:
+        UpstreamTileFallback(tiles["url"]).add_to(tile_layer)
+
+    # Shared style for structure symbols (see STRUCTURE layer below)
+    m.get_root().header.add_child(Element(struct_css))
 
     # --- Style functions ---
     def fiber_style(feature):
-        p = feature["properties"].get("placementt", "").lower()
-        style = {"weight": fiber_weight, "fillOpacity": fiber_opacity}
-        if "aerial" in p:
-            style["color"] = fiber_colors["aerial"]
-        elif "underground" in p:
-            style["color"] = fiber_colors["underground"]
-        elif "bridge" in p:
-            style["color"] = fiber_colors["bridge"]
-        else:
-            style["color"] = fiber_colors["default"]
-        return style
+        return {
+            "weight": fiber_weight,
+            "fillOpacity": fiber_opacity,
+            "color": fiber_color(style, feature["properties"].get("style_class")),
+        }
+
+    # --- Pre-rendered facility tiles for dense tickets ---
+    # (the manifest is only checked once a ticket is dense enough to use them)
+    raster_cfg = raster_settings(cfg)
+    line_count = sum(len(clipped[n]) for n in ("CONDUIT", "FIBERCABLE") if n in clipped)
+    dense = raster_cfg["enabled"] and line_count >= raster_cfg["min_features"]
+    raster = raster_overlay(cfg) if dense else None
+    use_raster = raster is not None
+    if use_raster:
+        folium.TileLayer(
+            tiles=raster["url"], attr=" ", name="Facilities", overlay=True, control=False,
+            min_native_zoom=raster["min_zoom"], max_native_zoom=raster["max_zoom"],
+            error_tile_url=EMPTY_TILE,
+        ).add_to(m)
 
     # --- Add each clipped layer ---
+    # Layers go in as GeoJSON text: GeoDataFrames would be serialized through
+    # __geo_interface__, which adds a full-precision bbox to every feature.
+    sidecar_min = html_cfg["sidecar_min_features"]
+    sidecar_chunks: list = []
     for name, gdf in clipped.items():
         if gdf.empty:
             continue
 
-        if name == "FIBERCABLE":
+        if use_raster and name in ("CONDUIT", "FIBERCABLE", "STRUCTURE"):
+            continue  # drawn by the raster overlay
+
+        if (sidecar_dir is not None and sidecar_min > 0 and len(gdf) >= sidecar_min
+                and name in ("CONDUIT", "FIBERCABLE")):
+            if name == "FIBERCABLE":
+                classes = gdf["style_class"].unique() if "style_class" in gdf.columns else []
+                chunks = write_sidecars(gdf, name, sidecar_dir, ["style_class", "placementt"])
+                layer = SidecarGeoJson(
+                    name, chunks, {"weight": fiber_weight, "fillOpacity": fiber_opacity},
+                    color_property="style_class",
+                    colors={str(c): fiber_color(style, c) for c in classes},
+                    default_color=style["fiber_colors"]["default"],
+                    tooltip_property="placementt", tooltip_label="Placement",
+                )
+            else:
+                chunks = write_sidecars(gdf, name, sidecar_dir, [])
+                layer = SidecarGeoJson(name, chunks, {
+                    "color": layer_colors["CONDUIT"],
+                    "weight": conduit_weight,
+                    "fillOpacity": conduit_opacity
+                })
+            layer.add_to(m)
+            sidecar_chunks.extend(chunks)
+
+        elif name == "FIBERCABLE":
             folium.GeoJson(
-                gdf,
+                gdf.to_json(),
                 style_function=fiber_style,
                 tooltip=folium.GeoJsonTooltip(["placementt"], aliases=["Placement"])
             ).add_to(m)
 
         elif name == "CONDUIT":
             folium.GeoJson(
-                gdf,
+                gdf.to_json(),
                 style_function=lambda f, c=layer_colors["CONDUIT"]: {
                     "color": c,
                     "weight": conduit_weight,
@@ -111,29 +188,22 @@ def build_map(
             ).add_to(m)
 
         elif name == "STRUCTURE":
-            for _, row in gdf.iterrows():
-                html_icon = f"""
-                <div style="
-                    font-size: {struct_size}px;
-                    font-weight: bold;
-                    width:       {struct_size}px;
-                    height:      {struct_size}px;
-                    line-height: {struct_size}px;
-                    text-align:  center;
-                    color:       {struct_color};
-                    opacity:     {struct_opacity};
-                ">
-                    {row['symbol']}
-                </div>
-                """
-                folium.Marker(
-                    location=(row.geometry.y, row.geometry.x),
-                    icon=folium.DivIcon(html=html_icon)
-                ).add_to(m)
+            # One GeoJSON layer; every marker shares the STRUCTURE_CLASS CSS
+            # rule and only carries its symbol letter.
+            folium.GeoJson(
+                gdf[["symbol", gdf.geometry.name]].to_json(),
+                marker=folium.Marker(icon=folium.DivIcon(
+                    class_name=STRUCTURE_CLASS, icon_size=(struct_size, struct_size)
+                )),
+                on_each_feature=JsCode(
+                    "function(feature, layer) {"
+                    " layer.options.icon.options.html = feature.properties.symbol; }"
+                ),
+            ).add_to(m)
 
     # --- Work area outline ---
     folium.GeoJson(
-        work_gdf,
+        work_gdf.to_json(),
         style_function=lambda f: {
             'color': work_area_color,
             'weight': work_area_weight,
@@ -144,7 +214,7 @@ def build_map(
     # --- Buffer outline if enabled ---
     if show_buffer:
         folium.GeoJson(
-            buf_gdf,
+            buf_gdf.to_json(),
             style_function=lambda f: {
                 'color': work_area_color,
                 'weight': work_area_weight,
@@ -154,47 +224,23 @@ def build_map(
 
     # --- Build a dynamic legend ---
     entries: list[Tuple[str, str]] = []
-    # Conduit
-    if not clipped.get("CONDUIT", gpd.GeoDataFrame()).empty:
-        icon = f'<i style="background:{layer_colors["CONDUIT"]};width:12px;height:2px;display:inline-block;margin:0 6px;"></i>'
-        entries.append((icon, legend_labels.get("CONDUIT", "Conduit")))
-
-    # Structure symbols
-    struct_df = clipped.get("STRUCTURE", gpd.GeoDataFrame())
-    if not struct_df.empty:
-        for sym in ['?','M','H','V']:
-            if sym in struct_df['symbol'].unique():
-                label = legend_labels.get(f"SYMBOL_{sym}", sym)
-                span = (
-                    f'<span style="'
-                    f'display:inline-block;'
-                    f'width:12px;'
-                    f'height:12px;'
-                    f'text-align:center;'
-                    f'line-height:12px;'
-                    f'font-weight:bold;'
-                    f'color:{struct_color};'
-                    f'">{sym}</span>'
-                )
-                entries.append((span, label))
-
-    # Fiber types
-    fiber_df = clipped.get("FIBERCABLE", gpd.GeoDataFrame())
-    if not fiber_df.empty:
-        types = fiber_df['placementt'].str.lower().unique()
-        if any('aerial' in t for t in types):
-            icon = f'<i style="background:{fiber_colors["aerial"]};width:12px;height:4px;display:inline-block;margin:0 6px;"></i>'
-            entries.append((icon, legend_labels.get("AERIAL", "Aerial")))
-        if any('underground' in t for t in types):
-            icon = f'<i style="background:{fiber_colors["underground"]};width:12px;height:4px;display:inline-block;margin:0 6px;"></i>'
-            entries.append((icon, legend_labels.get("UNDERGROUND", "Underground")))
-        if any('bridge' in t for t in types):
-            icon = f'<i style="background:{fiber_colors["bridge"]};width:12px;height:4px;display:inline-block;margin:0 6px;"></i>'
-            entries.append((icon, legend_labels.get("BRIDGE", "Bridge")))
-
-    # Work area legend entry
-    wa_icon = f'<i style="background:{work_area_color};width:12px;height:12px;display:inline-block;margin:0 6px;"></i>'
-    entries.append((wa_icon, legend_labels.get("WORK_AREA", "Work Area")))
+    for kind, value, label in legend_entries(style, clipped):
+        if kind == "symbol":
+            icon = (
+                f'<span style="'
+                f'display:inline-block;'
+                f'width:12px;'
+                f'height:12px;'
+                f'text-align:center;'
+                f'line-height:12px;'
+                f'font-weight:bold;'
+                f'color:{struct_color};'
+                f'">{value}</span>'
+            )
+        else:
+            height = LEGEND_ICON_HEIGHT[kind]
+            icon = f'<i style="background:{value};width:12px;height:{height}px;display:inline-block;margin:0 6px;"></i>'
+        entries.append((icon, label))
 
     # Assemble legend HTML
     legend_html = """
@@ -209,15 +255,28 @@ def build_map(
     legend_html += "</div>"
     m.get_root().html.add_child(Element(legend_html))
 
-    # Fit to bounds and add layer control
+    if sidecar_dir is not None:
+        prune_sidecars(sidecar_dir, sidecar_chunks)
+
+    # Fit to bounds; the layer control only matters in interactive use
     m.fit_bounds([sw, ne])
-    folium.LayerControl().add_to(m)
+    if html_cfg["layer_control"]:
+        folium.LayerControl().add_to(m)
 
     return m
 
 
-def save_map(m: folium.Map, out_html: Path) -> None:
+def save_map(m: folium.Map, out_html: Path, cfg=None) -> None:
     """
     Save the Folium map to an HTML file.
+
+    With MAP_HTML.assets set to 'local' or 'inline' (see
+    processing.map_assets), the page's CDN scripts and stylesheets are
+    replaced by links to, or copies of, the shared local bundle.
     """
-    m.save(out_html)
+    html_cfg = asset_settings(cfg)
+    if html_cfg["mode"] == "cdn":
+        m.save(out_html)
+        return
+    html = m.get_root().render()
+    Path(out_html).write_text(localize_html(html, out_html, html_cfg["mode"], html_cfg["dir"]), encoding="utf-8")
@@ -0,0 +1,329 @@
+# processing/raster_tiles.py
+"""
+Pre-rendered XYZ raster tiles of the utility layers.
+
+In dense cores a ticket can clip thousands of cable and conduit segments,
+which are slow to serialize into the Folium page and slow for the browser to
+draw. tools/render_raster_tiles draws every configured layer, styled like
+the map (COLORS / WEIGHTS / OPACITIES / STRUCTURE_SYMBOL and the CLASSIFY
+rules), into transparent 256 px PNG tiles:
+
+    <CACHE.dir>/raster/<z>/<x>/<y>.png
+    <CACHE.dir>/raster/manifest.json
+
+The manifest stores, per tile, a hash of the style plus the geometry and
+classes of every feature that can reach the tile, and the source signature
+of each layer. Re-running after a UR_data refresh re-renders only the tiles
+whose hash changed and deletes tiles that lost all their features.
+
+With RASTER_TILES.enabled (off by default), when a ticket clips
+RASTER_TILES.min_features or more line features and the tiles are current,
+build_map() shows them as one overlay tile layer instead of the CONDUIT,
+FIBERCABLE and STRUCTURE vector layers, so the page costs the same however
+dense the area is. The tiles are not clipped: the overlay (and so the
+emailed screenshot) shows every facility in view, including those outside
+the buffer, while the summary counts and the legend still come from the
+clip. Only enable it where that is acceptable.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from processing.layer_cache import cache_identity
+from processing.map_style import map_style
+from processing.static_map import WEB_MERCATOR_HALF_WORLD, draw_facilities
+from processing.tile_store import tile_bounds, tiles_for_points
+from utils.paths import get_cache_dir, get_shapefile_paths
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+RASTER_VERSION = 1  # bump when the drawing changes, to re-render everything
+MANIFEST_NAME = "manifest.json"
+TILE_PX = 256
+TILE_DPI = 100
+DEFAULT_ZOOMS = "14-18"
+DEFAULT_MIN_FEATURES = 3000
+
+# Fully transparent 1x1 GIF for tiles with no facilities (no file on disk)
+EMPTY_TILE = "data:image/gif;base64,R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7"
+
+
+def parse_zooms(value: str) -> List[int]:
+    """
+    Parse "14-18" or "14,16,18" into a sorted list of zoom levels.
+    """
+    zooms: List[int] = []
+    for part in str(value).split(","):
+        lo, _, hi = part.strip().partition("-")
+        zooms.extend(range(int(lo), int(hi or lo) + 1))
+    return sorted(set(zooms))
+
+
+def raster_settings(cfg) -> Dict[str, object]:
+    """
+    Read the RASTER_TILES config section.
+
+    Returns:
+        Dict with 'enabled', 'dir' (<CACHE.dir>/raster, or None without a
+        layer cache), 'zooms', 'min_features' and 'workers'.
+    """
+    sec = cfg["RASTER_TILES"] if "RASTER_TILES" in cfg else {}
+    cache_dir = get_cache_dir(cfg, PROJECT_ROOT)
+    return {
+        "enabled": "RASTER_TILES" in cfg and cfg.getboolean("RASTER_TILES", "ENABLED", fallback=False),
+        "dir": cache_dir / "raster" if cache_dir is not None else None,
+        "zooms": parse_zooms(sec.get("ZOOMS", DEFAULT_ZOOMS)),
+        "min_features": int(sec.get("MIN_FEATURES", DEFAULT_MIN_FEATURES)),
+        "workers": int(sec.get("WORKERS", 0) or 0),
+    }
+
+
+def style_key(cfg) -> str:
+    """
+    Hash of everything that changes how a feature is drawn.
+    """
+    style = map_style(cfg)
+    drawn = {k: v for k, v in style.items() if k not in ("legend_labels", "show_buffer")}
+    drawn["colors"] = dict(style["colors"].items())
+    classify = cfg["CLASSIFY"] if "CLASSIFY" in cfg else {}
+    payload = json.dumps(
+        {"version": RASTER_VERSION, "style": drawn, "classify": dict(classify.items())},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def read_manifest(out_dir: Path) -> Optional[dict]:
+    """
+    The pyramid's manifest, or None if there is none (or it is unreadable).
+    """
+    try:
+        return json.loads((Path(out_dir) / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _feature_digests(gdf: gpd.GeoDataFrame) -> List[bytes]:
+    # geometry plus the classes the drawing depends on
+    wkb = shapely.to_wkb(gdf.geometry.values)
+    classes = [gdf[c].astype(str).to_numpy() for c in ("symbol", "style_class") if c in gdf.columns]
+    return [
+        hashlib.sha1(w + "|".join(c[i] for c in classes).encode("utf-8")).digest()
+        for i, w in enumerate(wkb)
+    ]
+
+
+def _pad_px(cfg) -> float:
+    style = map_style(cfg)
+    return max(style["conduit_weight"], style["fiber_weight"], style["struct_size"]) / 2.0 + 1.0
+
+
+def plan_tiles(
+    layers: Dict[str, gpd.GeoDataFrame],
+    zooms: List[int],
+    key: str,
+    pad_px: float
+) -> Dict[str, Tuple[str, Dict[str, np.ndarray]]]:
+    """
+    Work out every tile the layers reach and its content hash.
+
+    Args:
+        layers: Classified layers in EPSG:4326.
+        zooms: Zoom levels to cover.
+        key: style_key() of the current configuration.
+        pad_px: How far (pixels) a feature's drawing can spill past its geometry.
+
+    Returns:
+        "z/x/y" -> (hash, {layer name: indices of the features drawn on it}).
+    """
+    digests = {name: _feature_digests(gdf) for name, gdf in layers.items()}
+    plan: Dict[str, Tuple[str, Dict[str, np.ndarray]]] = {}
+    for z in zooms:
+        n = 2 ** z
+        pad_deg = pad_px * 360.0 / (TILE_PX * n)
+        candidates = set()
+        for gdf in layers.values():
+            if gdf.empty:
+                continue
+            coords = shapely.get_coordinates(shapely.segmentize(gdf.geometry.values, 90.0 / n))
+            for x, y in tiles_for_points(coords[:, 0], coords[:, 1], z):
+                candidates.update(
+                    (x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                    if 0 <= x + dx < n and 0 <= y + dy < n
+                )
+        tiles = sorted(candidates)
+        if not tiles:
+            continue
+        boxes = shapely.box(*np.array([tile_bounds(x, y, z) for x, y in tiles]).T)
+        boxes = shapely.buffer(boxes, pad_deg, join_style="mitre")
+
+        hits: Dict[str, List[np.ndarray]] = {}
+        for name, gdf in layers.items():
+            if gdf.empty:
+                continue
+            tile_i, feat_i = gdf.sindex.query(boxes)
+            order = np.lexsort((feat_i, tile_i))
+            tile_i, feat_i = tile_i[order], feat_i[order]
+            splits = np.searchsorted(tile_i, np.arange(len(tiles) + 1))
+            hits[name] = [feat_i[splits[t]:splits[t + 1]] for t in range(len(tiles))]
+
+        for t, (x, y) in enumerate(tiles):
+            per_layer = {name: idx[t] for name, idx in hits.items() if len(idx[t])}
+            if not per_layer:
+                continue
+            h = hashlib.sha1(key.encode("ascii"))
+            for name in sorted(per_layer):
+                h.update(name.encode("ascii"))
+                # sorted digests: independent of the layer's row order
+                h.update(b"".join(sorted(digests[name][i] for i in per_layer[name])))
+            plan[f"{z}/{x}/{y}"] = (h.hexdigest(), per_layer)
+    return plan
+
+
+# Per-process render state (set by _init_renderer)
+_render_layers: Dict[str, gpd.GeoDataFrame] = {}
+_render_style: dict = {}
+
+
+def _init_renderer(layers: Dict[str, gpd.GeoDataFrame], style: dict) -> None:
+    global _render_layers, _render_style
+    _render_layers = {name: gdf.to_crs(epsg=3857) for name, gdf in layers.items()}
+    _render_style = style
+
+
+def _render_tile(args: Tuple[str, Dict[str, np.ndarray], str]) -> str:
+    from matplotlib.figure import Figure
+
+    tile, per_layer, out_dir = args
+    z, x, y = (int(v) for v in tile.split("/"))
+    tile_m = 2 * WEB_MERCATOR_HALF_WORLD / 2 ** z
+    left, top = x * tile_m - WEB_MERCATOR_HALF_WORLD, WEB_MERCATOR_HALF_WORLD - y * tile_m
+
+    fig = Figure(figsize=(TILE_PX / TILE_DPI, TILE_PX / TILE_DPI), dpi=TILE_DPI)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_axis_off()
+    subset = {name: _render_layers[name].iloc[idx] for name, idx in per_layer.items()}
+    draw_facilities(ax, subset, _render_style, 72.0 / TILE_DPI)
+    ax.set_xlim(left, left + tile_m)
+    ax.set_ylim(top - tile_m, top)
+
+    path = Path(out_dir, str(z), str(x), f"{y}.png")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{y}.{os.getpid()}.tmp.png")
+    fig.savefig(tmp, dpi=TILE_DPI, transparent=True)
+    os.replace(tmp, path)
+    return tile
+
+
+def update_pyramid(
+    cfg,
+    layers: Dict[str, gpd.GeoDataFrame],
+    sources: Dict[str, dict],
+    out_dir: Path,
+    zooms: List[int],
+    workers: int = 0,
+    full: bool = False
+) -> Dict[str, int]:
+    """
+    Bring the raster pyramid up to date with the layers, rendering only
+    tiles whose content changed.
+
+    Args:
+        cfg: Loaded configuration (styling, CLASSIFY).
+        layers: Classified layers in EPSG:4326 (see clipping.add_map_columns).
+        sources: cache_identity() of each layer, recorded in the manifest.
+        out_dir: Pyramid folder.
+        zooms: Zoom levels to render.
+        workers: Render processes; 0 uses the CPU count.
+        full: Re-render every tile regardless of the manifest.
+
+    Returns:
+        Counts of 'tiles', 'rendered' and 'deleted' tiles.
+
+    Raises:
+        ImportError: If matplotlib is not installed.
+    """
+    import matplotlib  # noqa: F401  (fail before planning if it is missing)
+
+    out_dir = Path(out_dir)
+    old = (read_manifest(out_dir) or {}).get("tiles", {}) if not full else {}
+    plan = plan_tiles(layers, zooms, style_key(cfg), _pad_px(cfg))
+
+    todo = [
+        (tile, per_layer, str(out_dir))
+        for tile, (h, per_layer) in plan.items()
+        if old.get(tile) != h or not (out_dir / f"{tile}.png").exists()
+    ]
+    stale = set(old) - set(plan)
+
+    style = map_style(cfg)
+    style["colors"] = dict(style["colors"].items())  # picklable for the pool
+    workers = workers or os.cpu_count() or 1
+    if todo:
+        if workers == 1:
+            _init_renderer(layers, style)
+            for job in todo:
+                _render_tile(job)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_renderer,
+                                     initargs=(layers, style)) as pool:
+                list(pool.map(_render_tile, todo, chunksize=16))
+
+    for tile in stale:
+        try:
+            (out_dir / f"{tile}.png").unlink()
+        except OSError:
+            pass
+
+    manifest = {
+        "version": RASTER_VERSION,
+        "style": style_key(cfg),
+        "zooms": zooms,
+        "sources": sources,
+        "tiles": {tile: h for tile, (h, _) in plan.items()},
+    }
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tmp = out_dir / f"{MANIFEST_NAME}.tmp"
+    tmp.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(tmp, out_dir / MANIFEST_NAME)
+    return {"tiles": len(plan), "rendered": len(todo), "deleted": len(stale)}
+
+
+def raster_overlay(cfg) -> Optional[Dict[str, object]]:
+    """
+    The raster overlay build_map() may use, or None when it is disabled,
+    missing or out of date with the shapefiles or the styling.
+
+    Returns:
+        Dict with the tile 'url' template and 'min_zoom' / 'max_zoom'
+        rendered, plus 'min_features'.
+    """
+    settings = raster_settings(cfg)
+    if not settings["enabled"] or settings["dir"] is None:
+        return None
+    manifest = read_manifest(settings["dir"])
+    if manifest is None:
+        return None
+    current = {
+        name: cache_identity(name, path)
+        for name, path in get_shapefile_paths(cfg, PROJECT_ROOT).items()
+    }
+    # compare in JSON form (the manifest stores lists, not tuples)
+    if (manifest.get("sources") != json.loads(json.dumps(current))
+            or manifest.get("style") != style_key(cfg)):
+        print("⚠️ Raster tiles are out of date; re-run tools.render_raster_tiles")
+        return None
+    zooms = manifest.get("zooms") or settings["zooms"]
+    return {
+        "url": Path(settings["dir"]).resolve().as_uri() + "/{z}/{x}/{y}.png",
+        "min_zoom": min(zooms),
+        "max_zoom": max(zooms),
+        "min_features": settings["min_features"],
+    }
@@ -0,0 +1,333 @@
+# processing/result_cache.py
+"""
+Result cache for resubmitted work areas (updates, renewals, re-marks).
+
+Each entry is keyed by three things:
+  - a canonical hash of the work-area geometry (normalized, snapped to
+    ~1 cm) plus the buffer settings;
+  - the layer data version: each shapefile's path, size and mtime, as used
+    by the layer cache (processing.layer_cache.cache_identity);
+  - the output config: every section that can change the map (colours,
+    CLASSIFY, MAP_OUTPUT, RENDER, ...), not USER/PATHS/WORKER and the like.
+
+The first two form the clip key and all three the entry name:
+
+    <dir>/<clip key>_<style key>/
+        meta.json          feature counts, any_feats, summary map line, source ticket
+        layers/<NAME>.parquet   clipped layers
+        map.html, sidecars/, map.png
+
+A full hit copies the HTML (and sidecar chunks and PNG) into the new ticket
+folder, so the ticket skips buffer, clip, map build and the screenshot. An
+entry with the same clip key but other styling still supplies the clipped
+layers. Entries hold copies rather than pointing at earlier ticket folders,
+so results that were moved or deleted don't break the cache.
+
+Reading an entry touches its meta.json. Once the folder grows past
+RESULT_CACHE.max_mb the least recently used entries are deleted until it is
+back under 90% of the limit (like processing.tile_cache).
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import geopandas as gpd
+import shapely
+
+from processing.layer_cache import cache_identity
+from utils.paths import get_cache_dir
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+RESULT_CACHE_VERSION = 1
+DEFAULT_MAX_MB = 512
+EVICT_TO = 0.9  # evict down to this fraction of max_bytes
+GRID_DEG = 1e-7  # ~1 cm: work areas equal to this precision share an entry
+META_NAME = "meta.json"
+
+# Sections that never change the clipped layers, map or PNG
+NON_OUTPUT_SECTIONS = {
+    "USER", "PATHS", "SHAPEFILES", "WORKER", "INGEST", "BATCH", "TRACE",
+    "MEMORY", "BENCHMARK", "RESULT_CACHE", "SCREENSHOT", "QOL",
+}
+# Sections that change which features are clipped (part of the clip key)
+CLIP_SECTIONS = ("CLIP", "CLASSIFY")
+
+# (clip key, style key)
+ResultKeys = Tuple[str, str]
+
+
+def result_cache_settings(cfg) -> Dict[str, Any]:
+    """
+    Read the RESULT_CACHE config section.
+
+    Returns:
+        Dict with 'dir' (RESULT_CACHE.dir relative to the project, else
+        <CACHE.dir>/results; None when disabled or there is no cache
+        folder) and 'max_bytes'.
+    """
+    sec = cfg["RESULT_CACHE"] if "RESULT_CACHE" in cfg else None
+    enabled = sec is not None and sec.getboolean("ENABLED", False)
+    root = None
+    if enabled:
+        raw = str(sec.get("DIR", "") or "").strip()
+        if raw:
+            root = (PROJECT_ROOT / raw).resolve()
+        else:
+            cache_dir = get_cache_dir(cfg, PROJECT_ROOT)
+            root = cache_dir / "results" if cache_dir is not None else None
+    return {
+        "dir": root,
+        "max_bytes": int((sec.getfloat("MAX_MB", DEFAULT_MAX_MB) if sec else DEFAULT_MAX_MB) * 1024 * 1024),
+    }
+
+
+def _digest(payload: Any) -> str:
+    text = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:20]
+
+
+def geometry_key(work_gdf: gpd.GeoDataFrame) -> str:
+    """
+    Canonical hash of a work area: the same polygon hashes the same whatever
+    its vertex order, start point, feature split or sub-centimetre noise.
+    """
+    if work_gdf.crs is not None and work_gdf.crs.to_epsg() != 4326:
+        work_gdf = work_gdf.to_crs(epsg=4326)
+    geom = shapely.set_precision(work_gdf.geometry.union_all(), GRID_DEG)
+    geom = shapely.normalize(shapely.simplify(geom, 0))  # drop collinear vertices (e.g. from a union)
+    return hashlib.sha1(shapely.to_wkb(geom, output_dimension=2, byte_order=1)).hexdigest()[:20]
+
+
+def result_keys(
+    cfg,
+    work_gdf: gpd.GeoDataFrame,
+    shapefiles: Dict[str, Path],
+    buffer_params: Tuple[Any, ...]
+) -> ResultKeys:
+    """
+    Clip and style keys of a ticket (see the module docstring).
+
+    Args:
+        cfg: Loaded configuration.
+        work_gdf: The ticket's work area.
+        shapefiles: Mapping of layer name to shapefile path.
+        buffer_params: Buffer settings that shape the buffer (distance, simplify).
+    """
+    clip_key = _digest({
+        "version": RESULT_CACHE_VERSION,
+        "area": geometry_key(work_gdf),
+        "buffer": list(buffer_params),
+        "layers": {name: cache_identity(name, Path(path)) for name, path in shapefiles.items()},
+        "config": {sec: dict(cfg[sec]) for sec in CLIP_SECTIONS if sec in cfg},
+    })
+    style_key = _digest({
+        sec: dict(cfg[sec]) for sec in sorted(cfg.sections())
+        if sec not in NON_OUTPUT_SECTIONS and sec not in CLIP_SECTIONS
+    })
+    return clip_key, style_key
+
+
+class ResultCache:
+    """
+    Size-bounded LRU folder of per-work-area ticket outputs.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None  # counted on the first store
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def entry_name(keys: ResultKeys) -> str:
+        return f"{keys[0]}_{keys[1]}"
+
+    def _meta(self, entry: Path) -> Optional[Dict[str, Any]]:
+        try:
+            meta = json.loads((entry / META_NAME).read_text(encoding="utf-8"))
+            os.utime(entry / META_NAME)  # mark as recently used
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    def restore(self, keys: ResultKeys, ticket_dir: Path, stem: str) -> Optional[Dict[str, Any]]:
+        """
+        Copy a full hit's outputs into ticket_dir under the new ticket's name.
+
+        Returns:
+            None on a miss, else the entry's meta dict plus 'key', 'html' and
+            'png' (None if the entry has no PNG yet).
+        """
+        entry = self.root / self.entry_name(keys)
+        meta = self._meta(entry)
+        if meta is None or not (entry / "map.html").exists():
+            return None
+        try:
+            html = (entry / "map.html").read_text(encoding="utf-8")
+            html_path = ticket_dir / f"{stem}.html"
+            sidecars = entry / "sidecars"
+            if sidecars.is_dir():
+                # chunk URLs are relative to the page: "<stem>_layers/<hash>.js"
+                html = html.replace(f'"{meta["stem"]}_layers/', f'"{stem}_layers/')
+                shutil.copytree(sidecars, ticket_dir / f"{stem}_layers", dirs_exist_ok=True)
+            html_path.write_text(html, encoding="utf-8")
+            png_path = None
+            if (entry / "map.png").exists():
+                png_path = ticket_dir / f"{stem}.png"
+                shutil.copyfile(entry / "map.png", png_path)
+        except OSError as e:
+            print(f"⚠️ Could not reuse cached result {entry.name}: {e}")
+            return None
+        meta.update(key=entry.name, html=html_path, png=png_path)
+        return meta
+
+    def load_layers(self, keys: ResultKeys, names: Iterable[str]) -> Optional[Dict[str, gpd.GeoDataFrame]]:
+        """
+        Clipped layers of any entry with the same clip key, or None.
+        """
+        for entry in sorted(self.root.glob(f"{keys[0]}_*")):
+            paths = {name: entry / "layers" / f"{name}.parquet" for name in names}
+            if not all(p.exists() for p in paths.values()):
+                continue
+            try:
+                layers = {name: gpd.read_parquet(p) for name, p in paths.items()}
+            except Exception as e:
+                print(f"⚠️ Ignoring unreadable cached layers in {entry.name}: {e}")
+                continue
+            self._meta(entry)
+            return layers
+        return None
+
+    def store(
+        self,
+        keys: ResultKeys,
+        stem: str,
+        meta: Dict[str, Any],
+        clipped: Dict[str, gpd.GeoDataFrame],
+        html_path: Path,
+        sidecar_dir: Optional[Path] = None,
+        png_path: Optional[Path] = None
+    ) -> None:
+        """
+        Add a ticket's outputs as the entry for keys (written to a temporary
+        folder and renamed into place; an existing entry is kept).
+        """
+        entry = self.root / self.entry_name(keys)
+        if entry.exists():
+            return
+        tmp = self.root / f".{entry.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            (tmp / "layers").mkdir(parents=True, exist_ok=True)
+            try:
+                for name, gdf in clipped.items():
+                    gdf.to_parquet(tmp / "layers" / f"{name}.parquet", index=False)
+            except ImportError:
+                shutil.rmtree(tmp / "layers", ignore_errors=True)  # pyarrow missing: outputs only
+            shutil.copyfile(html_path, tmp / "map.html")
+            if sidecar_dir is not None and sidecar_dir.is_dir():
+                shutil.copytree(sidecar_dir, tmp / "sidecars")
+            if png_path is not None and Path(png_path).exists():
+                shutil.copyfile(png_path, tmp / "map.png")
+            meta = dict(meta, stem=stem, created=time.time())
+            (tmp / META_NAME).write_text(json.dumps(meta, indent=2, default=str), encoding="utf-8")
+            os.replace(tmp, entry)
+        except OSError as e:
+            if not entry.exists():  # losing a race to another process is fine
+                print(f"⚠️ Could not cache result {entry.name}: {e}")
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self._account(_tree_size(entry))
+
+    def add_png(self, key: str, png_path: Path) -> None:
+        """
+        Attach the screenshot taken after the entry was stored.
+        """
+        entry = self.root / key
+        if not entry.is_dir() or (entry / "map.png").exists():
+            return
+        tmp = entry / f".map.{os.getpid()}.tmp"
+        try:
+            shutil.copyfile(png_path, tmp)
+            os.replace(tmp, entry / "map.png")
+        except OSError as e:
+            print(f"⚠️ Could not cache screenshot for {key}: {e}")
+            return
+        self._account(Path(png_path).stat().st_size)
+
+    def _account(self, added: int) -> None:
+        with self._lock:
+            if self._size is None:
+                self._size = self.disk_usage()
+            else:
+                self._size += added
+            if self._size > self.max_bytes:
+                self._size = self._evict(int(self.max_bytes * EVICT_TO))
+
+    def _entries(self):
+        try:
+            return [p for p in self.root.iterdir() if p.is_dir() and not p.name.startswith(".")]
+        except OSError:
+            return []
+
+    def disk_usage(self) -> int:
+        """
+        Total size of the cached entries in bytes.
+        """
+        return sum(_tree_size(entry) for entry in self._entries())
+
+    def _evict(self, target: int) -> int:
+        """
+        Delete least recently used entries until the cache is at most target bytes.
+        """
+        entries = []
+        for entry in self._entries():
+            try:
+                used = (entry / META_NAME).stat().st_mtime
+            except OSError:
+                used = 0.0  # half-written or damaged: goes first
+            entries.append((used, _tree_size(entry), entry))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, entry in entries:
+            if total <= target:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            removed += 1
+        print(f"Result cache: evicted {removed} entr{'y' if removed == 1 else 'ies'}, {total / 2 ** 20:.0f} MB kept")
+        return total
+
+
+def _tree_size(path: Path) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+_caches: Dict[Path, ResultCache] = {}
+
+
+def open_result_cache(cfg) -> Optional[ResultCache]:
+    """
+    The process-wide ResultCache for the RESULT_CACHE section, or None if disabled.
+    """
+    settings = result_cache_settings(cfg)
+    root = settings["dir"]
+    if root is None:
+        return None
+    if root not in _caches:
+        root.mkdir(parents=True, exist_ok=True)
+        _caches[root] = ResultCache(root, settings["max_bytes"])
+    return _caches[root]
@@ -1,52 +1,308 @@
+# processing/screenshot.py
+"""
+Render saved Folium maps to PNG with headless Chrome.
+
+One Chrome session is kept for the life of the process and reused for every
+ticket (batch mode and the resident worker capture many in a row), and the
+chromedriver path is resolved once: SCREENSHOT.driver_path if set, otherwise
+webdriver-manager's answer remembered in a small file in the temp folder, so
+later runs skip its version lookup. A stale remembered driver (e.g. after a
+Chrome update) is dropped and resolved again.
+
+Instead of a fixed delay, capture waits for every Leaflet tile layer on the
+page to fire its `load` event and for any sidecar layer chunks in view
+(processing.map_sidecars) to arrive, then for two animation frames (the
+result has been painted), bounded by SCREENSHOT.timeout seconds. A timeout
+(of the tile wait or of the page load itself) still takes the screenshot of
+whatever is there but reports it. Only a lost Chrome session (crashed,
+closed or disconnected) is restarted and the capture retried.
+"""
+import atexit
 import subprocess
+import tempfile
+from functools import lru_cache
 from pathlib import Path
+from typing import Dict, Optional
+
 from selenium import webdriver
+from selenium.common.exceptions import (
+    InvalidSessionIdException,
+    NoSuchWindowException,
+    SessionNotCreatedException,
+    TimeoutException,
+    WebDriverException,
+)
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from urllib3.exceptions import MaxRetryError
+
+from processing.map_output import MAP_SIZE_PX
+
+DEFAULT_TIMEOUT_S = 20.0
+DRIVER_PATH_FILE = Path(tempfile.gettempdir()) / "ur_preview" / "chromedriver_path.txt"
+
+# Resolves (via the async-script callback) once every Leaflet GridLayer has
+# finished loading, no sidecar chunks are pending and the result has been
+# painted, or when the hard timeout passes. Tile errors count as finished:
+# Leaflet still fires `load` for them.
+_WAIT_FOR_TILES_JS = """
+const timeoutMs = arguments[0];
+const done = arguments[arguments.length - 1];
+const start = performance.now();
+let finished = false;
+
+function finish(status) {
+    if (finished) return;
+    if (status === "loaded" && window.UR_SIDECARS && window.UR_SIDECARS.pending > 0) {
+        setTimeout(() => finish(status), 25);
+        return;
+    }
+    finished = true;
+    requestAnimationFrame(() => requestAnimationFrame(() =>
+        done({status: status, ms: Math.round(performance.now() - start)})));
+}
+
+function findMap() {
+    if (typeof L === "undefined") return null;
+    for (const key of Object.keys(window)) {
+        try { if (window[key] instanceof L.Map) return window[key]; } catch (e) {}
+    }
+    return null;
+}
+
+function watch() {
+    if (finished) return;
+    const map = findMap();
+    if (!map) { setTimeout(watch, 25); return; }
+    let pending = 0;
+    map.eachLayer(layer => {
+        if (layer instanceof L.GridLayer && layer.isLoading && layer.isLoading()) {
+            pending += 1;
+            layer.once("load", () => { if (--pending === 0) finish("loaded"); });
+        }
+    });
+    if (pending === 0) finish("loaded");
+}
+
+setTimeout(() => finish("timeout"), timeoutMs);
+watch();
+"""
+
+
+def screenshot_settings(cfg) -> Dict[str, object]:
+    """
+    Read the SCREENSHOT config section: timeout (seconds), persistent
+    (reuse one Chrome across tickets) and driver_path (explicit chromedriver).
+    """
+    sec = cfg["SCREENSHOT"] if cfg is not None and "SCREENSHOT" in cfg else None
+    if sec is None:
+        return {"timeout": DEFAULT_TIMEOUT_S, "persistent": True, "driver_path": None}
+    driver_path = str(sec.get("DRIVER_PATH", "") or "").strip()
+    return {
+        "timeout": sec.getfloat("TIMEOUT", DEFAULT_TIMEOUT_S),
+        "persistent": sec.getboolean("PERSISTENT", True),
+        "driver_path": driver_path or None,
+    }
+
+
+@lru_cache(maxsize=1)
+def resolve_driver_path(configured: Optional[str] = None) -> str:
+    """
+    Path of the chromedriver executable, looked up at most once per process.
+
+    Args:
+        configured: SCREENSHOT.driver_path; used as-is when given.
+
+    Returns:
+        The driver path.
+    """
+    if configured:
+        return configured
+    try:
+        remembered = DRIVER_PATH_FILE.read_text(encoding="utf-8").strip()
+    except OSError:
+        remembered = ""
+    if remembered and Path(remembered).exists():
+        return remembered
+
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    path = ChromeDriverManager().install()
+    try:
+        DRIVER_PATH_FILE.parent.mkdir(parents=True, exist_ok=True)
+        DRIVER_PATH_FILE.write_text(path, encoding="utf-8")
+    except OSError:
+        pass
+    return path
+
 
+def forget_driver_path() -> None:
+    """
+    Drop the remembered chromedriver path so the next lookup asks
+    webdriver-manager again.
+    """
+    resolve_driver_path.cache_clear()
+    try:
+        DRIVER_PATH_FILE.unlink()
+    except OSError:
+        pass
 
-def screenshot_map(html_path: Path, png_path: Path, timeout: int = 20) -> None:
+
+class ChromeSession:
+    """
+    A lazily started headless Chrome that captures one map after another.
+    """
+
+    def __init__(self, driver_path: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT_S):
+        self.driver_path = driver_path
+        self.timeout = timeout
+        self._driver: Optional[webdriver.Chrome] = None
+
+    def _start(self) -> webdriver.Chrome:
+        options = Options()
+        options.add_argument("--headless=new")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--no-sandbox")
+        options.add_argument(f"--window-size={MAP_SIZE_PX[0]},{MAP_SIZE_PX[1]}")
+
+        def launch() -> webdriver.Chrome:
+            service = Service(
+                resolve_driver_path(self.driver_path),
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)  # hide console window on Windows
+            )
+            return webdriver.Chrome(service=service, options=options)
+
+        try:
+            return launch()
+        except SessionNotCreatedException:
+            if self.driver_path:
+                raise
+            # Remembered driver no longer matches the installed Chrome
+            forget_driver_path()
+            return launch()
+
+    @property
+    def driver(self) -> webdriver.Chrome:
+        if self._driver is None:
+            self._driver = self._start()
+        return self._driver
+
+    def capture(self, html_path: Path, png_path: Path, timeout: Optional[float] = None) -> Dict[str, object]:
+        """
+        Load a map and screenshot its Leaflet container once the tiles are in.
+
+        Args:
+            html_path: Saved .html map file.
+            png_path: Output .png path.
+            timeout: Hard limit in seconds for the tile wait (default: self.timeout).
+
+        Returns:
+            Dict with 'status' ('loaded' or 'timeout') and the wait in 'ms'.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        driver = self.driver
+        driver.set_page_load_timeout(timeout)
+        driver.set_script_timeout(timeout + 5)
+
+        try:
+            driver.get(Path(html_path).resolve().as_uri())
+        except TimeoutException:
+            # Page itself still loading: stop it and capture what is there
+            driver.execute_script("window.stop();")
+            result = {"status": "timeout", "ms": int(timeout * 1000)}
+        else:
+            try:
+                result = driver.execute_async_script(_WAIT_FOR_TILES_JS, int(timeout * 1000))
+            except TimeoutException:
+                result = {"status": "timeout", "ms": int((timeout + 5) * 1000)}
+
+        map_div = driver.find_element(By.CSS_SELECTOR, "div.leaflet-container")
+        map_div.screenshot(str(png_path))
+        return result
+
+    def close(self) -> None:
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except WebDriverException:
+                pass
+            self._driver = None
+
+
+_session: Optional[ChromeSession] = None
+
+
+def get_session(cfg=None) -> ChromeSession:
+    """
+    The process-wide Chrome session, started on first use and closed at exit.
+    """
+    global _session
+    if _session is None:
+        settings = screenshot_settings(cfg)
+        _session = ChromeSession(settings["driver_path"], settings["timeout"])
+        atexit.register(close_session)
+    return _session
+
+
+def close_session() -> None:
+    """
+    Quit the shared Chrome session, if one was started.
+    """
+    global _session
+    if _session is not None:
+        _session.close()
+        _session = None
+
+
+# WebDriverException messages that mean the browser or driver is gone
+_LOST_SESSION_MESSAGES = ("disconnected", "chrome not reachable", "session deleted", "target window already closed")
+
+
+def _session_lost(exc: Exception) -> bool:
+    """
+    True if exc means the Chrome session is dead (worth a restart), not that
+    this page was slow or broken.
+    """
+    if isinstance(exc, TimeoutException):
+        return False
+    if isinstance(exc, (InvalidSessionIdException, NoSuchWindowException, MaxRetryError, ConnectionError)):
+        return True
+    msg = (getattr(exc, "msg", None) or str(exc)).lower()
+    return isinstance(exc, WebDriverException) and any(m in msg for m in _LOST_SESSION_MESSAGES)
+
+
+def screenshot_map(html_path: Path, png_path: Path, timeout: Optional[float] = None, cfg=None) -> None:
     """
     Render a saved Folium map HTML to a PNG image using headless Chrome.
 
     Args:
         html_path: Path to the saved .html map file.
         png_path: Path where the screenshot .png will be saved.
-        timeout: Seconds to wait for the map container to load.
+        timeout: Seconds to wait for the page and its tiles (default: SCREENSHOT.timeout).
+        cfg: Loaded configuration (SCREENSHOT section), or None for defaults.
 
     Raises:
         Exception if Chrome fails to capture the screenshot.
     """
-    # Configure headless Chrome
-    options = Options()
-    options.add_argument("--headless=new")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--window-size=1200,800")
-
-    # Install driver silently
-    service = Service(
-        ChromeDriverManager().install(),
-        creationflags=subprocess.CREATE_NO_WINDOW  # hide console window on Windows
-    )
-
-    # Launch Chrome and capture screenshot
-    with webdriver.Chrome(service=service, options=options) as driver:
-        # Load the local HTML file
-        driver.get(html_path.resolve().as_uri())
-
-        # Wait for the Leaflet container
-        WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "div.leaflet-container"))
-        )
-
-        # Additional small delay to ensure tiles render
-        driver.execute_script("return new Promise(r => setTimeout(r, 500));")
-
-        # Locate the map container and screenshot
-        map_div = driver.find_element(By.CSS_SELECTOR, "div.leaflet-container")
-        map_div.screenshot(str(png_path))
+    settings = screenshot_settings(cfg)
+    if not settings["persistent"]:
+        session = ChromeSession(settings["driver_path"], settings["timeout"])
+        try:
+            result = session.capture(html_path, png_path, timeout)
+        finally:
+            session.close()
+    else:
+        session = get_session(cfg)
+        try:
+            result = session.capture(html_path, png_path, timeout)
+        except (WebDriverException, MaxRetryError, ConnectionError) as exc:
+            # Chrome died between tickets: start a fresh one and retry once.
+            # Anything else (a timeout included) would only fail again.
+            if not _session_lost(exc):
+                raise
+            session.close()
+            result = session.capture(html_path, png_path, timeout)
+
+    if result.get("status") != "loaded":
+        print(f"⚠️ Map tiles still loading after {result.get('ms')} ms; captured anyway: {png_path}")
@@ -0,0 +1,74 @@
+# processing/stages.py
+"""
+Registry of pipeline stages, imported on first use.
+
+Each stage is registered as a "module:attribute" target, not as the function
+itself. A stage's heavy dependencies (geopandas, folium, selenium, win32com,
+...) are therefore only imported when the stage actually runs, so a run that
+finds no ticket never pays for them.
+
+    clip = get_stage("clip")
+    clipped = clip(shapefiles, buf_gdf, ...)
+
+A plugin can replace a stage (or add one) with register_stage(), passing a
+target string or the callable itself, before the pipeline runs.
+"""
+import importlib
+from typing import Any, Callable, Dict, Union
+
+# stage name -> "module:attribute" (or an already-loaded callable)
+STAGES: Dict[str, Union[str, Callable[..., Any]]] = {
+    "parse": "parsers.ticket:parse_ticket",
+    "result_cache": "processing.result_cache:open_result_cache",
+    "result_keys": "processing.result_cache:result_keys",
+    "buffer_settings": "processing.buffering:buffer_settings",
+    "buffer": "processing.buffering:corridor_buffer",
+    "load_rules": "processing.classify:load_rules",
+    "clip": "processing.clipping:clip_all_shapefiles",
+    "optimize_map": "processing.map_output:optimize_map_layers",
+    "build_map": "processing.mapping:build_map",
+    "save_map": "processing.mapping:save_map",
+    "render_settings": "processing.static_map:render_settings",
+    "render_static": "processing.static_map:render_static_map",
+    "tile_server": "processing.tile_cache:ensure_tile_server",
+    "screenshot": "processing.screenshot:screenshot_map",
+    "compose_gml": "processing.emailer:compose_draft_gml",
+    "compose_txt": "processing.emailer:compose_draft_txt",
+    "save_draft": "processing.emailer:save_and_open_draft",
+}
+
+_loaded: Dict[str, Callable[..., Any]] = {}
+
+
+def register_stage(name: str, target: Union[str, Callable[..., Any]]) -> None:
+    """
+    Register (or replace) a stage.
+
+    Args:
+        name: Stage name used with get_stage().
+        target: "package.module:function", imported on first use, or the
+                callable itself.
+    """
+    STAGES[name] = target
+    _loaded.pop(name, None)
+
+
+def get_stage(name: str) -> Callable[..., Any]:
+    """
+    Return a stage's callable, importing its module the first time.
+
+    Raises:
+        KeyError: If no stage of that name is registered.
+        ImportError: If the stage's module (or a dependency) is missing.
+    """
+    fn = _loaded.get(name)
+    if fn is not None:
+        return fn
+    target = STAGES[name]
+    if isinstance(target, str):
+        module_name, _, attr = target.partition(":")
+        fn = getattr(importlib.import_module(module_name), attr)
+    else:
+        fn = target
+    _loaded[name] = fn
+    return fn
@@ -0,0 +1,259 @@
+# processing/static_map.py
+"""
+Static PNG renderer: draws the ticket map straight from the GeoDataFrames.
+
+The email PNG used to come from loading the Folium HTML in headless Chrome,
+which costs a browser start and a page load per ticket. This backend draws
+the same picture with matplotlib (Agg, no display needed):
+
+  - the 1200x800 viewport the browser would show, fitted with Leaflet's
+    zoom rule around the padded work area, in Web Mercator;
+  - a basemap assembled from XYZ tiles: RENDER.basemap_dir if set (a folder
+    laid out as <dir>/<z>/<x>/<y>.(jpg|png), never fetched into), otherwise
+    the TILES cache (processing.tile_cache), which fetches its misses;
+    tiles that can't be had are left blank;
+  - conduit, fiber by style class, work area, buffer and structure symbols,
+    styled from COLORS / WEIGHTS / OPACITIES / STRUCTURE_SYMBOL / LEGEND via
+    processing.map_style.map_style, plus the same legend entries.
+
+Select it with RENDER.backend = "static" ("browser" keeps the Chrome
+screenshot). matplotlib is imported lazily so the browser backend does not
+need it installed.
+"""
+import math
+import re
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import geopandas as gpd
+
+from processing.map_output import MAP_SIZE_PX, TILE_SIZE, fit_zoom
+from processing.map_style import LEGEND_ICON_HEIGHT, fiber_color, legend_entries, map_bounds, map_style
+from processing.tile_cache import TileCache, open_tile_cache
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+WEB_MERCATOR_HALF_WORLD = math.pi * 6378137.0
+BASEMAP_BACKGROUND = "#dddddd"
+LINE_KW = {"capstyle": "round", "joinstyle": "round"}
+SYMBOL_CAP_HEIGHT = 0.75  # letter height / font size; text markers are scaled by height
+
+_RGB_RE = re.compile(r"rgba?\(([^)]*)\)", re.IGNORECASE)
+
+
+def render_settings(cfg) -> Dict[str, object]:
+    """
+    Read the RENDER config section: backend ('browser' or 'static'),
+    basemap_dir (local XYZ tile folder relative to the project, or None)
+    and dpi.
+    """
+    sec = cfg["RENDER"] if "RENDER" in cfg else {}
+    basemap_dir = str(sec.get("BASEMAP_DIR", "") or "").strip()
+    return {
+        "backend": str(sec.get("BACKEND", "browser")).strip().lower(),
+        "basemap_dir": (PROJECT_ROOT / basemap_dir).resolve() if basemap_dir else None,
+        "dpi": int(sec.get("DPI", 100)),
+    }
+
+
+def css_color(value: Optional[str]):
+    """
+    Convert a CSS color string into something matplotlib accepts.
+
+    Hex (#RGB, #RRGGBB, #RRGGBBAA) and named colors pass through; rgb()/rgba()
+    become an RGBA tuple. None becomes fully transparent.
+    """
+    if value is None:
+        return (0.0, 0.0, 0.0, 0.0)
+    m = _RGB_RE.fullmatch(str(value).strip())
+    if not m:
+        return str(value).strip()
+    parts = [float(p) for p in m.group(1).replace("/", ",").split(",") if p.strip()]
+    r, g, b = (c / 255.0 for c in parts[:3])
+    return (r, g, b, parts[3] if len(parts) > 3 else 1.0)
+
+
+def _viewport(sw: list, ne: list, zoom: int, size_px: Tuple[int, int]) -> Tuple[float, float, float, float]:
+    """
+    Web Mercator extent (minx, miny, maxx, maxy) of a size_px viewport at zoom,
+    centred on the bounds like Leaflet's fitBounds().
+    """
+    def merc(lat: float, lon: float) -> Tuple[float, float]:
+        x = math.radians(lon) * 6378137.0
+        y = math.log(math.tan(math.pi / 4 + math.radians(lat) / 2)) * 6378137.0
+        return x, y
+
+    x0, y0 = merc(sw[0], sw[1])
+    x1, y1 = merc(ne[0], ne[1])
+    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+    m_per_px = 2 * WEB_MERCATOR_HALF_WORLD / (TILE_SIZE * 2 ** zoom)
+    half_w, half_h = size_px[0] * m_per_px / 2, size_px[1] * m_per_px / 2
+    return cx - half_w, cy - half_h, cx + half_w, cy + half_h
+
+
+def _draw_basemap(ax, tiles: TileCache, zoom: int, extent: Tuple[float, float, float, float]) -> int:
+    """
+    Draw the XYZ tiles under extent; returns how many were found.
+    """
+    from matplotlib.image import imread
+
+    tile_m = 2 * WEB_MERCATOR_HALF_WORLD / 2 ** zoom
+    minx, miny, maxx, maxy = extent
+    n = 2 ** zoom
+    x_range = range(max(int((minx + WEB_MERCATOR_HALF_WORLD) // tile_m), 0),
+                    min(int((maxx + WEB_MERCATOR_HALF_WORLD) // tile_m), n - 1) + 1)
+    y_range = range(max(int((WEB_MERCATOR_HALF_WORLD - maxy) // tile_m), 0),
+                    min(int((WEB_MERCATOR_HALF_WORLD - miny) // tile_m), n - 1) + 1)
+    found = 0
+    for x in x_range:
+        for y in y_range:
+            path = tiles.get(zoom, x, y)
+            if path is None:
+                continue
+            left = x * tile_m - WEB_MERCATOR_HALF_WORLD
+            top = WEB_MERCATOR_HALF_WORLD - y * tile_m
+            ax.imshow(imread(path), extent=(left, left + tile_m, top - tile_m, top),
+                      interpolation="bilinear", zorder=0)
+            found += 1
+    return found
+
+
+def _symbol_marker(symbol) -> str:
+    """
+    Matplotlib mathtext marker drawing a structure symbol letter in bold.
+    """
+    text = str(symbol)
+    if text.isalnum():
+        return rf"$\mathbf{{{text}}}$"
+    return "$" + "".join("\\" + c if c in "$%&#_{}" else c for c in text) + "$"
+
+
+def draw_facilities(ax, layers: Dict[str, gpd.GeoDataFrame], style: Dict, px_to_pt: float) -> None:
+    """
+    Draw CONDUIT / FIBERCABLE lines (zorder 2) and STRUCTURE symbols (zorder 5)
+    styled like the Folium map. Leaflet draws line strokes fully opaque.
+
+    Args:
+        ax: Matplotlib axes in Web Mercator metres.
+        layers: Classified layers by name, already in EPSG:3857.
+        style: processing.map_style.map_style() output.
+        px_to_pt: Points per screen pixel at the output dpi.
+    """
+    for name, merc in layers.items():
+        if merc.empty:
+            continue
+        if name == "FIBERCABLE":
+            classes = merc["style_class"] if "style_class" in merc.columns else None
+            groups = merc.groupby(classes) if classes is not None else [(None, merc)]
+            for cls, part in groups:
+                part.plot(ax=ax, color=css_color(fiber_color(style, cls)),
+                          linewidth=style["fiber_weight"] * px_to_pt, zorder=2, **LINE_KW)
+        elif name == "CONDUIT":
+            merc.plot(ax=ax, color=css_color(style["conduit_color"]),
+                      linewidth=style["conduit_weight"] * px_to_pt, zorder=2, **LINE_KW)
+        elif name == "STRUCTURE":
+            # One marker collection per symbol letter: thousands of ax.text
+            # artists (one font layout each) dominate dense renders
+            for sym, part in merc.groupby("symbol"):
+                ax.scatter(part.geometry.x, part.geometry.y, marker=_symbol_marker(sym),
+                           s=(style["struct_size"] * SYMBOL_CAP_HEIGHT * px_to_pt) ** 2,
+                           color=css_color(style["struct_color"]), alpha=style["struct_opacity"],
+                           linewidths=0, zorder=5)
+
+
+def render_static_map(
+    cfg,
+    work_gdf: gpd.GeoDataFrame,
+    buf_gdf: gpd.GeoDataFrame,
+    clipped: Dict[str, gpd.GeoDataFrame],
+    png_path: Path,
+    show_buffer: Optional[bool] = None,
+    size_px: Tuple[int, int] = MAP_SIZE_PX
+) -> Path:
+    """
+    Draw the ticket map to a PNG without a browser.
+
+    Args:
+        cfg: Loaded configuration (styling plus RENDER section).
+        work_gdf: Work area in EPSG:4326.
+        buf_gdf: Buffer polygon in EPSG:4326.
+        clipped: Clipped layers by name, in EPSG:4326.
+        png_path: Output .png path.
+        show_buffer: Overrides VISIBILITY.BUFFER_AREA when not None.
+        size_px: Image size in pixels.
+
+    Returns:
+        png_path.
+
+    Raises:
+        ImportError: If matplotlib is not installed.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.lines import Line2D
+    from matplotlib.patches import Patch
+
+    settings = render_settings(cfg)
+    dpi = settings["dpi"]
+    px_to_pt = 72.0 / dpi
+    style = map_style(cfg)
+    if show_buffer is None:
+        show_buffer = style["show_buffer"]
+
+    sw, ne = map_bounds(work_gdf)
+    zoom = fit_zoom(sw, ne, size_px)
+    extent = _viewport(sw, ne, zoom, size_px)
+
+    fig = Figure(figsize=(size_px[0] / dpi, size_px[1] / dpi), dpi=dpi)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_axis_off()
+    ax.set_facecolor(BASEMAP_BACKGROUND)
+    fig.patch.set_facecolor(BASEMAP_BACKGROUND)
+
+    # --- Basemap ---
+    tiles = TileCache(settings["basemap_dir"]) if settings["basemap_dir"] is not None else open_tile_cache(cfg)
+    if tiles is not None:
+        _draw_basemap(ax, tiles, zoom, extent)
+
+    area_color = css_color(style["work_area_color"])
+
+    # --- Clipped lines and structure symbols ---
+    draw_facilities(ax, {name: gdf.to_crs(epsg=3857) for name, gdf in clipped.items()}, style, px_to_pt)
+
+    # --- Work area and buffer (between the lines and the symbols) ---
+    def draw_area(gdf: gpd.GeoDataFrame, opacity: float) -> None:
+        merc = gdf.to_crs(epsg=3857)
+        merc.plot(ax=ax, color=area_color, alpha=opacity, linewidth=0, zorder=3)
+        if style["work_area_weight"] > 0:
+            merc.boundary.plot(ax=ax, color=area_color,
+                               linewidth=style["work_area_weight"] * px_to_pt, zorder=3, **LINE_KW)
+
+    draw_area(work_gdf, style["work_area_opacity"])
+    if show_buffer:
+        draw_area(buf_gdf, style["buffer_opacity"])
+
+    ax.set_xlim(extent[0], extent[2])
+    ax.set_ylim(extent[1], extent[3])
+
+    # --- Legend (bottom-left, like the HTML legend) ---
+    handles = []
+    for kind, value, label in legend_entries(style, clipped):
+        if kind == "symbol":
+            handles.append(Line2D([], [], linestyle="none", marker=f"${value}$",
+                                  color=css_color(style["struct_color"]), markersize=10, label=label))
+        elif kind == "work_area":
+            handles.append(Patch(facecolor=css_color(value), label=label))
+        else:
+            handles.append(Line2D([], [], color=css_color(value),
+                                  linewidth=LEGEND_ICON_HEIGHT[kind] * px_to_pt, label=label))
+    legend = ax.legend(
+        handles=handles, title="Legend", loc="lower left",
+        bbox_to_anchor=(50 / size_px[0], 50 / size_px[1]),
+        fontsize=14 * px_to_pt, title_fontsize=14 * px_to_pt,
+        framealpha=0.9, edgecolor="grey", fancybox=False,
+    )
+    legend.get_title().set_fontweight("bold")
+    legend.set_zorder(10)
+
+    png_path = Path(png_path)
+    fig.savefig(png_path, dpi=dpi, facecolor=fig.get_facecolor())
+    return png_path
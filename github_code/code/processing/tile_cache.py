@@ -0,0 +1,269 @@
+# processing/tile_cache.py
+"""
+Local cache and server for the basemap imagery tiles.
+
+Tiles are stored as plain files under TILES.cache_dir:
+
+    <cache_dir>/<z>/<x>/<y>.jpg   (or .png, whatever the upstream returned)
+
+so the folder can also be pointed at directly (RENDER.basemap_dir). Reading
+a tile touches its mtime; once the folder grows past TILES.max_mb the least
+recently used tiles are deleted until it is back under 90% of the limit.
+
+A small threaded HTTP server on 127.0.0.1:TILES.port serves /<z>/<x>/<y>
+from the cache, fetching and storing misses from TILES.url (unless
+TILES.offline is set, in which case misses are 404s). The Folium map points
+its tile layer at that server, so the screenshot of a ticket in an area seen
+before needs no remote requests; the static renderer reads the same cache
+in-process. tools/seed_tiles prefetches the service territory.
+"""
+import os
+import re
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+
+from utils.constants import TILES_ATTRIBUTION, TILES_URL
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+DEFAULT_MAX_MB = 1024
+DEFAULT_PORT = 8766
+FETCH_TIMEOUT_S = 10.0
+EVICT_TO = 0.9  # evict down to this fraction of max_bytes
+TILE_SUFFIXES = (".jpg", ".jpeg", ".png")
+USER_AGENT = "UR-Preview tile cache"
+
+_TILE_PATH_RE = re.compile(r"^/(\d+)/(\d+)/(\d+)(?:\.\w+)?/?$")
+
+
+def tile_settings(cfg) -> Dict[str, object]:
+    """
+    Read the TILES config section.
+
+    Returns:
+        Dict with the upstream 'url' template and 'attribution', plus
+        'cache_dir' (absolute Path, or None when TILES.cache is off),
+        'max_bytes', 'port' (0 = don't serve) and 'offline'.
+    """
+    sec = cfg["TILES"] if "TILES" in cfg else {}
+    enabled = "TILES" in cfg and cfg.getboolean("TILES", "CACHE", fallback=False)
+    cache_dir = (PROJECT_ROOT / sec.get("CACHE_DIR", "tile_cache")).resolve() if enabled else None
+    return {
+        "url": sec.get("URL") or TILES_URL,
+        "attribution": sec.get("ATTRIBUTION") or TILES_ATTRIBUTION,
+        "cache_dir": cache_dir,
+        "max_bytes": int(float(sec.get("MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024),
+        "port": int(sec.get("PORT", DEFAULT_PORT) or 0),
+        "offline": "TILES" in cfg and cfg.getboolean("TILES", "OFFLINE", fallback=False),
+    }
+
+
+class TileCache:
+    """
+    Size-bounded LRU folder of XYZ tiles with fetch-on-miss.
+    """
+
+    def __init__(self, root: Path, upstream: Optional[str] = None,
+                 max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024, offline: bool = False):
+        self.root = Path(root)
+        self.upstream = upstream
+        self.max_bytes = max_bytes
+        self.offline = offline or not upstream
+        self._size: Optional[int] = None  # counted on the first store
+        self._lock = threading.Lock()
+
+    def find(self, z: int, x: int, y: int) -> Optional[Path]:
+        """
+        Cached file of a tile, or None.
+        """
+        base = self.root / str(z) / str(x) / str(y)
+        for suffix in TILE_SUFFIXES:
+            path = base.with_suffix(suffix)
+            if path.exists():
+                return path
+        return None
+
+    def get(self, z: int, x: int, y: int) -> Optional[Path]:
+        """
+        Cached file of a tile, fetched from upstream on a miss (unless offline).
+        Hits are marked as recently used.
+        """
+        path = self.find(z, x, y)
+        if path is not None:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return path
+        if self.offline:
+            return None
+        data = self.fetch(z, x, y)
+        return self.store(z, x, y, data) if data else None
+
+    def fetch(self, z: int, x: int, y: int) -> Optional[bytes]:
+        """
+        Download a tile from the upstream template; None on any HTTP error.
+        """
+        url = self.upstream.format(z=z, x=x, y=y)
+        request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+        try:
+            with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT_S) as resp:
+                return resp.read()
+        except OSError as e:  # URLError and timeouts included
+            print(f"⚠️ Tile {z}/{x}/{y} fetch failed: {e}")
+            return None
+
+    def store(self, z: int, x: int, y: int, data: bytes) -> Path:
+        """
+        Write a tile atomically, evicting old tiles if the cache is over size.
+        """
+        suffix = ".png" if data[:8] == b"\x89PNG\r\n\x1a\n" else ".jpg"
+        path = self.root / str(z) / str(x) / f"{y}{suffix}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self.disk_usage()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._size = self._evict(int(self.max_bytes * EVICT_TO))
+        return path
+
+    def _files(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith(TILE_SUFFIXES):
+                    yield os.path.join(dirpath, name)
+
+    def disk_usage(self) -> int:
+        """
+        Total size of the cached tiles in bytes.
+        """
+        total = 0
+        for path in self._files():
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def _evict(self, target: int) -> int:
+        """
+        Delete least recently used tiles until the cache is at most target bytes.
+        """
+        entries = []
+        for path in self._files():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        print(f"Tile cache: evicted {removed} tile(s), {total / 2 ** 20:.0f} MB kept")
+        return total
+
+
+_caches: Dict[Path, TileCache] = {}
+
+
+def open_tile_cache(cfg) -> Optional[TileCache]:
+    """
+    The process-wide TileCache for the TILES section, or None if disabled.
+    """
+    settings = tile_settings(cfg)
+    root = settings["cache_dir"]
+    if root is None:
+        return None
+    if root not in _caches:
+        _caches[root] = TileCache(root, settings["url"], settings["max_bytes"], settings["offline"])
+    return _caches[root]
+
+
+def map_tile_url(cfg) -> str:
+    """
+    Tile URL template for the Folium map: the local tile server when the
+    cache is enabled and served, otherwise the upstream TILES.url.
+    """
+    settings = tile_settings(cfg)
+    if settings["cache_dir"] is None or not settings["port"]:
+        return settings["url"]
+    return f"http://127.0.0.1:{settings['port']}/{{z}}/{{x}}/{{y}}"
+
+
+class TileHandler(BaseHTTPRequestHandler):
+    server: "TileServer"
+
+    def do_GET(self):
+        m = _TILE_PATH_RE.match(self.path.split("?", 1)[0])
+        path = self.server.cache.get(*(int(g) for g in m.groups())) if m else None
+        if path is None:
+            self.send_error(404)
+            return
+        body = path.read_bytes()
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png" if path.suffix == ".png" else "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "max-age=86400")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # one line per tile is just noise
+
+
+class TileServer(ThreadingHTTPServer):
+    """
+    Serves a TileCache over HTTP; one thread per request.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, cache: TileCache):
+        super().__init__(address, TileHandler)
+        self.cache = cache
+
+
+_server: Optional[TileServer] = None
+
+
+def ensure_tile_server(cfg) -> Optional[str]:
+    """
+    Start the local tile server in a background thread (once per process).
+
+    If the port is already taken, another UR Preview process (e.g. the
+    resident worker) is assumed to be serving the same cache.
+
+    Returns:
+        The map's tile URL template, or None when the cache is not served.
+    """
+    global _server
+    settings = tile_settings(cfg)
+    cache = open_tile_cache(cfg)
+    if cache is None or not settings["port"]:
+        return None
+    if _server is None:
+        try:
+            _server = TileServer(("127.0.0.1", settings["port"]), cache)
+        except OSError as e:
+            print(f"Tile server port {settings['port']} in use ({e}); assuming it is already running")
+            return map_tile_url(cfg)
+        threading.Thread(target=_server.serve_forever, name="tile-server", daemon=True).start()
+    return map_tile_url(cfg)
@@ -0,0 +1,213 @@
+# processing/tile_store.py
+"""
+Grid-partitioned layer store for statewide-scale datasets.
+
+tools/partition_layers splits each prepared layer into Web-Mercator quadkey
+tiles at a fixed zoom, one GeoParquet file per tile, plus a manifest.json
+listing every tile's extent and the source signature it was built from:
+
+    <cache_dir>/tiles/<LAYER>/manifest.json
+    <cache_dir>/tiles/<LAYER>/<quadkey>.parquet
+
+A feature whose geometry crosses several tiles is written to each tile it
+intersects (not every tile under its bounding box, which for a long diagonal
+line is mostly empty tiles) with the same `_fid`, and read_tiles() drops the
+duplicates. At runtime only the
+tiles that the ticket buffer's bounding box touches are opened, so per-ticket
+I/O and memory stay flat as the network grows.
+"""
+import json
+import math
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+Bounds = Tuple[float, float, float, float]
+
+DEFAULT_ZOOM = 14  # ~1.8 km tiles at Michigan latitudes
+FID_COLUMN = "_fid"
+MANIFEST_NAME = "manifest.json"
+MAX_LAT = 85.0511287798
+
+
+def tiles_dir(cache_dir: Path, name: str) -> Path:
+    """
+    Directory holding the partitioned tiles of one layer.
+    """
+    return Path(cache_dir) / "tiles" / name
+
+
+def _tile_xy(lon: np.ndarray, lat: np.ndarray, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+    n = 2 ** zoom
+    lat = np.clip(lat, -MAX_LAT, MAX_LAT)
+    x = np.floor((lon + 180.0) / 360.0 * n)
+    lat_r = np.radians(lat)
+    y = np.floor((1.0 - np.log(np.tan(lat_r) + 1.0 / np.cos(lat_r)) / math.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(int), np.clip(y, 0, n - 1).astype(int)
+
+
+def tile_bounds(x: int, y: int, zoom: int) -> Bounds:
+    """
+    (minx, miny, maxx, maxy) in EPSG:4326 of an XYZ tile.
+    """
+    n = 2 ** zoom
+
+    def lat(yy):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * yy / n))))
+
+    return (x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y))
+
+
+def _tile_boxes(x: np.ndarray, y: np.ndarray, zoom: int) -> np.ndarray:
+    # vectorized tile_bounds() as shapely boxes
+    n = 2 ** zoom
+    lon0 = x / n * 360.0 - 180.0
+    lon1 = (x + 1) / n * 360.0 - 180.0
+    lat0 = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + 1) / n))))
+    lat1 = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y / n))))
+    return shapely.box(lon0, lat0, lon1, lat1)
+
+
+def quadkey(x: int, y: int, zoom: int) -> str:
+    """
+    Bing-style quadkey of an XYZ tile.
+    """
+    digits = []
+    for i in range(zoom, 0, -1):
+        mask = 1 << (i - 1)
+        digits.append(str((1 if x & mask else 0) + (2 if y & mask else 0)))
+    return "".join(digits)
+
+
+def tiles_for_bbox(bbox: Bounds, zoom: int) -> List[Tuple[int, int]]:
+    """
+    XYZ tiles (x, y) covering a bounding box in EPSG:4326.
+    """
+    minx, miny, maxx, maxy = bbox
+    (x0, x1), (y1, y0) = (
+        _tile_xy(np.array([minx, maxx]), np.array([miny, maxy]), zoom)
+    )
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def tiles_for_points(lon: np.ndarray, lat: np.ndarray, zoom: int) -> List[Tuple[int, int]]:
+    """
+    Distinct XYZ tiles (x, y) containing EPSG:4326 points.
+    """
+    x, y = _tile_xy(np.asarray(lon, dtype=float), np.asarray(lat, dtype=float), zoom)
+    return sorted(set(zip(x.tolist(), y.tolist())))
+
+
+def partition_layer(
+    gdf: gpd.GeoDataFrame,
+    out_dir: Path,
+    zoom: int = DEFAULT_ZOOM,
+    source: Optional[dict] = None
+) -> Dict[str, dict]:
+    """
+    Write a prepared EPSG:4326 layer as quadkey tiles plus a manifest.
+
+    Args:
+        gdf: Prepared layer (see processing.layer_cache.prepare_layer).
+        out_dir: Destination folder; replaced atomically on success.
+        zoom: Tile zoom level.
+        source: Source signature recorded in the manifest for staleness checks.
+
+    Returns:
+        The manifest's tile table (quadkey -> {'bounds', 'count'}).
+    """
+    out_dir = Path(out_dir)
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    gdf = gdf.reset_index(drop=True)
+    gdf[FID_COLUMN] = np.arange(len(gdf))
+    b = gdf.geometry.bounds
+    x0, y1 = _tile_xy(b["minx"].to_numpy(), b["miny"].to_numpy(), zoom)
+    x1, y0 = _tile_xy(b["maxx"].to_numpy(), b["maxy"].to_numpy(), zoom)
+
+    # Most features fall in one tile. The rest go to every tile their
+    # geometry intersects: the candidate tiles under their extents are
+    # matched against them with one STRtree query.
+    single = (x0 == x1) & (y0 == y1)
+    rows, xs, ys = [np.flatnonzero(single)], [x0[single]], [y0[single]]
+    multi = np.flatnonzero(~single)
+    if len(multi):
+        nx, ny = x1[multi] - x0[multi] + 1, y1[multi] - y0[multi] + 1
+        count = nx * ny
+        owner = np.repeat(np.arange(len(multi)), count)
+        offset = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        cand_x = x0[multi][owner] + offset // ny[owner]
+        cand_y = y0[multi][owner] + offset % ny[owner]
+        cand = np.unique(np.column_stack([cand_x, cand_y]), axis=0)
+        tree = shapely.STRtree(gdf.geometry.values[multi])
+        tile_i, feat_i = tree.query(_tile_boxes(cand[:, 0], cand[:, 1], zoom), predicate="intersects")
+        rows.append(multi[feat_i])
+        xs.append(cand[tile_i, 0])
+        ys.append(cand[tile_i, 1])
+    assign = pd.DataFrame({"row": np.concatenate(rows), "x": np.concatenate(xs), "y": np.concatenate(ys)})
+
+    tiles: Dict[str, dict] = {}
+    for (x, y), group in assign.groupby(["x", "y"]):
+        key = quadkey(int(x), int(y), zoom)
+        part = gdf.iloc[group["row"].to_numpy()]
+        part.to_parquet(tmp_dir / f"{key}.parquet", index=False)
+        tiles[key] = {"bounds": list(tile_bounds(int(x), int(y), zoom)), "count": int(len(part))}
+
+    manifest = {"zoom": zoom, "source": source, "features": int(len(gdf)), "tiles": tiles}
+    (tmp_dir / MANIFEST_NAME).write_text(json.dumps(manifest), encoding="utf-8")
+
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    os.replace(tmp_dir, out_dir)
+    return tiles
+
+
+def read_manifest(layer_dir: Path) -> Optional[dict]:
+    """
+    Return a partitioned layer's manifest, or None if it has not been built.
+    """
+    path = Path(layer_dir) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def read_tiles(layer_dir: Path, bbox: Bounds, manifest: Optional[dict] = None) -> gpd.GeoDataFrame:
+    """
+    Read only the tiles of a partitioned layer that intersect bbox.
+
+    Args:
+        layer_dir: Folder written by partition_layer().
+        bbox: (minx, miny, maxx, maxy) in EPSG:4326.
+        manifest: Already loaded manifest, to skip re-reading it.
+
+    Returns:
+        The features from the touched tiles (deduplicated), in EPSG:4326.
+    """
+    layer_dir = Path(layer_dir)
+    manifest = manifest or read_manifest(layer_dir)
+    zoom = manifest["zoom"]
+    keys = [quadkey(x, y, zoom) for x, y in tiles_for_bbox(bbox, zoom)]
+    paths = [str(layer_dir / f"{k}.parquet") for k in keys if k in manifest["tiles"]]
+    if not paths:
+        # keep the schema by reading any tile and dropping its rows
+        any_key = next(iter(manifest["tiles"]), None)
+        if any_key is None:
+            return gpd.GeoDataFrame(geometry=[], crs="EPSG:4326")
+        return gpd.read_parquet(layer_dir / f"{any_key}.parquet").iloc[0:0].drop(columns=FID_COLUMN)
+
+    # one multi-file read is much cheaper than a read_parquet() per tile
+    gdf = gpd.read_parquet(paths)
+    return gdf.drop_duplicates(subset=FID_COLUMN).drop(columns=FID_COLUMN).reset_index(drop=True)
@@ -42,9 +42,10 @@ set "PYTHONEXE=%PYTHONEXE:"=%"
 set "ScriptPath=%ScriptPath:"=%"
 
 REM ──────────────────────────────────────────────────────────────
-REM 3) Launch the configured script (unchanged behavior)
-echo Launching: "%PYTHON%" "%ScriptPath%"
-"%PYTHON%" "%ScriptPath%"
+REM 3) Launch the configured script; extra arguments are passed through
+REM    (e.g. a second shortcut with "--batch" processes every pending ticket)
+echo Launching: "%PYTHON%" "%ScriptPath%" %*
+"%PYTHON%" "%ScriptPath%" %*
 set "EC=%ERRORLEVEL%"
 
 if not "%EC%"=="0" (
@@ -0,0 +1,11 @@
+# tests/conftest.py
+"""
+Shared pytest setup: make the code folder importable (modules import each
+other as top-level packages, e.g. `from processing.tile_cache import ...`).
+"""
+import sys
+from pathlib import Path
+
+CODE_ROOT = Path(__file__).resolve().parents[1]
+if str(CODE_ROOT) not in sys.path:
+    sys.path.insert(0, str(CODE_ROOT))
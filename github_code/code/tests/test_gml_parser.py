@@ -0,0 +1,121 @@
+# tests/test_gml_parser.py
+"""
+Fast GML reader (parsers.gml_parser.read_gml_fast): same geometries and CRS
+as OGR (gpd.read_file) for GML 2, 3 and 3.2 tickets with short, URL and URN
+srsNames, and None (OGR fallback) for GML or CRSs it can't handle.
+"""
+import geopandas as gpd
+import pytest
+import shapely
+
+from parsers.gml_parser import read_and_reproject, read_gml_fast
+
+GML2 = "http://www.opengis.net/gml"
+GML32 = "http://www.opengis.net/gml/3.2"
+
+# (lon, lat) ring around downtown Detroit and a hole inside it
+LONLAT = [(-83.06, 42.32), (-83.04, 42.32), (-83.04, 42.34), (-83.06, 42.34), (-83.06, 42.32)]
+HOLE = [(-83.055, 42.325), (-83.05, 42.325), (-83.05, 42.33), (-83.055, 42.325)]
+# the same area in UTM 17N (EPSG:32617), easting/northing
+UTM = [(329700.0, 4687300.0), (331350.0, 4687300.0), (331350.0, 4689520.0),
+       (329700.0, 4689520.0), (329700.0, 4687300.0)]
+
+
+def collection(gml_ns: str, members: str) -> str:
+    member_tag = "gml:featureMember" if gml_ns == GML2 else "ogr:featureMember"
+    ids = ' gml:id="f1"' if gml_ns == GML32 else ""
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        f'<ogr:FeatureCollection xmlns:ogr="http://ogr.maptools.org/" xmlns:gml="{gml_ns}"{ids}>\n'
+        + "".join(
+            f'<{member_tag}><ogr:WorkArea{ids.replace("f1", f"w{i}")}><ogr:geometryProperty>{geom}'
+            f'</ogr:geometryProperty><ogr:name>area {i}</ogr:name></ogr:WorkArea></{member_tag}>\n'
+            for i, geom in enumerate(members)
+        )
+        + "</ogr:FeatureCollection>\n"
+    )
+
+
+def gml2_polygon(srs: str, ring, hole=None) -> str:
+    def coords(r):
+        return " ".join(f"{x},{y}" for x, y in r)
+    inner = (f"<gml:innerBoundaryIs><gml:LinearRing><gml:coordinates>{coords(hole)}"
+             "</gml:coordinates></gml:LinearRing></gml:innerBoundaryIs>") if hole else ""
+    return (f'<gml:Polygon srsName="{srs}"><gml:outerBoundaryIs><gml:LinearRing><gml:coordinates>'
+            f"{coords(ring)}</gml:coordinates></gml:LinearRing></gml:outerBoundaryIs>{inner}</gml:Polygon>")
+
+
+def gml3_polygon(srs: str, ring, hole=None, gml_id="") -> str:
+    def pos_list(r):
+        return " ".join(f"{x} {y}" for x, y in r)
+    inner = (f"<gml:interior><gml:LinearRing><gml:posList>{pos_list(hole)}"
+             "</gml:posList></gml:LinearRing></gml:interior>") if hole else ""
+    ident = f' gml:id="{gml_id}"' if gml_id else ""
+    return (f'<gml:Polygon srsName="{srs}"{ident}><gml:exterior><gml:LinearRing><gml:posList>'
+            f"{pos_list(ring)}</gml:posList></gml:LinearRing></gml:exterior>{inner}</gml:Polygon>")
+
+
+def gml3_line(srs: str, coords, gml_id="") -> str:
+    ident = f' gml:id="{gml_id}"' if gml_id else ""
+    return (f'<gml:LineString srsName="{srs}"{ident}><gml:posList>'
+            + " ".join(f"{x} {y}" for x, y in coords) + "</gml:posList></gml:LineString>")
+
+
+def latlon(ring):
+    return [(y, x) for x, y in ring]
+
+
+CASES = {
+    "gml2_short": (GML2, [gml2_polygon("EPSG:4326", LONLAT, HOLE)]),
+    "gml2_url": (GML2, [gml2_polygon("http://www.opengis.net/gml/srs/epsg.xml#4326", LONLAT)]),
+    "gml2_projected": (GML2, [gml2_polygon("EPSG:32617", UTM)]),
+    "gml3_short": (GML2, [gml3_polygon("EPSG:4326", LONLAT, HOLE)]),
+    "gml3_urn_latlon": (GML2, [gml3_polygon("urn:ogc:def:crs:EPSG::4326", latlon(LONLAT), latlon(HOLE)),
+                               gml3_line("urn:ogc:def:crs:EPSG::4326", latlon(LONLAT[:3]))]),
+    "gml3_urn_projected": (GML2, [gml3_polygon("urn:ogc:def:crs:EPSG::32617", UTM)]),
+    "gml32_urn_latlon": (GML32, [gml3_polygon("urn:ogc:def:crs:EPSG::4326", latlon(LONLAT), gml_id="p0"),
+                                 gml3_line("urn:ogc:def:crs:EPSG::4326", latlon(LONLAT[:3]), gml_id="l1")]),
+    "gml32_url_projected": (GML32, [gml3_polygon("http://www.opengis.net/def/crs/EPSG/0/32617", UTM,
+                                                 gml_id="p0")]),
+}
+
+
+def write(tmp_path, name, gml_ns, members):
+    path = tmp_path / f"{name}.gml"
+    path.write_text(collection(gml_ns, members), encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_fast_reader_matches_ogr(tmp_path, name):
+    path = write(tmp_path, name, *CASES[name])
+    fast = read_gml_fast(path)
+    ogr = gpd.read_file(path)
+
+    assert fast is not None
+    assert fast.crs.to_epsg() == ogr.crs.to_epsg()
+    assert len(fast) == len(ogr)
+    for a, b in zip(fast.geometry, ogr.geometry):
+        assert shapely.equals_exact(shapely.normalize(a), shapely.normalize(b), tolerance=1e-9)
+
+
+@pytest.mark.parametrize("srs", ["urn:ogc:def:crs:EPSG::999999", "EPSG:999999"])
+def test_unknown_epsg_falls_back_to_ogr(tmp_path, srs):
+    path = write(tmp_path, "unknown", GML2, [gml3_polygon(srs, LONLAT)])
+    assert read_gml_fast(path) is None
+
+
+def test_curves_fall_back_to_ogr(tmp_path):
+    curve = ('<gml:Curve srsName="EPSG:4326"><gml:segments><gml:LineStringSegment><gml:posList>'
+             "-83.06 42.32 -83.04 42.34</gml:posList></gml:LineStringSegment></gml:segments></gml:Curve>")
+    path = write(tmp_path, "curve", GML2, [curve])
+    assert read_gml_fast(path) is None
+    assert len(read_and_reproject(path)) == 1
+
+
+def test_projected_ticket_is_reprojected_to_wgs84(tmp_path):
+    path = write(tmp_path, "utm", *CASES["gml3_urn_projected"])
+    gdf = read_and_reproject(path)
+    assert gdf.crs.to_epsg() == 4326
+    minx, miny, maxx, maxy = gdf.total_bounds
+    assert -83.1 < minx < maxx < -83.0 and 42.3 < miny < maxy < 42.4
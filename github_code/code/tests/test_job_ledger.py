@@ -0,0 +1,85 @@
+# tests/test_job_ledger.py
+"""
+State machine of the ingest job ledger (utils.job_ledger).
+"""
+import pytest
+
+from utils.job_ledger import JobLedger
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    db = JobLedger(tmp_path / "jobs.sqlite3", max_attempts=3)
+    yield db
+    db.close()
+
+
+def only_job(ledger):
+    (job,) = ledger.jobs()
+    return job
+
+
+def test_enqueue_once_per_download(ledger, tmp_path):
+    ticket = tmp_path / "a.gml"
+    assert ledger.enqueue(ticket, 10, 1)
+    assert not ledger.enqueue(ticket, 10, 1)  # already queued
+    job = ledger.claim()
+    ledger.done(job["id"])
+    assert not ledger.enqueue(ticket, 10, 1)  # same download, already done
+    assert ledger.enqueue(ticket, 12, 2)       # new download of the same name
+    job = only_job(ledger)
+    assert (job["state"], job["attempts"], job["size"]) == ("queued", 0, 12)
+
+
+def test_enqueue_ignores_running_job(ledger, tmp_path):
+    ledger.enqueue(tmp_path / "a.gml", 10, 1)
+    ledger.claim()
+    assert not ledger.enqueue(tmp_path / "a.gml", 12, 2)
+
+
+def test_claim_takes_oldest_and_counts_attempts(ledger, tmp_path):
+    ledger.enqueue(tmp_path / "a.gml", 1, 1)
+    ledger.enqueue(tmp_path / "b.gml", 1, 1)
+    job = ledger.claim()
+    assert job["source"].endswith("a.gml")
+    assert (job["state"], job["attempts"]) == ("running", 1)
+    assert ledger.claim()["source"].endswith("b.gml")
+    assert ledger.claim() is None
+    assert ledger.counts()["running"] == 2
+
+
+def test_failed_retries_until_max_attempts(ledger, tmp_path):
+    ledger.enqueue(tmp_path / "a.gml", 1, 1)
+    for attempt in (1, 2):
+        job = ledger.claim()
+        assert job["attempts"] == attempt
+        assert ledger.failed(job["id"], "boom") == "queued"
+    job = ledger.claim()
+    assert ledger.failed(job["id"], "boom") == "failed"
+    assert ledger.claim() is None
+    assert only_job(ledger)["error"] == "boom"
+
+    assert ledger.retry_failed() == 1
+    job = ledger.claim()
+    assert job["attempts"] == 1
+    assert ledger.failed(job["id"], "again") == "queued"
+
+
+def test_recover_requeues_interrupted_job(ledger, tmp_path):
+    ledger.enqueue(tmp_path / "a.gml", 1, 1)
+    ledger.claim()
+    assert ledger.recover() == 1
+    job = only_job(ledger)
+    assert (job["state"], job["error"]) == ("queued", "interrupted")
+
+
+def test_recover_stops_a_ticket_that_keeps_killing_the_process(ledger, tmp_path):
+    ledger.enqueue(tmp_path / "a.gml", 1, 1)
+    for _ in range(6):  # each start: recover, claim, process dies
+        ledger.recover()
+        if ledger.claim() is None:
+            break
+    ledger.recover()
+    job = only_job(ledger)
+    assert (job["state"], job["attempts"], job["error"]) == ("failed", 3, "interrupted")
+    assert ledger.claim() is None
@@ -0,0 +1,104 @@
+# tests/test_tile_cache.py
+"""
+Tile cache and local tile server against a pre-seeded cache folder; no test
+touches the network (upstream fetching is disabled throughout).
+"""
+import os
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from processing.tile_cache import EVICT_TO, TileCache, TileServer
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 56
+JPG = b"\xff\xd8\xff\xe0" + b"\x00" * 60
+
+
+def seed(root, z, x, y, data, suffix):
+    path = root / str(z) / str(x) / f"{y}{suffix}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    seed(tmp_path, 16, 100, 200, PNG, ".png")
+    seed(tmp_path, 16, 100, 201, JPG, ".jpg")
+    return TileCache(tmp_path, upstream=None)
+
+
+def test_find_and_get_hit_seeded_tiles(cache, tmp_path):
+    assert cache.offline  # no upstream: misses are never fetched
+    assert cache.find(16, 100, 200) == tmp_path / "16" / "100" / "200.png"
+    assert cache.find(16, 100, 201) == tmp_path / "16" / "100" / "201.jpg"
+    assert cache.get(16, 100, 200).read_bytes() == PNG
+
+
+def test_get_miss_offline_returns_none(cache):
+    assert cache.find(16, 100, 202) is None
+    assert cache.get(16, 100, 202) is None
+
+
+def test_offline_flag_overrides_upstream(tmp_path):
+    cache = TileCache(tmp_path, upstream="http://127.0.0.1:9/{z}/{x}/{y}", offline=True)
+
+    def no_fetch(*args):
+        raise AssertionError("offline cache fetched a tile")
+
+    cache.fetch = no_fetch
+    assert cache.get(1, 2, 3) is None
+
+
+def test_get_marks_hit_as_recently_used(cache, tmp_path):
+    path = tmp_path / "16" / "100" / "200.png"
+    os.utime(path, (1_000_000, 1_000_000))
+    cache.get(16, 100, 200)
+    assert path.stat().st_mtime > 1_000_000
+
+
+def test_store_evicts_least_recently_used_to_90_percent(tmp_path):
+    tile = b"\xff\xd8" + b"\x00" * 998  # 1000-byte JPEG
+    max_bytes = 10_000
+    for y in range(10):
+        path = seed(tmp_path, 12, 0, y, tile, ".jpg")
+        os.utime(path, (1_000_000 + y, 1_000_000 + y))  # y=0 is the oldest
+    cache = TileCache(tmp_path, upstream=None, max_bytes=max_bytes)
+
+    cache.store(12, 0, 10, tile)  # 11 000 bytes > max_bytes
+
+    assert cache.disk_usage() <= max_bytes * EVICT_TO
+    assert cache.disk_usage() == 9_000
+    assert cache.find(12, 0, 0) is None and cache.find(12, 0, 1) is None
+    assert cache.find(12, 0, 2) is not None
+    assert cache.find(12, 0, 10) is not None  # the new tile is the most recent
+
+
+@pytest.fixture
+def server(cache):
+    srv = TileServer(("127.0.0.1", 0), cache)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+    thread.join()
+
+
+def test_server_serves_seeded_tiles(server):
+    with urllib.request.urlopen(f"{server}/16/100/200", timeout=5) as resp:
+        assert resp.status == 200
+        assert resp.headers["Content-Type"] == "image/png"
+        assert resp.read() == PNG
+    with urllib.request.urlopen(f"{server}/16/100/201.jpg", timeout=5) as resp:
+        assert resp.headers["Content-Type"] == "image/jpeg"
+        assert resp.read() == JPG
+
+
+def test_server_miss_is_404(server):
+    for path in ("/16/100/202", "/not/a/tile"):
+        with pytest.raises(urllib.error.HTTPError) as err:
+            urllib.request.urlopen(f"{server}{path}", timeout=5)
+        assert err.value.code == 404
@@ -0,0 +1,53 @@
+# tests/test_tile_store.py
+"""
+Quadkey partitioning (processing.tile_store): features go to the tiles their
+geometry crosses, and windowed reads return them once.
+"""
+import json
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from processing.tile_store import (
+    MANIFEST_NAME, partition_layer, quadkey, read_tiles, tile_bounds, tiles_for_points,
+)
+
+ZOOM = 14
+
+
+def crossed_tiles(line, zoom=ZOOM):
+    # tiles under a densely sampled line (~1 m steps) are the ones it crosses
+    pts = shapely.get_coordinates(shapely.segmentize(line, 1e-5))
+    return set(tiles_for_points(pts[:, 0], pts[:, 1], zoom))
+
+
+def test_long_diagonal_line_only_goes_to_tiles_it_crosses(tmp_path):
+    diagonal = shapely.LineString([(-85.0, 42.0), (-84.0, 43.0)])
+    short = [shapely.LineString([(-84.9 + i * 1e-3, 42.5), (-84.9 + i * 1e-3 + 1e-4, 42.5)]) for i in range(50)]
+    gdf = gpd.GeoDataFrame({"name": ["long"] + ["short"] * len(short)},
+                           geometry=[diagonal] + short, crs="EPSG:4326")
+
+    tiles = partition_layer(gdf, tmp_path / "CONDUIT", zoom=ZOOM)
+
+    expected = {quadkey(x, y, ZOOM) for x, y in crossed_tiles(diagonal)}
+    with_line = {k for k in tiles if "long" in set(gpd.read_parquet(tmp_path / "CONDUIT" / f"{k}.parquet")["name"])}
+    assert with_line == expected
+    assert len(expected) < 300  # the bounding box covers ~8,000 tiles
+    manifest = json.loads((tmp_path / "CONDUIT" / MANIFEST_NAME).read_text())
+    assert manifest["features"] == len(gdf)
+
+
+def test_read_tiles_window(tmp_path):
+    diagonal = shapely.LineString([(-85.0, 42.0), (-84.0, 43.0)])
+    gdf = gpd.GeoDataFrame({"name": ["long"]}, geometry=[diagonal], crs="EPSG:4326")
+    partition_layer(gdf, tmp_path / "L", zoom=ZOOM)
+
+    # a window on the line finds it once, even across several tiles
+    on_line = read_tiles(tmp_path / "L", (-84.52, 42.48, -84.48, 42.52))
+    assert list(on_line["name"]) == ["long"]
+    # the far corner of the line's bounding box holds nothing
+    x, y = next(iter(tiles_for_points(np.array([-84.99]), np.array([42.99]), ZOOM)))
+    minx, miny, maxx, maxy = tile_bounds(x, y, ZOOM)
+    corner = read_tiles(tmp_path / "L", (minx + 1e-6, miny + 1e-6, maxx - 1e-6, maxy - 1e-6))
+    assert corner.empty
@@ -0,0 +1,2 @@
+# tools/__init__.py
+# Maintenance commands, run from the code folder as `python -m tools.<name>`.
@@ -0,0 +1,50 @@
+# tools/build_spatial_index.py
+"""
+Build or refresh the .qix spatial index of every layer in SHAPEFILES.
+
+Usage (from the code folder):
+    python -m tools.build_spatial_index [--force] [--config PATH]
+
+Run it after dropping a new UR_data export in place; indexes that are
+already newer than their shapefile are left alone unless --force is given.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from utils.config import load_config, load_default_config, ConfigError
+from utils.paths import get_shapefile_paths
+from utils.spatial_index import build_spatial_index
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build .qix spatial indexes for configured shapefiles.")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the index is current")
+    parser.add_argument("--config", type=Path, help="config.json to use (default: auto-detect)")
+    args = parser.parse_args(argv)
+
+    try:
+        cfg = load_config(args.config) if args.config else load_default_config()
+    except ConfigError as e:
+        print(f"Configuration error: {e}")
+        return 1
+
+    failures = 0
+    for name, shp_path in get_shapefile_paths(cfg, PROJECT_ROOT).items():
+        try:
+            method = build_spatial_index(shp_path, force=args.force)
+        except Exception as e:
+            print(f"{name}: FAILED ({e})")
+            failures += 1
+            continue
+        if method is None:
+            print(f"{name}: index up to date")
+        else:
+            print(f"{name}: index built ({method})")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
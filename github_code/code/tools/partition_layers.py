@@ -0,0 +1,52 @@
+# tools/partition_layers.py
+"""
+Split every SHAPEFILES layer into quadkey grid tiles under the layer cache.
+
+Usage (from the code folder):
+    python -m tools.partition_layers [--zoom Z] [--config PATH]
+
+Writes <CACHE.dir>/tiles/<LAYER>/ (see processing.tile_store). Once a
+layer's tiles exist and match its shapefile, windowed reads open only the
+tiles under the ticket buffer. Re-run after each UR_data refresh; stale
+tiles are ignored (with a warning) until then.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from utils.config import load_config, load_default_config, ConfigError
+from utils.paths import get_shapefile_paths, get_cache_dir
+from processing.layer_cache import cache_identity, load_layer
+from processing.tile_store import DEFAULT_ZOOM, partition_layer, tiles_dir
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Partition configured layers into grid tiles.")
+    parser.add_argument("--zoom", type=int, default=None,
+                        help=f"tile zoom level (default: CACHE.tile_zoom or {DEFAULT_ZOOM})")
+    parser.add_argument("--config", type=Path, help="config.json to use (default: auto-detect)")
+    args = parser.parse_args(argv)
+
+    try:
+        cfg = load_config(args.config) if args.config else load_default_config()
+    except ConfigError as e:
+        print(f"Configuration error: {e}")
+        return 1
+
+    cache_dir = get_cache_dir(cfg, PROJECT_ROOT)
+    if cache_dir is None:
+        print("The layer cache is disabled; set CACHE.enabled to use partitioned tiles.")
+        return 1
+    zoom = args.zoom or cfg["CACHE"].getint("TILE_ZOOM", DEFAULT_ZOOM)
+
+    for name, shp_path in get_shapefile_paths(cfg, PROJECT_ROOT).items():
+        gdf = load_layer(name, shp_path, cache_dir)
+        tiles = partition_layer(gdf, tiles_dir(cache_dir, name), zoom, cache_identity(name, shp_path))
+        print(f"{name}: {len(gdf)} feature(s) in {len(tiles)} tile(s) at z{zoom}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
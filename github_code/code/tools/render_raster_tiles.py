@@ -0,0 +1,71 @@
+# tools/render_raster_tiles.py
+"""
+Render the utility layers into the raster tile pyramid (RASTER_TILES).
+
+Usage (from the code folder):
+    python -m tools.render_raster_tiles [--zooms 14-18] [--workers N]
+                                        [--full] [--config PATH]
+
+Draws every SHAPEFILES layer, styled like the map, into transparent PNG
+tiles under <CACHE.dir>/raster. Re-run it after a UR_data refresh or a
+styling change: only tiles whose features or style changed are redrawn,
+and tiles that no longer have any facilities are deleted. --full redraws
+everything.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from utils.config import load_config, load_default_config, ConfigError
+from utils.paths import get_shapefile_paths, get_cache_dir
+from processing.classify import load_rules
+from processing.clipping import add_map_columns
+from processing.layer_cache import cache_identity, load_layer
+from processing.raster_tiles import parse_zooms, raster_settings, update_pyramid
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Render facility layers into XYZ raster tiles.")
+    parser.add_argument("--zooms", default=None, help="zoom levels, e.g. 14-18 (default: RASTER_TILES.zooms)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="render processes (default: RASTER_TILES.workers, 0 = one per CPU)")
+    parser.add_argument("--full", action="store_true", help="redraw every tile, ignoring the manifest")
+    parser.add_argument("--config", type=Path, help="config.json to use (default: auto-detect)")
+    args = parser.parse_args(argv)
+
+    try:
+        cfg = load_config(args.config) if args.config else load_default_config()
+    except ConfigError as e:
+        print(f"Configuration error: {e}")
+        return 1
+
+    settings = raster_settings(cfg)
+    if settings["dir"] is None:
+        print("Raster tiles live in the layer cache; set CACHE.enabled to render them.")
+        return 1
+    zooms = parse_zooms(args.zooms) if args.zooms else settings["zooms"]
+    workers = settings["workers"] if args.workers is None else args.workers
+
+    t0 = time.perf_counter()
+    cache_dir = get_cache_dir(cfg, PROJECT_ROOT)
+    rules = load_rules(cfg)
+    layers, sources = {}, {}
+    for name, shp_path in get_shapefile_paths(cfg, PROJECT_ROOT).items():
+        layers[name] = add_map_columns(name, load_layer(name, shp_path, cache_dir).copy(), rules)
+        sources[name] = cache_identity(name, shp_path)
+    print(f"Loaded {sum(len(g) for g in layers.values())} features in {time.perf_counter() - t0:.1f} s")
+
+    t0 = time.perf_counter()
+    counts = update_pyramid(cfg, layers, sources, settings["dir"], zooms, workers, args.full)
+    print(f"z{zooms[0]}-{zooms[-1]}: {counts['tiles']} tile(s); rendered {counts['rendered']}, "
+          f"deleted {counts['deleted']} in {time.perf_counter() - t0:.1f} s -> {settings['dir']}")
+    if not settings["enabled"]:
+        print("RASTER_TILES.enabled is off, so maps keep drawing vector layers.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# tools/seed_tiles.py
+"""
+Prefetch basemap imagery into the local tile cache (TILES.cache_dir).
+
+Usage (from the code folder):
+    python -m tools.seed_tiles [--zooms 15-18] [--ring N] [--bbox W,S,E,N]
+                               [--workers N] [--max-tiles N] [--dry-run]
+                               [--config PATH]
+
+By default seeds the tiles under every feature of the SHAPEFILES layers
+(lines are densified so every tile they cross counts) plus `ring` tiles
+around them, which covers the map of any ticket that finds facilities.
+--bbox seeds a plain rectangle instead. Tiles already cached are skipped,
+so the command can be re-run to top the cache up after a UR_data refresh.
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Set, Tuple
+
+import shapely
+
+from utils.config import load_config, load_default_config, ConfigError
+from utils.paths import get_shapefile_paths, get_cache_dir
+from processing.layer_cache import load_layer
+from processing.tile_cache import TileCache, tile_settings
+from processing.tile_store import tiles_for_bbox, tiles_for_points
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_ZOOMS = "15-18"
+DEFAULT_MAX_TILES = 200_000
+
+
+def parse_zooms(value: str) -> List[int]:
+    """
+    Parse "15-18" or "14,16,18" into a list of zoom levels.
+    """
+    zooms: List[int] = []
+    for part in str(value).split(","):
+        lo, _, hi = part.strip().partition("-")
+        zooms.extend(range(int(lo), int(hi or lo) + 1))
+    return sorted(set(zooms))
+
+
+def facility_tiles(cfg, zoom: int, ring: int) -> Set[Tuple[int, int]]:
+    """
+    Tiles at zoom under any feature of the configured layers, grown by ring tiles.
+    """
+    tile_deg = 360.0 / 2 ** zoom
+    cache_dir = get_cache_dir(cfg, PROJECT_ROOT)
+    tiles: Set[Tuple[int, int]] = set()
+    for name, shp_path in get_shapefile_paths(cfg, PROJECT_ROOT).items():
+        geoms = load_layer(name, shp_path, cache_dir).geometry.values
+        coords = shapely.get_coordinates(shapely.segmentize(geoms, tile_deg / 4))
+        tiles.update(tiles_for_points(coords[:, 0], coords[:, 1], zoom))
+    n = 2 ** zoom
+    return {
+        (x + dx, y + dy)
+        for x, y in tiles
+        for dx in range(-ring, ring + 1)
+        for dy in range(-ring, ring + 1)
+        if 0 <= x + dx < n and 0 <= y + dy < n
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Prefetch basemap tiles into the local tile cache.")
+    parser.add_argument("--zooms", default=None,
+                        help=f"zoom levels, e.g. 15-18 (default: TILES.seed_zooms or {DEFAULT_ZOOMS})")
+    parser.add_argument("--ring", type=int, default=1, help="extra tiles around each facility tile")
+    parser.add_argument("--bbox", help="seed this W,S,E,N rectangle (EPSG:4326) instead of the facilities")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent downloads")
+    parser.add_argument("--max-tiles", type=int, default=DEFAULT_MAX_TILES,
+                        help="refuse to seed more tiles than this")
+    parser.add_argument("--dry-run", action="store_true", help="only count the tiles")
+    parser.add_argument("--config", type=Path, help="config.json to use (default: auto-detect)")
+    args = parser.parse_args(argv)
+
+    try:
+        cfg = load_config(args.config) if args.config else load_default_config()
+    except ConfigError as e:
+        print(f"Configuration error: {e}")
+        return 1
+
+    settings = tile_settings(cfg)
+    if settings["cache_dir"] is None:
+        print("The tile cache is disabled; set TILES.cache to seed it.")
+        return 1
+    zooms = parse_zooms(args.zooms or cfg["TILES"].get("SEED_ZOOMS", DEFAULT_ZOOMS))
+
+    wanted: List[Tuple[int, int, int]] = []
+    for zoom in zooms:
+        if args.bbox:
+            bbox = tuple(float(v) for v in args.bbox.split(","))
+            tiles = set(tiles_for_bbox(bbox, zoom))
+        else:
+            tiles = facility_tiles(cfg, zoom, args.ring)
+        print(f"z{zoom}: {len(tiles)} tile(s)")
+        wanted.extend((zoom, x, y) for x, y in sorted(tiles))
+
+    if len(wanted) > args.max_tiles:
+        print(f"{len(wanted)} tiles is more than --max-tiles {args.max_tiles}; narrow the zooms or raise the limit.")
+        return 1
+    if args.dry_run:
+        return 0
+
+    # Seeding always fetches, even when TILES.offline keeps the server from doing so
+    cache = TileCache(settings["cache_dir"], settings["url"], settings["max_bytes"])
+    missing = [t for t in wanted if cache.find(*t) is None]
+    print(f"{len(wanted) - len(missing)} cached, fetching {len(missing)} into {cache.root}")
+
+    t0 = time.perf_counter()
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(args.workers, 1), thread_name_prefix="seed") as pool:
+        for i, path in enumerate(pool.map(lambda t: cache.get(*t), missing), 1):
+            failed += path is None
+            if i % 1000 == 0:
+                print(f"  {i}/{len(missing)} ({time.perf_counter() - t0:.0f} s)")
+
+    usage = cache.disk_usage()
+    print(f"Done: {len(missing) - failed} fetched, {failed} failed; cache holds {usage / 2 ** 20:.0f} MB "
+          f"of {settings['max_bytes'] / 2 ** 20:.0f} MB")
+    if usage >= settings["max_bytes"] * 0.9:
+        print("⚠️ The cache is at its size limit, so seeded tiles may already be evicting each other; raise TILES.max_mb.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
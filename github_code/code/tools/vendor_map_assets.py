@@ -0,0 +1,49 @@
+# tools/vendor_map_assets.py
+"""
+Download Folium's JavaScript/CSS into the local map asset bundle.
+
+Usage (from the code folder):
+    python -m tools.vendor_map_assets [--config PATH]
+
+Fills MAP_HTML.assets_dir (see processing.map_assets) with every default
+Folium asset at the version this Folium pins, plus the images their CSS
+uses, so ticket maps saved with MAP_HTML.assets = "local" or "inline" never
+touch a CDN. Re-run after upgrading folium; files already present are kept.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import folium
+
+from utils.config import load_config, load_default_config, ConfigError
+from processing.map_assets import asset_settings, vendor_assets
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Vendor Folium's JS/CSS for offline map HTML.")
+    parser.add_argument("--config", type=Path, help="config.json to use (default: auto-detect)")
+    args = parser.parse_args(argv)
+
+    try:
+        cfg = load_config(args.config) if args.config else load_default_config()
+    except ConfigError as e:
+        print(f"Configuration error: {e}")
+        return 1
+
+    settings = asset_settings(cfg)
+    if settings["dir"] is None:
+        print("No MAP_HTML section in the configuration; nothing to vendor.")
+        return 1
+
+    urls = [url for _, url in folium.Map.default_js + folium.Map.default_css]
+    result = vendor_assets(urls, settings["dir"])
+    for url, path in result.items():
+        print(f"{'✓' if path else '✗'} {url}")
+    missing = sum(path is None for path in result.values())
+    print(f"{len(result) - missing}/{len(result)} asset(s) in {settings['dir']}")
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -47,10 +47,36 @@ DEFAULT_LEGEND_LABELS = {
     "SYMBOL_V":   "Vault",
 }
 
+# Attribute classification rules (see processing/classify.py); CLASSIFY in
+# config.json replaces these per layer.
+DEFAULT_CLASSIFY = {
+    "STRUCTURE": {
+        "symbol": {
+            "default": "?",
+            "rules": [
+                {"when": {"subtypecod": 1}, "value": "M"},
+                {"when": {"subtypecod": 2}, "value": "H"},
+                {"when": {"subtypecod": 3, "owner": "everstream"}, "value": "H"},
+                {"when": {"subtypecod": 3}, "value": "V"},
+            ],
+        },
+    },
+    "FIBERCABLE": {
+        "style_class": {
+            "default": "unknown",
+            "rules": [
+                {"when": {"placementt": "aerial"}, "value": "aerial"},
+                {"when": {"placementt": "underground"}, "value": "underground"},
+                {"when": {"placementt": "bridge"}, "value": "bridge"},
+            ],
+        },
+    },
+}
+
 __all__ = [
     "DEFAULT_CONFIG_NAME",
     "TILES_URL", "TILES_ATTRIBUTION",
     "DEFAULT_OPACITIES", "DEFAULT_WEIGHTS",
     "DEFAULT_VISIBILITY", "DEFAULT_STRUCTURE_SYMBOL",
-    "DEFAULT_LEGEND_LABELS",
+    "DEFAULT_LEGEND_LABELS", "DEFAULT_CLASSIFY",
 ]
@@ -1,6 +1,7 @@
+import os
 import shutil
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 
 def get_latest_file(folder: Path, ext: str) -> Optional[Path]:
@@ -26,6 +27,48 @@ def get_latest_file(folder: Path, ext: str) -> Optional[Path]:
     return latest
 
 
+def is_ticket_file(p: Path) -> bool:
+    """
+    True for .gml tickets and Diggers/IUPPS .txt tickets.
+    """
+    name = p.name.lower()
+    if p.suffix.lower() == '.gml':
+        return True
+    return p.suffix.lower() == '.txt' and ('iupps' in name or 'diggers' in name)
+
+
+def scan_ticket_files(download_folder: Path) -> List[os.DirEntry]:
+    """
+    Directory entries of the ticket files in `download_folder`, unordered.
+
+    Names are filtered before anything is stat'ed, so a downloads folder full
+    of unrelated files costs one directory listing.
+    """
+    try:
+        with os.scandir(download_folder) as it:
+            return [e for e in it if is_ticket_file(Path(e.name)) and e.is_file()]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def find_ticket_files(download_folder: Path) -> List[Path]:
+    """
+    Return every pending ticket file in `download_folder`, oldest first (by st_ctime).
+    """
+    entries = scan_ticket_files(download_folder)
+    return [Path(e.path) for e in sorted(entries, key=lambda e: e.stat().st_ctime)]
+
+
+def stage_all_files(download_folder: Path, results_dir: Path) -> List[Tuple[Path, Optional[Path], Path]]:
+    """
+    Stage every pending ticket (oldest first) for batch processing.
+
+    Returns:
+        List of (ticket_file, xml_file, ticket_dir) tuples as in stage_files().
+    """
+    return [stage_ticket(p, results_dir) for p in find_ticket_files(download_folder)]
+
+
 def stage_files(download_folder: Path, results_dir: Path) -> Tuple[Optional[Path], Optional[Path], Optional[Path]]:
     """
     Move the latest .gml or .txt ticket file from `download_folder` into a new subfolder under `results_dir`.
@@ -46,34 +89,44 @@ def stage_files(download_folder: Path, results_dir: Path) -> Tuple[Optional[Path
     if not download_folder.is_dir():
         return None, None, None
 
-    # Gather candidates
-    candidates = []
-    for p in download_folder.iterdir():
-        name = p.name.lower()
-        if p.suffix.lower() == '.gml':
-            candidates.append(p)
-        elif p.suffix.lower() == '.txt' and ('iupps' in name or 'diggers' in name):
-            candidates.append(p)
-
+    candidates = find_ticket_files(download_folder)
     if not candidates:
         return None, None, None
 
-    latest = max(candidates, key=lambda p: p.stat().st_ctime)
-    base = latest.stem
+    return stage_ticket(candidates[-1], results_dir)  # newest (oldest first order)
+
+
+def stage_ticket(ticket_path: Path, results_dir: Path) -> Tuple[Path, Optional[Path], Path]:
+    """
+    Move one ticket file (and its matching XML if .gml) into its own folder under `results_dir`.
+
+    A ticket that already sits in its results folder is left where it is.
+
+    Args:
+        ticket_path: Path to a .gml or .txt ticket.
+        results_dir: Path under which to create per-ticket result folders.
+
+    Returns:
+        A tuple of (ticket_file, xml_file, ticket_dir) as in stage_files().
+    """
+    source_dir = ticket_path.parent
+    base = ticket_path.stem
     ticket_dir = results_dir / base
     ticket_dir.mkdir(parents=True, exist_ok=True)
 
     # Move the ticket file
-    dest_ticket = ticket_dir / latest.name
-    shutil.move(str(latest), str(dest_ticket))
+    dest_ticket = ticket_dir / ticket_path.name
+    if ticket_path.resolve() != dest_ticket.resolve():
+        shutil.move(str(ticket_path), str(dest_ticket))
 
     xml_path = None
     # If .gml, also move matching .xml
     if dest_ticket.suffix.lower() == '.gml':
-        xml_src = download_folder / f"{base}.xml"
+        xml_src = source_dir / f"{base}.xml"
         if xml_src.exists():
             dest_xml = ticket_dir / xml_src.name
-            shutil.move(str(xml_src), str(dest_xml))
+            if xml_src.resolve() != dest_xml.resolve():
+                shutil.move(str(xml_src), str(dest_xml))
             xml_path = dest_xml
 
     return dest_ticket, xml_path, ticket_dir
@@ -0,0 +1,190 @@
+# utils/folder_watch.py
+"""
+Watch the download folder for ticket files and report each one once it has
+finished downloading.
+
+File-system events come from watchdog (inotify on Linux, ReadDirectoryChangesW
+on Windows) when it is installed; otherwise the folder is re-listed every
+poll interval. Either way only names that look like tickets (see
+file_manager.is_ticket_file) are ever stat'ed.
+
+A file counts as downloaded once its size and mtime have not changed for
+`settle_s` seconds, which debounces browsers and mail clients that write a
+ticket in several bursts. A .gml ticket also waits for its companion
+`<stem>.xml` (customer details for the draft) to be present and settled the
+same way; if no XML turns up within `xml_grace_s` of the ticket settling, the
+ticket is reported without one.
+"""
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.file_manager import is_ticket_file, scan_ticket_files
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # polling fallback
+    FileSystemEventHandler = object
+    Observer = None
+
+DEFAULT_SETTLE_S = 2.0
+DEFAULT_POLL_S = 1.0
+DEFAULT_XML_GRACE_S = 30.0
+
+# (size, mtime_ns) of a file at one observation
+Stamp = Tuple[int, int]
+
+
+class _TicketEvents(FileSystemEventHandler):
+    def __init__(self, notify: Callable[[Path], None]):
+        super().__init__()
+        self._notify = notify
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._notify(Path(event.src_path))
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._notify(Path(event.src_path))
+
+    def on_moved(self, event):
+        # browsers download to a temp name and rename when complete
+        if not event.is_directory:
+            self._notify(Path(event.dest_path))
+            self._notify(Path(event.src_path))  # a staged ticket leaving: dropped on its next stat
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self._notify(Path(event.src_path))
+
+
+class FolderWatcher:
+    """
+    Reports ticket files in one folder once they stop changing.
+
+    Call start(), then poll() in a loop; stop() when done.
+    """
+
+    def __init__(
+        self,
+        folder: Path,
+        settle_s: float = DEFAULT_SETTLE_S,
+        poll_s: float = DEFAULT_POLL_S,
+        use_events: bool = True,
+        xml_grace_s: float = DEFAULT_XML_GRACE_S
+    ):
+        self.folder = Path(folder).resolve()
+        self.settle_s = settle_s
+        self.poll_s = poll_s
+        self.xml_grace_s = xml_grace_s
+        self.use_events = use_events and Observer is not None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._observer = None
+        # path -> (last stamps seen (ticket + companion XML), when they last
+        # changed); None until first stat
+        self._pending: Dict[Path, Optional[Tuple[tuple, float]]] = {}
+        # settled files already reported, until they change or disappear
+        self._reported: Dict[Path, Stamp] = {}
+
+    @property
+    def mode(self) -> str:
+        return "events" if self.use_events else "polling"
+
+    def _notify(self, path: Path) -> None:
+        if path.parent == self.folder and is_ticket_file(path):
+            with self._lock:
+                self._pending.setdefault(path, None)
+            self._wake.set()
+
+    def _forget(self, path: Path) -> None:
+        with self._lock:
+            self._pending.pop(path, None)
+        self._reported.pop(path, None)
+
+    @staticmethod
+    def _companion(path: Path) -> Optional[Stamp]:
+        """
+        Stamp of a .gml ticket's `<stem>.xml`, or None if it is not there (yet).
+        """
+        try:
+            st = path.with_suffix(".xml").stat()
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _scan(self) -> None:
+        present = {Path(entry.path) for entry in scan_ticket_files(self.folder)}
+        for path in present:
+            self._notify(path)
+        for path in set(self._reported) - present:
+            self._forget(path)
+
+    def start(self) -> None:
+        """
+        Pick up tickets already in the folder and start watching it.
+        """
+        self._scan()
+        if self.use_events:
+            self._observer = Observer()
+            self._observer.schedule(_TicketEvents(self._notify), str(self.folder), recursive=False)
+            self._observer.start()
+
+    def stop(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+    def poll(self, timeout: Optional[float] = None) -> List[Path]:
+        """
+        Wait up to `timeout` seconds (default: the poll interval) for
+        activity, then return the files that have settled since the last call.
+
+        A .gml ticket is only returned once its companion XML has settled too,
+        or xml_grace_s after the ticket settled if there is still no XML.
+        """
+        self._wake.wait(self.poll_s if timeout is None else timeout)
+        self._wake.clear()
+        if not self.use_events:
+            self._scan()
+
+        now = time.monotonic()
+        settled: List[Path] = []
+        with self._lock:
+            pending = list(self._pending.items())
+        for path, seen in pending:
+            try:
+                st = path.stat()
+            except OSError:  # moved away or deleted
+                self._forget(path)
+                continue
+            stamp = (st.st_size, st.st_mtime_ns)
+            if self._reported.get(path) == stamp:
+                with self._lock:
+                    self._pending.pop(path, None)
+                continue
+            xml = self._companion(path) if path.suffix.lower() == ".gml" else ()
+            if seen is None or seen[0] != (stamp, xml):
+                with self._lock:
+                    self._pending[path] = ((stamp, xml), now)
+            elif st.st_size > 0 and now - seen[1] >= self.settle_s:
+                if xml is None and now - seen[1] < self.settle_s + self.xml_grace_s:
+                    continue  # the XML may still be on its way
+                if xml is None:
+                    print(f"⚠️ {path.name}: no {path.stem}.xml after {self.xml_grace_s:g} s; "
+                          f"the draft will lack the customer details")
+                with self._lock:
+                    self._pending.pop(path, None)
+                self._reported[path] = stamp
+                settled.append(path)
+        return settled
+
+    def stamp(self, path: Path) -> Optional[Stamp]:
+        """
+        (size, mtime_ns) recorded when `path` was reported as settled.
+        """
+        return self._reported.get(path)
@@ -0,0 +1,219 @@
+# utils/job_ledger.py
+"""
+Durable record of every ticket the ingest service has picked up.
+
+One SQLite row per ticket file, moving through
+
+    queued -> running -> done
+                      -> failed   (after INGEST.max_attempts tries)
+                      -> queued   (to be retried)
+
+with the attempt count, last error and timings. Rows left 'running' by a
+crashed or killed run are put back in the queue on the next start (or marked
+failed if that was their last attempt), so a ticket is never lost between
+being picked up and its draft being saved.
+"""
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+JOB_STATES = ("queued", "running", "done", "failed")
+DEFAULT_MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY,
+    source      TEXT NOT NULL UNIQUE,   -- path the ticket was found at
+    ticket      TEXT NOT NULL,          -- current path (moves when staged)
+    state       TEXT NOT NULL DEFAULT 'queued',
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    size        INTEGER,
+    mtime_ns    INTEGER,
+    ticket_dir  TEXT,
+    error       TEXT,
+    queued_at   REAL NOT NULL,
+    started_at  REAL,
+    finished_at REAL,
+    seconds     REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+"""
+
+
+class JobLedger:
+    """
+    SQLite-backed job table; safe to share between processes (WAL mode).
+    """
+
+    def __init__(self, db_path: Path, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.db_path = Path(db_path)
+        self.max_attempts = max(1, max_attempts)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    @contextmanager
+    def _write(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so a read-then-update
+        # can't interleave with another process sharing the ledger.
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def enqueue(self, ticket: Path, size: Optional[int] = None, mtime_ns: Optional[int] = None) -> bool:
+        """
+        Queue a ticket file found in the download folder.
+
+        A file already in the ledger is queued again only if it is a new
+        download (different size or mtime) of a ticket that finished or failed.
+
+        Returns:
+            True if the ticket was (re)queued.
+        """
+        source = str(Path(ticket).resolve())
+        now = time.time()
+        with self._write():
+            row = self._db.execute(
+                "SELECT state, size, mtime_ns FROM jobs WHERE source = ?", (source,)
+            ).fetchone()
+            if row is None:
+                self._db.execute(
+                    "INSERT INTO jobs (source, ticket, size, mtime_ns, queued_at) VALUES (?, ?, ?, ?, ?)",
+                    (source, source, size, mtime_ns, now),
+                )
+                return True
+            if row["state"] in ("queued", "running") or (row["size"], row["mtime_ns"]) == (size, mtime_ns):
+                return False
+            self._db.execute(
+                "UPDATE jobs SET ticket = ?, state = 'queued', attempts = 0, size = ?, mtime_ns = ?,"
+                " error = NULL, queued_at = ?, started_at = NULL, finished_at = NULL, seconds = NULL"
+                " WHERE source = ?",
+                (source, size, mtime_ns, now, source),
+            )
+            return True
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Take the oldest queued job and mark it running.
+
+        Returns:
+            The job row as a dict, or None if the queue is empty.
+        """
+        with self._write():
+            row = self._db.execute(
+                "SELECT * FROM jobs WHERE state = 'queued' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                self._db.execute(
+                    "UPDATE jobs SET state = 'running', attempts = attempts + 1, started_at = ?"
+                    " WHERE id = ?",
+                    (time.time(), row["id"]),
+                )
+        if row is None:
+            return None
+        job = dict(row)
+        job.update(state="running", attempts=job["attempts"] + 1)
+        return job
+
+    def staged(self, job_id: int, ticket: Path, ticket_dir: Path) -> None:
+        """
+        Record where a running job's ticket was moved to, so a resumed run finds it.
+        """
+        with self._write():
+            self._db.execute(
+                "UPDATE jobs SET ticket = ?, ticket_dir = ? WHERE id = ?",
+                (str(ticket), str(ticket_dir), job_id),
+            )
+
+    def done(self, job_id: int) -> None:
+        now = time.time()
+        with self._write():
+            self._db.execute(
+                "UPDATE jobs SET state = 'done', error = NULL, finished_at = ?,"
+                " seconds = ? - started_at WHERE id = ?",
+                (now, now, job_id),
+            )
+
+    def failed(self, job_id: int, error: str) -> str:
+        """
+        Record a failed attempt; the job is queued again until it has used
+        max_attempts.
+
+        Returns:
+            The job's new state ('queued' or 'failed').
+        """
+        now = time.time()
+        with self._write():
+            attempts = self._db.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+            state = "queued" if attempts < self.max_attempts else "failed"
+            self._db.execute(
+                "UPDATE jobs SET state = ?, error = ?, finished_at = ?, seconds = ? - started_at"
+                " WHERE id = ?",
+                (state, error, now, now, job_id),
+            )
+        return state
+
+    def recover(self) -> int:
+        """
+        Requeue jobs left 'running' by a run that died; call once at start-up,
+        before any job is claimed.
+
+        The interrupted run counts as an attempt, so a ticket that keeps
+        killing the process (out of memory, a native crash) is marked failed
+        once it has used max_attempts instead of being retried on every start.
+
+        Returns:
+            Number of jobs requeued.
+        """
+        now = time.time()
+        with self._write():
+            self._db.execute(
+                "UPDATE jobs SET state = 'failed', error = 'interrupted', finished_at = ?"
+                " WHERE state = 'running' AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            return self._db.execute(
+                "UPDATE jobs SET state = 'queued', error = 'interrupted' WHERE state = 'running'"
+            ).rowcount
+
+    def retry_failed(self) -> int:
+        """
+        Give every failed job a fresh set of attempts.
+
+        Returns:
+            Number of jobs requeued.
+        """
+        with self._write():
+            return self._db.execute(
+                "UPDATE jobs SET state = 'queued', attempts = 0 WHERE state = 'failed'"
+            ).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Number of jobs in each state.
+        """
+        counts = dict.fromkeys(JOB_STATES, 0)
+        for state, n in self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"):
+            counts[state] = n
+        return counts
+
+    def jobs(self, state: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Most recent jobs, optionally only those in one state.
+        """
+        if state is None:
+            rows = self._db.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+        else:
+            rows = self._db.execute("SELECT * FROM jobs WHERE state = ? ORDER BY id DESC LIMIT ?", (state, limit))
+        return [dict(r) for r in rows]
@@ -0,0 +1,241 @@
+# utils/memory.py
+"""
+Peak-memory accounting for pipeline stages, and the memory budget that keeps
+the layer loader from reading whole layers when they would not fit.
+
+MEMORY.profile selects how each traced stage's peak is measured (see
+utils.tracing.span):
+  - "off" (default): not measured.
+  - "rss": the process's resident set size, sampled every MEMORY.sample_ms
+    by a background thread. Covers GDAL/GEOS allocations; cheap.
+  - "tracemalloc": Python-level allocations only (numpy, pandas, Python
+    objects; not GEOS/GDAL), exact but it slows allocation-heavy stages.
+
+MEMORY.budget_mb (0 = no budget) caps the process: a layer is only read
+whole (to fill the layer cache or the resident LayerStore) if the current
+RSS plus the layer's estimated size fits; otherwise only the ticket window
+is read. Use it to size worker pools on machines that would otherwise swap.
+"""
+import ctypes
+import os
+import sys
+import threading
+import tracemalloc
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PROFILES = ("off", "rss", "tracemalloc")
+DEFAULT_SAMPLE_MS = 10
+
+# In-memory size of a prepared layer (with its STRtree) while it is being
+# read, relative to its .shp + .dbf size on disk. Rough, and on the high side.
+LAYER_MEMORY_FACTOR = 2.0
+
+MB = 1024 * 1024
+
+
+def memory_settings(cfg) -> Dict[str, Any]:
+    """
+    Read the MEMORY config section.
+
+    Returns:
+        Dict with 'profile' ('off', 'rss' or 'tracemalloc'), 'sample_s'
+        (RSS sampling interval) and 'budget_mb' (0 = no budget).
+    """
+    sec = cfg["MEMORY"] if "MEMORY" in cfg else None
+    if sec is None:
+        return {"profile": "off", "sample_s": DEFAULT_SAMPLE_MS / 1000, "budget_mb": 0.0}
+    profile = str(sec.get("PROFILE", "off") or "off").strip().lower()
+    if profile not in PROFILES:
+        print(f"⚠️ Unknown MEMORY.profile {profile!r}; expected one of {', '.join(PROFILES)}")
+        profile = "off"
+    return {
+        "profile": profile,
+        "sample_s": max(1, sec.getint("SAMPLE_MS", DEFAULT_SAMPLE_MS)) / 1000,
+        "budget_mb": max(0.0, sec.getfloat("BUDGET_MB", 0.0)),
+    }
+
+
+if sys.platform == "win32":
+    from ctypes import wintypes
+
+    class _ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    def current_rss() -> Optional[int]:
+        """
+        Resident set size (working set) of this process in bytes, or None.
+        """
+        try:
+            kernel32 = ctypes.WinDLL("kernel32")
+            kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+            counters = _ProcessMemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            ok = kernel32.K32GetProcessMemoryInfo(
+                kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb
+            )
+        except (OSError, AttributeError):
+            return None
+        return int(counters.WorkingSetSize) if ok else None
+else:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def current_rss() -> Optional[int]:
+        """
+        Resident set size of this process in bytes, or None.
+        """
+        try:
+            with open("/proc/self/statm", "rb") as f:
+                return int(f.read().split()[1]) * _PAGE_SIZE
+        except (OSError, ValueError, IndexError):
+            return None  # no procfs (macOS): budgets fall back to the estimate alone
+
+
+class MemoryProbe(ABC):
+    """
+    Reports the peak memory since its previous take_peak() call.
+    """
+    kind: str
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    def take_peak(self) -> int:
+        """
+        Peak bytes since the last call (or start()); starts a new interval.
+        """
+
+
+class TracemallocProbe(MemoryProbe):
+    kind = "tracemalloc"
+
+    def __init__(self):
+        self._started = False
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        tracemalloc.reset_peak()
+
+    def stop(self) -> None:
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def take_peak(self) -> int:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        return peak
+
+
+class RssProbe(MemoryProbe):
+    """
+    Samples the process RSS on a daemon thread and keeps the maximum.
+    """
+    kind = "rss"
+
+    def __init__(self, sample_s: float = DEFAULT_SAMPLE_MS / 1000):
+        self.sample_s = sample_s
+        self._lock = threading.Lock()
+        self._peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.sample_s):
+            rss = current_rss() or 0
+            with self._lock:
+                self._peak = max(self._peak, rss)
+
+    def start(self) -> None:
+        self._peak = current_rss() or 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def take_peak(self) -> int:
+        rss = current_rss() or 0
+        with self._lock:
+            peak, self._peak = max(self._peak, rss), rss
+        return peak
+
+
+def make_probe(settings: Dict[str, Any]) -> Optional[MemoryProbe]:
+    """
+    The probe selected by memory_settings()['profile'], or None when off.
+    """
+    if settings["profile"] == "tracemalloc":
+        return TracemallocProbe()
+    if settings["profile"] == "rss":
+        if current_rss() is None:
+            print("⚠️ RSS is not available on this platform; MEMORY.profile ignored")
+            return None
+        return RssProbe(settings["sample_s"])
+    return None
+
+
+def estimate_layer_bytes(shp_path: Path) -> int:
+    """
+    Rough in-memory size of a whole layer while it is read and prepared.
+    """
+    shp_path = Path(shp_path)
+    size = 0
+    for suffix in (".shp", ".dbf"):
+        try:
+            size += shp_path.with_suffix(suffix).stat().st_size
+        except OSError:
+            pass
+    return int(size * LAYER_MEMORY_FACTOR)
+
+
+def fits_budget(nbytes: int, budget_mb: Optional[float]) -> bool:
+    """
+    True if allocating `nbytes` more keeps the process within budget_mb
+    (always True without a budget).
+    """
+    if not budget_mb:
+        return True
+    return (current_rss() or 0) + nbytes <= budget_mb * MB
+
+
+def memory_summary(spans: List[Dict[str, Any]], kind: str) -> Optional[str]:
+    """
+    One summary-report line with each traced stage's peak memory.
+
+    Args:
+        spans: Spans recorded by utils.tracing (those with 'peak_mb' count).
+        kind: Probe kind, shown in the line.
+
+    Returns:
+        "Peak memory (rss): 812.4 MB; parse 120.1 MB, buffer ..." or None if
+        no span was measured.
+    """
+    measured = [s for s in sorted(spans, key=lambda s: s["start"]) if "peak_mb" in s]
+    if not measured:
+        return None
+    overall = max(s["peak_mb"] for s in measured)
+    stages = ", ".join(f"{s['name']} {s['peak_mb']:.1f} MB" for s in measured)
+    return f"Peak memory ({kind}): {overall:.1f} MB; {stages}"
@@ -1,7 +1,15 @@
-from win10toast import ToastNotifier
+# Single notifier for reuse, created on the first toast (importing win10toast
+# is slow, and runs that never toast shouldn't pay for it)
+_toaster = None
+
+
+def _get_toaster():
+    global _toaster
+    if _toaster is None:
+        from win10toast import ToastNotifier
+        _toaster = ToastNotifier()
+    return _toaster
 
-# Instantiate a single notifier for reuse
-toaster = ToastNotifier()
 
 def safe_toast(title: str, msg: str, duration: int = 3) -> None:
     """
@@ -13,7 +21,7 @@ def safe_toast(title: str, msg: str, duration: int = 3) -> None:
       duration: Seconds to display the toast.
     """
     try:
-        toaster.show_toast(title, msg, duration=duration, threaded=True)
+        _get_toaster().show_toast(title, msg, duration=duration, threaded=True)
     except Exception:
-        # If notifications fail (e.g. missing Windows APIs), ignore.
+        # If notifications fail (e.g. missing Windows APIs or win10toast), ignore.
         pass
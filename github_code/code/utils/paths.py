@@ -74,6 +74,31 @@ def get_download_folder(raw_download: str, run_dir: Path) -> Path:
     return dl
 
 
+def get_shapefile_paths(cfg, project_root: Path) -> dict:
+    """
+    Resolve every entry of the SHAPEFILES section relative to project_root.
+
+    Returns:
+        Dict mapping layer name (e.g. 'CONDUIT') to an absolute Path.
+    """
+    return {
+        name: (project_root / rel).resolve()
+        for name, rel in cfg["SHAPEFILES"].items()
+    }
+
+
+def get_cache_dir(cfg, project_root: Path):
+    """
+    Resolve the layer cache directory from the CACHE section.
+
+    Returns:
+        Absolute Path, or None if the cache is disabled or not configured.
+    """
+    if "CACHE" not in cfg or not cfg.getboolean("CACHE", "ENABLED", fallback=False):
+        return None
+    return (project_root / cfg["CACHE"].get("DIR", "layer_cache")).resolve()
+
+
 def init_paths(cfg) -> dict:
     """
     Initialize all key paths from the provided config parser.
@@ -0,0 +1,226 @@
+# utils/spatial_index.py
+"""
+Build and refresh quadtree (.qix) spatial indexes next to shapefiles.
+
+GDAL's shapefile driver picks up a .qix automatically and uses it for
+bounding-box reads, so a fresh index turns a per-ticket windowed read into
+a lookup proportional to the work area instead of a full file scan.
+
+The index is written with GDAL when its Python bindings or the ogrinfo
+tool are available, otherwise with the pure-Python writer below, which
+produces the same MapServer/shapelib quadtree format.
+"""
+import math
+import shutil
+import struct
+import subprocess
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+Bounds = Tuple[float, float, float, float]
+
+# Aim for roughly this many shapes per leaf when picking the tree depth.
+SHAPES_PER_NODE = 8
+MAX_DEPTH = 12
+
+_NODE_HEADER = struct.Struct("<i4di")  # subtree offset, minx, miny, maxx, maxy, numshapes
+
+
+def index_path(shp_path: Path) -> Path:
+    """
+    Return the .qix path that belongs to a shapefile.
+    """
+    return Path(shp_path).with_suffix(".qix")
+
+
+def is_index_stale(shp_path: Path) -> bool:
+    """
+    True if the .qix is missing or older than the .shp/.shx it indexes.
+    """
+    qix = index_path(shp_path)
+    if not qix.exists():
+        return True
+    qix_mtime = qix.stat().st_mtime_ns
+    for suffix in (".shp", ".shx"):
+        src = Path(shp_path).with_suffix(suffix)
+        if src.exists() and src.stat().st_mtime_ns > qix_mtime:
+            return True
+    return False
+
+
+def build_spatial_index(shp_path: Path, force: bool = False) -> Optional[str]:
+    """
+    Create or refresh the .qix index of one shapefile.
+
+    Args:
+        shp_path: Path to the .shp file.
+        force: Rebuild even if the existing index is up to date.
+
+    Returns:
+        Name of the method used ('gdal', 'ogrinfo', 'python'), or None if the
+        index was already current.
+    """
+    shp_path = Path(shp_path)
+    if not shp_path.exists():
+        raise FileNotFoundError(f"Shapefile not found: {shp_path}")
+    if not force and not is_index_stale(shp_path):
+        return None
+
+    qix = index_path(shp_path)
+    if qix.exists():
+        qix.unlink()
+
+    if _build_with_gdal(shp_path):
+        return "gdal"
+    if _build_with_ogrinfo(shp_path):
+        return "ogrinfo"
+    _build_with_python(shp_path)
+    return "python"
+
+
+# ─── GDAL-backed builders ──────────────────────────────────────────────────
+
+def _build_with_gdal(shp_path: Path) -> bool:
+    try:
+        from osgeo import ogr
+    except ImportError:
+        return False
+    ds = ogr.Open(str(shp_path), 1)
+    if ds is None:
+        return False
+    try:
+        ds.ExecuteSQL(f'CREATE SPATIAL INDEX ON "{shp_path.stem}"')
+    finally:
+        ds = None
+    return index_path(shp_path).exists()
+
+
+def _build_with_ogrinfo(shp_path: Path) -> bool:
+    exe = shutil.which("ogrinfo")
+    if not exe:
+        return False
+    result = subprocess.run(
+        [exe, str(shp_path), "-sql", f'CREATE SPATIAL INDEX ON "{shp_path.stem}"'],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return result.returncode == 0 and index_path(shp_path).exists()
+
+
+# ─── Pure-Python .qix writer ───────────────────────────────────────────────
+
+class _Node:
+    __slots__ = ("bounds", "ids", "children")
+
+    def __init__(self, bounds: Bounds):
+        self.bounds = bounds
+        self.ids: List[int] = []
+        self.children: List[Optional["_Node"]] = [None, None, None, None]
+
+
+def _quadrants(b: Bounds) -> List[Bounds]:
+    minx, miny, maxx, maxy = b
+    cx, cy = (minx + maxx) / 2.0, (miny + maxy) / 2.0
+    return [
+        (minx, miny, cx, cy),
+        (cx, miny, maxx, cy),
+        (minx, cy, cx, maxy),
+        (cx, cy, maxx, maxy),
+    ]
+
+
+def _contains(outer: Bounds, inner: Bounds) -> bool:
+    return (outer[0] <= inner[0] and outer[1] <= inner[1]
+            and outer[2] >= inner[2] and outer[3] >= inner[3])
+
+
+def _tree_depth(count: int) -> int:
+    if count <= SHAPES_PER_NODE:
+        return 1
+    return max(1, min(MAX_DEPTH, math.ceil(math.log(count / SHAPES_PER_NODE, 4)) + 1))
+
+
+def _build_tree(extents: Sequence[Optional[Bounds]], depth: int) -> _Node:
+    valid = [b for b in extents if b is not None]
+    if valid:
+        root_bounds = (
+            min(b[0] for b in valid), min(b[1] for b in valid),
+            max(b[2] for b in valid), max(b[3] for b in valid),
+        )
+    else:
+        root_bounds = (0.0, 0.0, 0.0, 0.0)
+    root = _Node(root_bounds)
+
+    for shape_id, ext in enumerate(extents):
+        if ext is None:
+            continue
+        node, level = root, 1
+        while level < depth:
+            for i, quad in enumerate(_quadrants(node.bounds)):
+                if _contains(quad, ext):
+                    if node.children[i] is None:
+                        node.children[i] = _Node(quad)
+                    node = node.children[i]
+                    break
+            else:
+                break
+            level += 1
+        node.ids.append(shape_id)
+    return root
+
+
+def _serialize(node: _Node, out: bytearray) -> int:
+    """
+    Append node (and its subtree) to out; return the byte size of its subtree.
+    """
+    children = [c for c in node.children if c is not None and _has_shapes(c)]
+    start = len(out)
+    # reserve header; subtree offset is patched once children are written
+    out += _NODE_HEADER.pack(0, *node.bounds, len(node.ids))
+    out += struct.pack(f"<{len(node.ids)}i", *node.ids)
+    out += struct.pack("<i", len(children))
+    subtree = 0
+    for child in children:
+        subtree += _serialize(child, out)
+    out[start:start + 4] = struct.pack("<i", subtree)
+    return (len(out) - start)
+
+
+def _has_shapes(node: _Node) -> bool:
+    return bool(node.ids) or any(c is not None and _has_shapes(c) for c in node.children)
+
+
+def write_qix(qix_path: Path, extents: Sequence[Optional[Bounds]]) -> None:
+    """
+    Write a shapelib-compatible quadtree index.
+
+    Args:
+        qix_path: Destination .qix path.
+        extents: Bounding box per shape record, in file order (None for null shapes).
+    """
+    depth = _tree_depth(sum(1 for e in extents if e is not None))
+    root = _build_tree(extents, depth)
+
+    body = bytearray()
+    _serialize(root, body)
+
+    header = b"SQT" + bytes([1, 1, 0, 0, 0])  # signature, LSB order, version 1
+    header += struct.pack("<ii", len(extents), depth)
+
+    tmp = qix_path.with_suffix(".qix.tmp")
+    tmp.write_bytes(header + bytes(body))
+    tmp.replace(qix_path)
+
+
+def _build_with_python(shp_path: Path) -> None:
+    import geopandas as gpd
+
+    # Record order must match the .shp, so read geometry only and keep nulls.
+    gdf = gpd.read_file(shp_path, columns=[])
+    extents: List[Optional[Bounds]] = []
+    for geom in gdf.geometry:
+        if geom is None or geom.is_empty:
+            extents.append(None)
+        else:
+            extents.append(tuple(geom.bounds))
+    write_qix(index_path(shp_path), extents)
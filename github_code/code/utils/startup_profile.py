@@ -0,0 +1,78 @@
+# utils/startup_profile.py
+"""
+Run a script once under `python -X importtime` and report where its import
+time went (main.py --profile-startup).
+
+main.py runs itself with --import-only for this: the child loads the config
+and imports every pipeline stage, as a ticket run would, but stages, moves
+and processes nothing and opens no drafts.
+
+Only the top-level imports are listed, each with its cumulative time. Each
+lazily loaded pipeline stage (processing.stages) therefore appears as one row
+that includes everything it pulled in.
+"""
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+# "import time:       412 |       1893 |   geopandas.io"
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S.*)$")
+
+DEFAULT_TOP = 25
+
+
+def parse_importtime(stderr: str) -> Tuple[List[Tuple[str, int, int, int]], List[str]]:
+    """
+    Split -X importtime output from the rest of a process's stderr.
+
+    Returns:
+        ([(module, depth, self_us, cumulative_us), ...] in import order,
+         the remaining stderr lines).
+    """
+    rows, other = [], []
+    for line in stderr.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if m:
+            depth = (len(m.group(3)) - 1) // 2
+            rows.append((m.group(4), depth, int(m.group(1)), int(m.group(2))))
+        elif not line.startswith("import time:"):  # the column header
+            other.append(line)
+    return rows, other
+
+
+def profile_startup(script: Path, argv: List[str], top: int = DEFAULT_TOP) -> int:
+    """
+    Run `script argv` in a child interpreter with -X importtime and print
+    the slowest top-level imports.
+
+    Args:
+        script: Script to run (main.py).
+        argv: Its arguments.
+        top: Number of imports to list.
+
+    Returns:
+        The child's exit status.
+    """
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", str(script), *argv],
+        stderr=subprocess.PIPE, text=True, errors="replace",
+    )
+    wall = time.perf_counter() - start
+
+    rows, other = parse_importtime(proc.stderr)
+    if other:
+        print("\n".join(other), file=sys.stderr)
+
+    top_level = [r for r in rows if r[1] == 0]
+    total_us = sum(r[3] for r in top_level)
+    print()
+    print(f"Startup profile: {wall:.3f} s wall, {total_us / 1e6:.3f} s importing "
+          f"{len(rows)} module(s), exit status {proc.returncode}")
+    print(f"{'cumulative':>12s} {'self':>10s}  module")
+    for name, _, self_us, cum_us in sorted(top_level, key=lambda r: r[3], reverse=True)[:top]:
+        print(f"{cum_us / 1e3:10.1f}ms {self_us / 1e3:8.1f}ms  {name}")
+    return proc.returncode
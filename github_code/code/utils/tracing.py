@@ -0,0 +1,230 @@
+# utils/tracing.py
+"""
+Timing spans for the ticket pipeline.
+
+A Tracer collects the spans of one ticket. While it is active (see
+Tracer.activate), any code can time a block with
+
+    with span("clip", layer="CONDUIT"):
+        ...
+
+which costs nothing when no tracer is active. Spans carry the process and
+thread they ran on, so the clip threads and the batch pool show up as
+separate tracks. With a memory probe (MEMORY.profile, see utils.memory),
+spans on the thread that activated the tracer also record 'peak_mb', the
+peak memory while they ran (child spans included).
+
+Once the ticket is done, write_trace() appends each span as one JSON line to
+the metrics log (TRACE.metrics_log, default <ResultsDir>/metrics.jsonl) and,
+with TRACE.chrome_trace, writes `<stem>_trace.json` in Chrome's trace_event
+format to the ticket folder (open it in chrome://tracing or ui.perfetto.dev).
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from utils.memory import MB, MemoryProbe, make_probe, memory_settings
+
+METRICS_NAME = "metrics.jsonl"
+
+# the tracer spans are recorded into; one ticket runs at a time per process
+_active: Optional["Tracer"] = None
+
+
+def trace_settings(cfg, results_dir: Path) -> Dict[str, Any]:
+    """
+    Read the TRACE config section.
+
+    Returns:
+        Dict with 'enabled', the 'metrics_log' path (TRACE.metrics_log,
+        relative to the results folder; default metrics.jsonl there) and
+        'chrome_trace'.
+    """
+    sec = cfg["TRACE"] if "TRACE" in cfg else None
+    if sec is None:
+        return {"enabled": True, "metrics_log": results_dir / METRICS_NAME, "chrome_trace": False}
+    log = str(sec.get("METRICS_LOG", "") or "").strip()
+    return {
+        "enabled": sec.getboolean("ENABLED", True),
+        "metrics_log": results_dir / (log or METRICS_NAME),
+        "chrome_trace": sec.getboolean("CHROME_TRACE", False),
+    }
+
+
+class Tracer:
+    """
+    Spans recorded for one ticket.
+
+    Each span is a dict with 'name', 'start' (epoch seconds), 'seconds',
+    'pid', 'thread' and any attributes passed to span(). The list is plain
+    data, so a batch pool process can return its spans to the parent.
+    """
+
+    def __init__(self, memory: Optional[MemoryProbe] = None):
+        self.spans: List[Dict[str, Any]] = []
+        self.memory = memory
+        self._lock = threading.Lock()
+        self._owner: Optional[int] = None
+        # peak of the finished children of each open span on the owner thread
+        self._peaks: List[int] = []
+
+    def __getstate__(self):
+        return {"spans": self.spans}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.spans = state["spans"]
+
+    @contextmanager
+    def activate(self) -> Iterator["Tracer"]:
+        """
+        Record span() calls in this process into this tracer until exit.
+        """
+        global _active
+        previous, _active = _active, self
+        self._owner = threading.get_ident()
+        if self.memory is not None:
+            self.memory.start()
+        try:
+            yield self
+        finally:
+            if self.memory is not None:
+                self.memory.stop()
+            _active = previous
+
+    def _measures_memory(self) -> bool:
+        # probes are process-wide: peaks are attributed along the owner's span stack only
+        return self.memory is not None and threading.get_ident() == self._owner
+
+    def _memory_enter(self) -> None:
+        peak = self.memory.take_peak()
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        self._peaks.append(0)
+
+    def _memory_exit(self) -> float:
+        peak = max(self.memory.take_peak(), self._peaks.pop())
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        return round(peak / MB, 1)
+
+    def record(self, name: str, start: float, seconds: float, **attrs: Any) -> None:
+        thread = threading.current_thread()
+        entry = {
+            "name": name,
+            "start": start,
+            "seconds": seconds,
+            "pid": os.getpid(),
+            "thread": thread.name,
+            "tid": thread.ident,
+        }
+        entry.update(attrs)
+        with self._lock:
+            self.spans.append(entry)
+
+    def extend(self, spans: List[Dict[str, Any]]) -> None:
+        """
+        Add spans recorded elsewhere (e.g. by a batch pool process).
+        """
+        with self._lock:
+            self.spans.extend(spans)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    """
+    Time the enclosed block into the active tracer, if any.
+
+    A span that raises is still recorded, with error=<exception type>.
+    """
+    tracer = _active
+    if tracer is None:
+        yield
+        return
+    measure = tracer._measures_memory()
+    if measure:
+        tracer._memory_enter()
+    start = time.time()
+    t0 = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - t0
+        if measure:
+            attrs["peak_mb"] = tracer._memory_exit()
+        tracer.record(name, start, seconds, **attrs)
+
+
+def new_tracer(cfg) -> Tracer:
+    """
+    A Tracer with the memory probe selected by MEMORY.profile.
+    """
+    return Tracer(memory=make_probe(memory_settings(cfg)))
+
+
+def chrome_trace(spans: List[Dict[str, Any]], ticket: str) -> Dict[str, Any]:
+    """
+    Convert spans to Chrome trace_event JSON ("X" complete events, µs).
+    """
+    events = []
+    threads = {}
+    for s in spans:
+        args = {k: v for k, v in s.items() if k not in ("name", "start", "seconds", "pid", "thread", "tid")}
+        events.append({
+            "name": s["name"],
+            "cat": "pipeline",
+            "ph": "X",
+            "ts": round(s["start"] * 1e6),
+            "dur": round(s["seconds"] * 1e6),
+            "pid": s["pid"],
+            "tid": s["tid"],
+            "args": args,
+        })
+        threads[(s["pid"], s["tid"])] = s["thread"]
+    for (pid, tid), thread in threads.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread}})
+    return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"ticket": ticket}}
+
+
+def write_trace(cfg, tracer: Tracer, ticket_dir: Path, stem: str) -> Optional[Path]:
+    """
+    Append a ticket's spans to the metrics log and, if configured, write its
+    Chrome trace. Failures are reported, never raised.
+
+    Args:
+        cfg: Loaded configuration.
+        tracer: The ticket's tracer.
+        ticket_dir: Per-ticket results folder (its parent is the results folder).
+        stem: Ticket name recorded with every span.
+
+    Returns:
+        Path of the Chrome trace, or None.
+    """
+    settings = trace_settings(cfg, ticket_dir.parent)
+    if not settings["enabled"] or not tracer.spans:
+        return None
+    spans = sorted(tracer.spans, key=lambda s: s["start"])
+
+    try:
+        lines = "".join(json.dumps({"ticket": stem, **s}, default=str) + "\n" for s in spans)
+        with open(settings["metrics_log"], "a", encoding="utf-8") as f:
+            f.write(lines)  # one write per ticket keeps concurrent runs from interleaving
+    except OSError as e:
+        print(f"⚠️ Could not append to metrics log {settings['metrics_log']}: {e}")
+
+    if not settings["chrome_trace"]:
+        return None
+    trace_path = ticket_dir / f"{stem}_trace.json"
+    try:
+        trace_path.write_text(json.dumps(chrome_trace(spans, stem), default=str), encoding="utf-8")
+    except OSError as e:
+        print(f"⚠️ Could not write trace {trace_path}: {e}")
+        return None
+    return trace_path
@@ -0,0 +1,66 @@
+# utils/worker_client.py
+import json
+import socket
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def get_worker_address(cfg) -> Optional[tuple]:
+    """
+    Return (host, port) from the WORKER section, or None if the worker is disabled.
+    """
+    if "WORKER" not in cfg or not cfg.getboolean("WORKER", "ENABLED", fallback=False):
+        return None
+    sec = cfg["WORKER"]
+    return sec.get("HOST", DEFAULT_HOST), sec.getint("PORT", DEFAULT_PORT)
+
+
+def submit_ticket(
+    ticket: Path,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    timeout: float = 300.0
+) -> Optional[Dict[str, Any]]:
+    """
+    Send a ticket path to a running worker and wait for its result paths.
+
+    Args:
+        ticket: Path to a .gml/.txt ticket (staged or still in the download folder).
+        host, port: Worker address.
+        timeout: Seconds to wait for the worker to finish the ticket.
+
+    Returns:
+        The worker's JSON reply, or None if no worker is listening.
+
+    Raises:
+        RuntimeError if the worker is reachable but failed the ticket, or did
+        not answer within `timeout` (it may still be processing it).
+    """
+    body = json.dumps({"ticket": str(Path(ticket).resolve())}).encode("utf-8")
+    req = urllib.request.Request(
+        f"http://{host}:{port}/ticket",
+        data=body,
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        try:
+            detail = json.loads(e.read().decode("utf-8")).get("error", e.reason)
+        except Exception:
+            detail = e.reason
+        raise RuntimeError(f"Worker failed ticket {Path(ticket).name}: {detail}")
+    except socket.timeout:  # TimeoutError on Python 3.10+; the worker accepted the ticket
+        raise RuntimeError(
+            f"Worker did not finish ticket {Path(ticket).name} within {timeout:g} s; "
+            f"it may still be processing it (see the worker console)"
+        )
+    except (urllib.error.URLError, ConnectionError):
+        return None
@@ -0,0 +1,154 @@
+"""
+Resident worker: keeps the utility layers (and their STRtrees) in memory and
+processes tickets on request, so back-to-back tickets skip the cold start.
+
+Start it once (from the code folder):
+    python worker.py
+
+Then either run main.py as usual (it hands staged tickets to the worker when
+WORKER.enabled is set), submit a path directly:
+    python worker.py --submit C:\\path\\to\\ticket.gml
+or POST {"ticket": "<path>"} to http://127.0.0.1:<port>/ticket.
+GET /status returns the resident layers and their feature counts.
+"""
+import argparse
+import json
+import sys
+import traceback
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+from utils.config import load_default_config, ConfigError
+from utils.paths import init_paths, get_shapefile_paths, get_cache_dir
+from utils.file_manager import stage_ticket
+from utils.worker_client import DEFAULT_HOST, DEFAULT_PORT, submit_ticket
+from utils.memory import memory_settings
+from utils.tracing import new_tracer, span
+
+from processing.layer_store import LayerStore
+from main import PROJECT_ROOT, process_ticket
+
+
+class WorkerServer(HTTPServer):
+    """
+    Single-threaded HTTP server: tickets are processed one at a time, in order.
+    """
+
+    def __init__(self, address, cfg):
+        super().__init__(address, WorkerHandler)
+        self.cfg = cfg
+        self.paths = init_paths(cfg)
+        self.paths["RESULTS_DIR"].mkdir(parents=True, exist_ok=True)
+        self.shapefiles = get_shapefile_paths(cfg, PROJECT_ROOT)
+        self.store = LayerStore(
+            self.shapefiles, get_cache_dir(cfg, PROJECT_ROOT),
+            budget_mb=memory_settings(cfg)["budget_mb"],
+        )
+
+    def handle_ticket(self, ticket: Path) -> dict:
+        if not ticket.exists():
+            raise FileNotFoundError(f"Ticket not found: {ticket}")
+        tracer = new_tracer(self.cfg)
+        with tracer.activate(), span("stage"):
+            ticket_file, xml_file, ticket_dir = stage_ticket(ticket, self.paths["RESULTS_DIR"])
+        result = process_ticket(
+            self.cfg, ticket_file, xml_file, ticket_dir,
+            self.shapefiles, store=self.store, tracer=tracer,
+        )
+        reply = {"ticket": str(ticket_file), "ticket_dir": str(ticket_dir)}
+        reply.update({k: str(v) for k, v in result.items()})
+        return reply
+
+
+class WorkerHandler(BaseHTTPRequestHandler):
+    server: WorkerServer
+
+    def _reply(self, code: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/status":
+            self._reply(200, {"layers": self.server.store.status()})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/ticket":
+            self._reply(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            ticket = Path(request["ticket"])
+        except Exception as e:
+            self._reply(400, {"error": f"bad request: {e}"})
+            return
+        try:
+            reply = self.server.handle_ticket(ticket)
+        except Exception as e:
+            traceback.print_exc()
+            self._reply(500, {"error": str(e)})
+            return
+        print(f"Processed {ticket.name} -> {reply['ticket_dir']}")
+        self._reply(200, reply)
+
+    def log_message(self, format, *args):
+        # keep the console to one line per ticket
+        pass
+
+
+def serve(cfg) -> None:
+    sec = cfg["WORKER"] if "WORKER" in cfg else {}
+    host = sec.get("HOST", DEFAULT_HOST)
+    port = int(sec.get("PORT", DEFAULT_PORT))
+
+    server = WorkerServer((host, port), cfg)
+    print("Loading utility layers…")
+    server.store.load_all()
+    print(f"Worker listening on http://{host}:{port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="UR Preview resident worker.")
+    parser.add_argument("--submit", type=Path, metavar="TICKET",
+                        help="send a ticket to a running worker instead of starting one")
+    args = parser.parse_args(argv)
+
+    try:
+        cfg = load_default_config()
+    except ConfigError as e:
+        print(f"Configuration error: {e}")
+        return 1
+
+    if args.submit:
+        sec = cfg["WORKER"] if "WORKER" in cfg else {}
+        host = sec.get("HOST", DEFAULT_HOST)
+        port = int(sec.get("PORT", DEFAULT_PORT))
+        try:
+            result = submit_ticket(args.submit, host, port)
+        except RuntimeError as e:
+            print(e)
+            return 1
+        if result is None:
+            print(f"No worker listening on {host}:{port}.")
+            return 1
+        print(json.dumps(result, indent=2))
+        return 0
+
+    serve(cfg)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())